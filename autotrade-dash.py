@@ -1,7 +1,18 @@
 import os
+import io
+import glob
+import json
+import shutil
+import marshal
+import re
+import pstats
+import cProfile
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import pandas as pd
+import numpy as np
+import pyarrow as pa
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -10,14 +21,592 @@ from dotenv import load_dotenv
 from urllib.parse import urlparse
 load_dotenv()
 import time
+import logging
+import resource
+import functools
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import multiprocessing
 
 # --- SQLAlchemy import 추가 ---
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import (
+    Column, DateTime, Double, Integer, MetaData, String, Table,
+    create_engine, event, func, inspect, select, text,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import (
+    NoSuchModuleError, OperationalError, SQLAlchemyError,
+)
+from sqlalchemy.pool import QueuePool
+
+# 켈리 시뮬레이션 배치 함수 (프로세스 풀에서 pickle 할 수 있도록 별도 모듈)
+import montecarlo
+
+logger = logging.getLogger("autotrade_dash")
+
+# 필터/열 선택 결과가 원본 버퍼를 공유하도록 copy-on-write 사용 (수정할 때만 복사)
+pd.set_option("mode.copy_on_write", True)
+
+# Prometheus 형식 메트릭 (DASH_METRICS_PORT 의 /metrics 로 노출)
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRICS_HELP = {
+    'dash_section_seconds': ('histogram', "Time spent rendering a dashboard section."),
+    'dash_load_seconds': ('histogram', "Time spent in a data loader querying the database."),
+    'dash_rows_loaded_total': ('counter', "Rows returned by data loaders."),
+    'dash_cache_requests_total': ('counter', "Calls to a Streamlit cached function."),
+    'dash_cache_misses_total': ('counter', "Calls to a Streamlit cached function that ran its body."),
+    'dash_db_pool_wait_seconds': ('histogram', "Time waiting for a pooled DB connection."),
+    'dash_refresh_seconds': ('histogram', "Duration of background data snapshot refreshes."),
+    'dash_refresh_failures_total': ('counter', "Background data snapshot refreshes that failed."),
+    'dash_store_sync_seconds': ('histogram', "Duration of local store syncs from the primary DB."),
+    'dash_store_rows_copied_total': ('counter', "Rows copied from the primary DB into the local store."),
+    'dash_db_circuit_trips_total': ('counter', "Times a database circuit breaker opened."),
+    'dash_stale_loads_total': ('counter', "Loads answered with the last good result after a failure."),
+}
 
 @st.cache_resource
-def get_engine():
-    """Create and cache a SQLAlchemy engine based on environment variables."""
+def get_metrics():
+    """Per-process counters and histograms keyed by (metric, sorted label items).
+
+    ``breakers`` lists the database circuit breakers reported as gauges.
+    """
+    return {'lock': threading.Lock(), 'counters': {}, 'histograms': {}, 'breakers': []}
+
+def metric_inc(name, amount=1, **labels):
+    metrics = get_metrics()
+    key = (name, tuple(sorted(labels.items())))
+    with metrics['lock']:
+        metrics['counters'][key] = metrics['counters'].get(key, 0) + amount
+
+def metric_observe(name, seconds, **labels):
+    metrics = get_metrics()
+    key = (name, tuple(sorted(labels.items())))
+    with metrics['lock']:
+        histogram = metrics['histograms'].get(key)
+        if histogram is None:
+            histogram = metrics['histograms'][key] = {
+                'buckets': [0] * len(METRICS_BUCKETS), 'sum': 0.0, 'count': 0,
+            }
+        for index, bound in enumerate(METRICS_BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][index] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+# 렌더링 프로파일: DASH_PROFILE=1 또는 ?profile=1 (cprofile 이면 cProfile 결과도 제공)
+_profile_local = threading.local()
+
+def profile_mode():
+    """``'sections'``, ``'cprofile'`` or ``None``; the query parameter overrides the env var."""
+    mode = st.query_params.get('profile', os.getenv("DASH_PROFILE", "")).lower()
+    if mode == 'cprofile':
+        return 'cprofile'
+    return 'sections' if mode in ("1", "true", "yes") else None
+
+@contextmanager
+def track_section(section):
+    """Time a block (or, as a decorator, a function) into ``dash_section_seconds``.
+
+    While a profiled rerun is active on this thread the timing is also added
+    to its per-section breakdown, nested under the enclosing sections.
+    """
+    run = getattr(_profile_local, 'run', None)
+    started = time.perf_counter()
+    if run is not None:
+        run['depth'] += 1
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metric_observe('dash_section_seconds', elapsed, section=section)
+        if run is not None:
+            run['depth'] -= 1
+            run['records'].append({
+                'section': section,
+                'depth': run['depth'],
+                'start': started - run['started'],
+                'seconds': elapsed,
+            })
+
+def profiled(func):
+    """Run ``func`` with section profiling when enabled and show the result in the sidebar."""
+    @functools.wraps(func)
+    def run_profiled(*args, **kwargs):
+        mode = profile_mode()
+        if mode is None:
+            return func(*args, **kwargs)
+        run = {
+            'started': time.perf_counter(),
+            'started_at': time.time(),
+            'depth': 0,
+            'records': [],
+            'profiler': cProfile.Profile() if mode == 'cprofile' else None,
+        }
+        _profile_local.run = run
+        if run['profiler'] is not None:
+            run['profiler'].enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            if run['profiler'] is not None:
+                run['profiler'].disable()
+            run['total'] = time.perf_counter() - run['started']
+            _profile_local.run = None
+        render_profile(run)
+        return result
+    return run_profiled
+
+def metered_load(loader, func, *args):
+    # 실제 DB 조회가 실행될 때(캐시 미스, 백그라운드 갱신)의 소요 시간과 행 수 기록
+    started = time.perf_counter()
+    result = func(*args)
+    metric_observe('dash_load_seconds', time.perf_counter() - started, loader=loader)
+    metric_inc('dash_rows_loaded_total', len(result), loader=loader)
+    return result
+
+def metered_cache(cache_decorator):
+    """Wrap ``st.cache_data``/``st.cache_resource`` to count requests and misses.
+
+    The body only runs on a miss, so misses are counted inside it and every
+    call is counted outside; hits are the difference.
+    """
+    def decorate(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            metric_inc('dash_cache_misses_total', cache=name)
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            metric_inc('dash_cache_requests_total', cache=name)
+            return cached(*args, **kwargs)
+
+        lookup.clear = cached.clear
+        return lookup
+    return decorate
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels) + "}"
+
+def _process_rss_bytes():
+    # 현재 RSS (/proc 이 없으면 최대 RSS 로 대체)
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _runtime_gauges():
+    # 활성 세션 수와 Streamlit 캐시 메모리 (런타임 밖에서는 생략)
+    from streamlit.runtime import Runtime
+    if not Runtime.exists():
+        return [], []
+    runtime = Runtime.instance()
+    sessions = []
+    try:
+        sessions.append(((), runtime._session_mgr.num_active_sessions()))
+    except AttributeError:
+        pass
+    cache_bytes = {}
+    for stat in runtime.stats_mgr.get_stats():
+        key = (('cache', stat.cache_name), ('category', stat.category_name))
+        cache_bytes[key] = cache_bytes.get(key, 0) + stat.byte_length
+    return sessions, sorted(cache_bytes.items())
+
+def render_metrics(metrics):
+    """Prometheus text exposition of the collected metrics and process gauges."""
+    with metrics['lock']:
+        counters = dict(metrics['counters'])
+        histograms = {
+            key: {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+            for key, value in metrics['histograms'].items()
+        }
+    lines = []
+    for name, (kind, help_text) in METRICS_HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_label_text(labels)} {value}")
+            continue
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            # 구간 수는 관측 시점에 이미 누적되어 있음 (le 이하 전체)
+            for bound, count in zip(METRICS_BUCKETS, histogram['buckets']):
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{_label_text(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_label_text(labels)} {histogram['count']}")
+
+    sessions, cache_bytes = _runtime_gauges()
+    breakers = [
+        ((('db', breaker['name']),), int(breaker['opened_at'] is not None))
+        for breaker in metrics['breakers']
+    ]
+    gauges = [
+        ('process_resident_memory_bytes', "Resident memory size in bytes.", [((), _process_rss_bytes())]),
+        ('dash_active_sessions', "Browser sessions currently connected.", sessions),
+        ('dash_cache_bytes', "Memory held by Streamlit caches.", cache_bytes),
+        ('dash_db_circuit_open', "1 while the database circuit breaker is open.", breakers),
+    ]
+    for name, help_text, samples in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_label_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+@st.cache_resource
+def get_metrics_server():
+    """Serve ``/metrics`` on DASH_METRICS_PORT from a daemon thread (once per process)."""
+    port = int(_env_float("DASH_METRICS_PORT", 0))
+    if port <= 0:
+        return None
+    # 요청을 처리하는 스레드에는 스크립트 컨텍스트가 없으므로 수집 상태를 미리 고정
+    metrics = get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics(metrics).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    except OSError:
+        logger.warning("메트릭 서버를 시작할 수 없습니다 (포트 %s).", port, exc_info=True)
+        return None
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='dash-metrics', daemon=True)
+    thread.start()
+    return server
+
+# DB 쿼리 계측: 최근 쿼리의 지연/행 수/바이트와 연결 풀 대기 시간을 보관
+QUERY_STATS_WINDOW = 500
+
+# 바이트 추정에 사용할 표본 행 수 (처음 가져온 행들의 평균 크기 x 전체 행 수)
+QUERY_BYTES_SAMPLE_ROWS = 100
+
+@st.cache_resource
+def get_query_stats():
+    """Rolling per-process record of recent queries and pool checkout waits."""
+    return {
+        'lock': threading.Lock(),
+        'queries': deque(maxlen=QUERY_STATS_WINDOW),
+        'pool_waits': deque(maxlen=QUERY_STATS_WINDOW),
+    }
+
+# 회로 차단기: 원본 DB 조회가 연속으로 실패하면 잠시 연결 자체를 시도하지 않고
+# 마지막 정상 데이터를 제공 (대기 시간마다 시험 조회 한 번만 허용)
+class CircuitOpenError(SQLAlchemyError):
+    """Raised instead of connecting while a database circuit breaker is open."""
+
+@st.cache_resource
+def get_circuit_breaker(name):
+    """Per-process failure state for one database (``primary`` / ``replica``)."""
+    breaker = {
+        'name': name,
+        'lock': threading.Lock(),
+        'failures': 0,
+        'opened_at': None,
+        'retry_at': 0.0,
+        'last_error': None,
+        'last_success_at': None,
+    }
+    metrics = get_metrics()
+    with metrics['lock']:
+        metrics['breakers'].append(breaker)
+    return breaker
+
+def breaker_threshold():
+    return max(1, int(_env_float("DASH_BREAKER_FAILURES", 3)))
+
+def breaker_cooldown():
+    return _env_float("DASH_BREAKER_COOLDOWN_SECONDS", 60)
+
+def breaker_allows(breaker):
+    """Whether a connection may be opened now; spends the half-open trial when due."""
+    with breaker['lock']:
+        if breaker['opened_at'] is None:
+            return True
+        now = time.monotonic()
+        if now < breaker['retry_at']:
+            return False
+        # 대기 시간이 지나면 시험 조회 한 번만 통과시키고 다음 시험까지 다시 대기
+        breaker['retry_at'] = now + breaker_cooldown()
+        return True
+
+def breaker_record_success(breaker):
+    with breaker['lock']:
+        breaker['last_success_at'] = time.time()
+        if breaker['failures'] == 0 and breaker['opened_at'] is None:
+            return
+        closed = breaker['opened_at'] is not None
+        breaker['failures'] = 0
+        breaker['opened_at'] = None
+        breaker['last_error'] = None
+    if closed:
+        logger.info("%s DB 조회가 회복되어 회로 차단을 해제했습니다.", breaker['name'])
+
+def breaker_record_failure(breaker, error):
+    with breaker['lock']:
+        breaker['failures'] += 1
+        breaker['last_error'] = str(error).splitlines()[0][:200] if str(error) else type(error).__name__
+        if breaker['opened_at'] is not None or breaker['failures'] < breaker_threshold():
+            return
+        breaker['opened_at'] = time.time()
+        breaker['retry_at'] = time.monotonic() + breaker_cooldown()
+        failures = breaker['failures']
+    logger.warning(
+        "%s DB 조회가 %d회 연속 실패해 %.0f초 동안 조회를 멈춥니다: %s",
+        breaker['name'], failures, breaker_cooldown(), breaker['last_error'],
+    )
+    metric_inc('dash_db_circuit_trips_total', db=breaker['name'])
+
+# DB 상태 문제로 보는 MySQL 오류 코드: 연결 수 초과(1040), 서버 종료(1053), 잠금 대기 초과(1205),
+# 쿼리 중단(1317), 연결 강제 종료(1927), 실행 시간 초과(3024), 비활성 연결 종료(4031),
+# 클라이언트 연결 실패/끊김(2002, 2003, 2005, 2006, 2013, 2055)
+DB_UNAVAILABLE_ERRNOS = frozenset({
+    1040, 1053, 1205, 1317, 1927, 3024, 4031, 2002, 2003, 2005, 2006, 2013, 2055,
+})
+# SQLite 에서 같은 의미의 오류 메시지 (파일 열기 실패, 잠금, 입출력 오류)
+DB_UNAVAILABLE_MESSAGES = ('unable to open database file', 'database is locked', 'disk i/o error')
+
+def _error_code(error):
+    # mysql-connector 는 errno, PyMySQL 은 args[0] 에 오류 코드가 들어 있음
+    code = getattr(error, 'errno', None)
+    if code is None and error.args and isinstance(error.args[0], int):
+        code = error.args[0]
+    return code
+
+def _is_db_unavailable(exception_context):
+    # 연결 끊김/연결 실패/실행 시간 초과만 DB 상태 문제로 간주
+    # (문법/스키마 오류 같은 SQL 오류는 차단기를 열지 않고 그대로 표시)
+    if exception_context.is_disconnect:
+        return True
+    error = exception_context.original_exception
+    # 실행 시간 초과(3024) 등은 드라이버에 따라 DatabaseError 로 오므로 예외 종류와 무관하게 코드로 판단
+    if _error_code(error) in DB_UNAVAILABLE_ERRNOS:
+        return True
+    return (
+        isinstance(exception_context.sqlalchemy_exception, OperationalError)
+        and str(error).lower().startswith(DB_UNAVAILABLE_MESSAGES)
+    )
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records checkout waits and honours the database circuit breaker."""
+
+    query_stats = None
+    breaker = None
+
+    def connect(self):
+        if self.breaker is not None and not breaker_allows(self.breaker):
+            raise CircuitOpenError(
+                f"{self.breaker['name']} DB 응답이 원활하지 않아 조회를 잠시 멈췄습니다 "
+                f"(최근 오류: {self.breaker['last_error']})."
+            )
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception as exc:
+            # 연결 실패와 풀 대기 시간 초과 (쿼리 중 오류는 handle_error 이벤트에서 기록)
+            if self.breaker is not None:
+                breaker_record_failure(self.breaker, exc)
+            raise
+        waited = time.perf_counter() - started
+        if self.query_stats is not None:
+            with self.query_stats['lock']:
+                self.query_stats['pool_waits'].append(waited * 1000)
+        metric_observe('dash_db_pool_wait_seconds', waited)
+        return connection
+
+    def recreate(self):
+        # dispose/무효화 후 새로 만든 풀에도 같은 기록을 이어서 사용
+        pool = super().recreate()
+        pool.query_stats = self.query_stats
+        pool.breaker = self.breaker
+        return pool
+
+def _row_bytes(row):
+    # 값 종류별 대략적인 전송 크기 (문자열/바이트는 길이, 나머지는 8바이트)
+    return sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row)
+
+class CountingCursor:
+    """DBAPI cursor proxy that counts fetched rows and estimates fetched bytes."""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+        self._sampled = 0
+        self._sample_bytes = 0
+
+    def _count(self, rows):
+        if not rows:
+            return rows
+        if self._sampled < QUERY_BYTES_SAMPLE_ROWS:
+            sample = rows[:QUERY_BYTES_SAMPLE_ROWS - self._sampled]
+            self._sampled += len(sample)
+            self._sample_bytes += sum(_row_bytes(row) for row in sample)
+        self._record['rows'] += len(rows)
+        self._record['bytes'] = int(self._record['rows'] * self._sample_bytes / self._sampled)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count([row])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+# 실행 시간 제한 힌트 (SELECT 바로 뒤에 붙임)
+STATEMENT_TIMEOUT_HINT = re.compile(r"/\*\+ MAX_EXECUTION_TIME\(\d+\) \*/ ")
+SELECT_PREFIX = re.compile(r"^(\s*SELECT)\b", re.IGNORECASE)
+
+def _statement_label(statement):
+    # 요약 표에 쓸 짧은 쿼리 이름 (실행 시간 힌트 제거, 공백 정리 후 앞부분만)
+    label = " ".join(STATEMENT_TIMEOUT_HINT.sub("", statement).split())
+    return label if len(label) <= 90 else label[:87] + "..."
+
+def instrument_engine(engine, stats, breaker=None):
+    """Attach query timing/row/byte counting, the MySQL statement timeout and the breaker."""
+    # 조회 워커/백그라운드 스레드에서도 같은 기록에 쌓이도록 생성 시점의 기록을 고정
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.query_stats = stats
+        engine.pool.breaker = breaker
+    statement_timeout_ms = int(_env_float("MYSQL_QUERY_TIMEOUT_MS", 30000))
+
+    if engine.dialect.name == 'mysql':
+        @event.listens_for(engine, "before_cursor_execute", retval=True)
+        def add_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+            # 쿼리마다 서버 측 SELECT 실행 시간 제한 (초과하면 MySQL 이 쿼리를 중단)
+            # 실행 옵션 query_timeout_ms 로 조회별 제한 시간 지정 (0 이면 제한 없음)
+            options = context.execution_options if context is not None else conn.get_execution_options()
+            timeout_ms = int(options.get('query_timeout_ms', statement_timeout_ms))
+            if timeout_ms > 0:
+                statement = SELECT_PREFIX.sub(
+                    rf"\1 /*+ MAX_EXECUTION_TIME({timeout_ms}) */", statement, count=1
+                )
+            return statement, parameters
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        record = {
+            'at': time.time(),
+            'statement': _statement_label(statement),
+            'latency_ms': (time.perf_counter() - started) * 1000,
+            'rows': 0,
+            'bytes': 0,
+        }
+        with stats['lock']:
+            stats['queries'].append(record)
+        if breaker is not None:
+            breaker_record_success(breaker)
+        if context is not None and cursor.description is not None:
+            # 결과 행은 이후 이 프록시를 통해 읽히므로 가져온 행/바이트가 기록에 누적됨
+            context.cursor = CountingCursor(cursor, record)
+
+    if breaker is not None:
+        @event.listens_for(engine, "handle_error")
+        def record_query_error(exception_context):
+            # 연결 이후 오류만 차단기에 기록 (연결 실패는 풀에서 기록)
+            if exception_context.connection is not None and _is_db_unavailable(exception_context):
+                breaker_record_failure(breaker, exception_context.original_exception)
+
+    return engine
+
+def query_stats_summary(stats):
+    """Summarise the rolling query window: overall figures and per-statement totals."""
+    with stats['lock']:
+        queries = [dict(record) for record in stats['queries']]
+        pool_waits = list(stats['pool_waits'])
+    if not queries:
+        return None, pd.DataFrame()
+
+    frame = pd.DataFrame(queries)
+    latency = frame['latency_ms']
+    summary = {
+        'queries': len(frame),
+        'window_seconds': time.time() - frame['at'].min(),
+        'latency_p50_ms': float(latency.quantile(0.5)),
+        'latency_p95_ms': float(latency.quantile(0.95)),
+        'latency_max_ms': float(latency.max()),
+        'rows': int(frame['rows'].sum()),
+        'bytes': int(frame['bytes'].sum()),
+        'pool_wait_p95_ms': float(np.percentile(pool_waits, 95)) if pool_waits else 0.0,
+        'pool_wait_max_ms': max(pool_waits, default=0.0),
+    }
+    by_statement = frame.groupby('statement').agg(
+        횟수=('latency_ms', 'size'),
+        총지연_ms=('latency_ms', 'sum'),
+        최대지연_ms=('latency_ms', 'max'),
+        행수=('rows', 'sum'),
+        바이트=('bytes', 'sum'),
+    ).sort_values('총지연_ms', ascending=False)
+    return summary, by_statement.head(10).reset_index().rename(columns={'statement': '쿼리'})
+
+def engine_pool_options():
+    """Connection pool arguments for create_engine from the MYSQL_POOL_* variables."""
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(_env_float("MYSQL_POOL_SIZE", 5)),
+        'max_overflow': int(_env_float("MYSQL_MAX_OVERFLOW", 10)),
+        'pool_timeout': _env_float("MYSQL_POOL_TIMEOUT", 30),
+        # 재사용 주기를 MySQL wait_timeout 보다 짧게 두어 매 체크아웃 ping 없이 끊긴 연결을 피함
+        'pool_recycle': int(_env_float("MYSQL_POOL_RECYCLE", 1800)),
+        'pool_pre_ping': os.getenv("MYSQL_POOL_PRE_PING", "").lower() in ("1", "true", "yes"),
+    }
+
+def _url_engine(database_url, breaker):
+    url = make_url(database_url)
+    # 메모리 SQLite 는 연결마다 DB 가 따로 생기므로 기본 풀을 그대로 사용
+    options = {} if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:') \
+        else {'poolclass': TimedQueuePool}
+    try:
+        return instrument_engine(create_engine(database_url, **options), get_query_stats(), breaker)
+    except SQLAlchemyError as exc:
+        raise RuntimeError("데이터베이스 연결 엔진을 생성할 수 없습니다.") from exc
+
+def _mysql_engine(host_var, port_var, breaker):
+    # host_var/port_var: 호스트/포트를 읽을 환경 변수 이름 (원본 MYSQL_HOST, 읽기 전용 복제본 MYSQL_REPLICA_HOST)
     required_envs = ["MYSQL_USER", "MYSQL_PASSWORD"]
     missing = [env for env in required_envs if not os.getenv(env)]
     if missing:
@@ -27,8 +616,8 @@ def get_engine():
 
     user = os.getenv("MYSQL_USER")
     password = os.getenv("MYSQL_PASSWORD")
-    host_env = os.getenv("MYSQL_HOST", "mysql")
-    port_env = os.getenv("MYSQL_PORT")
+    host_env = os.getenv(host_var, "mysql")
+    port_env = os.getenv(port_var)
 
     host = host_env
     port = 3306
@@ -55,22 +644,272 @@ def get_engine():
             port = int(port_env)
         except ValueError as exc:
             raise RuntimeError(
-                "MYSQL_PORT 환경 변수는 숫자여야 합니다."
+                f"{port_var} 환경 변수는 숫자여야 합니다."
             ) from exc
 
     db_name = os.getenv("MYSQL_DATABASE", "mydb")
 
-    db_uri = f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db_name}"
+    # PyMySQL: stream_results 조회를 서버 측 커서(SSCursor)로 실행해 결과를 청크 단위로 받음
+    # (mysql-connector 방언은 항상 버퍼 커서를 써서 전체 결과를 클라이언트 메모리에 올림)
+    db_uri = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db_name}"
+
+    connect_args = {}
+    connect_timeout = _env_float("MYSQL_CONNECT_TIMEOUT", 10)
+    if connect_timeout > 0:
+        connect_args['connect_timeout'] = int(connect_timeout)
 
     try:
         engine = create_engine(
             db_uri,
-            pool_pre_ping=True,
+            connect_args=connect_args,
+            **engine_pool_options(),
         )
     except SQLAlchemyError as exc:
         raise RuntimeError("데이터베이스 연결 엔진을 생성할 수 없습니다.") from exc
 
-    return engine
+    return instrument_engine(engine, get_query_stats(), breaker)
+
+@st.cache_resource
+def get_primary_engine():
+    """Create and cache the engine for the primary (source) database from environment variables."""
+    breaker = get_circuit_breaker('primary')
+    # 테스트/로컬 환경용: 전체 DB URL 지정 시 그대로 사용 (예: sqlite:///trades.db)
+    database_url = os.getenv("DASH_DATABASE_URL")
+    if database_url:
+        return _url_engine(database_url, breaker)
+    return _mysql_engine("MYSQL_HOST", "MYSQL_PORT", breaker)
+
+@st.cache_resource
+def get_replica_engine():
+    """Engine for the read replica (MYSQL_REPLICA_HOST), or ``None`` when none is configured."""
+    breaker = get_circuit_breaker('replica')
+    database_url = os.getenv("DASH_REPLICA_DATABASE_URL")
+    if database_url:
+        return _url_engine(database_url, breaker)
+    if not os.getenv("MYSQL_REPLICA_HOST"):
+        return None
+    return _mysql_engine("MYSQL_REPLICA_HOST", "MYSQL_REPLICA_PORT", breaker)
+
+def get_source_engine():
+    # 대시보드 조회와 로컬 저장소 동기화가 읽는 원본: 복제본이 있으면 복제본, 없으면 원본 DB
+    return get_replica_engine() or get_primary_engine()
+
+# 저장소 백엔드: mysql(기본, 원본 DB 를 직접 조회) / sqlite / duckdb
+# (sqlite/duckdb 는 원본을 주기적으로 복제한 로컬 파일을 조회해 무거운 집계가 운영 DB 에 부담을 주지 않음)
+STORAGE_BACKENDS = ('mysql', 'sqlite', 'duckdb')
+
+# 삭제/교체를 나눠 실행할 키 개수 (SQLite 바인드 변수 제한 안쪽)
+STORE_DELETE_BATCH = 500
+
+STORE_METADATA = MetaData()
+STORE_TABLES = {
+    'trades': Table(
+        'trades', STORE_METADATA,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('timestamp', DateTime, index=True),
+        Column('action', String(16)),
+        Column('entry_price', Double),
+        Column('amount', Double),
+        Column('order_size', Double),
+        Column('leverage', Integer),
+        Column('stop_loss', Double),
+        Column('take_profit', Double),
+        Column('kelly_fraction', Double),
+        Column('win_probability', Double),
+        Column('volatility', Double),
+        Column('status', String(16), index=True),
+    ),
+    'trade_results': Table(
+        'trade_results', STORE_METADATA,
+        Column('trade_id', Integer, primary_key=True, autoincrement=False),
+        Column('close_timestamp', DateTime, index=True),
+        Column('close_price', Double),
+        Column('pnl', Double),
+        Column('pnl_percentage', Double),
+        Column('result', String(16)),
+    ),
+    'account_history': Table(
+        'account_history', STORE_METADATA,
+        Column('timestamp', DateTime, index=True),
+        Column('balance', Double),
+        Column('equity', Double),
+        Column('unrealized_pnl', Double),
+    ),
+}
+
+def storage_backend():
+    backend = os.getenv("DASH_STORAGE_BACKEND", "mysql").lower()
+    if backend not in STORAGE_BACKENDS:
+        raise RuntimeError(
+            "DASH_STORAGE_BACKEND 는 다음 중 하나여야 합니다: " + ", ".join(STORAGE_BACKENDS)
+        )
+    return backend
+
+def local_store_enabled():
+    return storage_backend() != 'mysql'
+
+def local_store_path():
+    # 기본 위치는 스냅샷 디렉터리 (스냅샷을 끄면 현재 디렉터리)
+    default = os.path.join(snapshot_dir() or ".", f"dash-store.{storage_backend()}")
+    return os.getenv("DASH_STORAGE_PATH") or default
+
+def _sqlite_store_pragmas(dbapi_connection, connection_record):
+    # 동기화(쓰기) 중에도 조회가 막히지 않도록 WAL 사용
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+@st.cache_resource
+def get_engine():
+    """Engine the dashboard reads from: the local store when enabled, else the replica or primary DB."""
+    if not local_store_enabled():
+        return get_source_engine()
+
+    path = local_store_path()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        if storage_backend() == 'sqlite':
+            engine = create_engine(
+                f"sqlite:///{path}", poolclass=TimedQueuePool, connect_args={'timeout': 30}
+            )
+            event.listen(engine, "connect", _sqlite_store_pragmas)
+        else:
+            engine = create_engine(f"duckdb:///{path}")
+        STORE_METADATA.create_all(engine)
+    except NoSuchModuleError as exc:
+        raise RuntimeError(
+            "DuckDB 저장소를 사용하려면 duckdb, duckdb-engine 패키지가 필요합니다."
+        ) from exc
+    except SQLAlchemyError as exc:
+        raise RuntimeError("로컬 저장소를 열 수 없습니다.") from exc
+    return instrument_engine(engine, get_query_stats())
+
+def get_write_engine():
+    # 대시보드가 직접 쓰는 테이블(롤업)과 인덱스의 위치: 로컬 저장소 또는 원본 DB (복제본은 읽기 전용)
+    return get_engine() if local_store_enabled() else get_primary_engine()
+
+@st.cache_resource
+def get_store_state():
+    """Per-process sync lock and the last primary fingerprint copied into the local store."""
+    return {
+        'lock': threading.Lock(),
+        'fingerprint': None,
+        'synced_at': None,
+        'duration': None,
+        'copied': {},
+    }
+
+def _append_store_rows(conn, table, df):
+    if conn.dialect.name == 'duckdb':
+        # DuckDB 는 행 단위 INSERT 가 느리므로 DataFrame 을 등록해 한 문장으로 삽입
+        columns = ", ".join(df.columns)
+        raw = conn.connection.driver_connection
+        raw.register('dash_store_chunk', df)
+        try:
+            conn.exec_driver_sql(
+                f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM dash_store_chunk"
+            )
+        finally:
+            raw.unregister('dash_store_chunk')
+        return
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    conn.execute(table.insert(), records)
+
+def _copy_to_store(table, statement, replace_key=None):
+    """Stream ``statement`` from the source DB into ``table``; return the rows copied.
+
+    Each chunk is committed on its own, so an interrupted first sync resumes
+    from the stored high-water marks. With ``replace_key`` existing rows with
+    the same key are replaced (closed trades, re-read results).
+    """
+    store = get_engine()
+    copied = 0
+    for chunk in _stream_sql(
+        statement, None, "로컬 저장소 동기화 중 원본 DB 조회에 실패했습니다.",
+        engine=get_source_engine(), timeout_ms=bulk_query_timeout_ms(),
+    ):
+        if chunk.empty:
+            continue
+        for column in table.columns:
+            if isinstance(column.type, DateTime):
+                chunk[column.name] = pd.to_datetime(chunk[column.name])
+        keys = [replace_key] if replace_key else [column.name for column in table.primary_key.columns]
+        if keys:
+            chunk = chunk.drop_duplicates(keys, keep='last')
+        with store.begin() as conn:
+            if replace_key is not None:
+                keys = chunk[replace_key].tolist()
+                for offset in range(0, len(keys), STORE_DELETE_BATCH):
+                    conn.execute(table.delete().where(
+                        table.c[replace_key].in_(keys[offset:offset + STORE_DELETE_BATCH])
+                    ))
+            _append_store_rows(conn, table, chunk)
+        copied += len(chunk)
+    return copied
+
+def sync_local_store():
+    """Copy new and changed rows from the source DB (replica if configured) into the local store.
+
+    Follows the same assumptions as the incremental loaders: trades only
+    gain rows or move from open to closed, results arrive with their
+    ``close_timestamp`` and account history is append-only. Returns the
+    number of rows copied per table, or ``None`` when nothing changed.
+    """
+    state = get_store_state()
+    trades = STORE_TABLES['trades']
+    results = STORE_TABLES['trade_results']
+    account = STORE_TABLES['account_history']
+    with state['lock']:
+        started = time.perf_counter()
+        try:
+            with get_source_engine().connect() as conn:
+                fingerprint = tuple(conn.execute(text(FINGERPRINT_QUERY)).one())
+        except SQLAlchemyError as exc:
+            raise RuntimeError("로컬 저장소 동기화 중 원본 DB 조회에 실패했습니다.") from exc
+        if fingerprint == state['fingerprint']:
+            state['synced_at'] = time.time()
+            return None
+
+        with get_engine().connect() as conn:
+            max_id = conn.execute(select(func.max(trades.c.id))).scalar()
+            max_close = conn.execute(select(func.max(results.c.close_timestamp))).scalar()
+            max_account = conn.execute(select(func.max(account.c.timestamp))).scalar()
+            open_ids = conn.execute(
+                select(trades.c.id).where(trades.c.status == 'open')
+            ).scalars().all()
+
+        copied = {'trades': 0, 'trade_results': 0, 'account_history': 0}
+        # 새 거래 (id 순)와 로컬에서 아직 열려 있는 거래의 최신 상태
+        new_trades = select(*trades.columns).order_by(trades.c.id)
+        if max_id is not None:
+            new_trades = new_trades.where(trades.c.id > max_id)
+        copied['trades'] += _copy_to_store(trades, new_trades)
+        if open_ids:
+            copied['trades'] += _copy_to_store(
+                trades, select(*trades.columns).where(trades.c.id.in_(open_ids)), replace_key='id'
+            )
+        # 거래 결과: 같은 시각에 늦게 기록된 결과도 잡도록 >= 로 읽고 trade_id 기준으로 교체
+        new_results = select(*results.columns).where(results.c.close_timestamp.is_not(None))
+        if max_close is not None:
+            new_results = new_results.where(results.c.close_timestamp >= max_close)
+        copied['trade_results'] += _copy_to_store(
+            results, new_results.order_by(results.c.close_timestamp), replace_key='trade_id'
+        )
+        new_account = select(*account.columns).order_by(account.c.timestamp)
+        if max_account is not None:
+            new_account = new_account.where(account.c.timestamp > max_account)
+        copied['account_history'] += _copy_to_store(account, new_account)
+
+        state['fingerprint'] = fingerprint
+        state['synced_at'] = time.time()
+        state['duration'] = time.perf_counter() - started
+        state['copied'] = copied
+        metric_observe('dash_store_sync_seconds', state['duration'])
+        for table, rows in copied.items():
+            metric_inc('dash_store_rows_copied_total', rows, table=table)
+        return copied
 
 # 페이지 설정
 st.set_page_config(
@@ -121,267 +960,3284 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 데이터 로딩 함수
-@st.cache_data(ttl=60)  # 60초마다 데이터 갱신
-def load_trades_data():
-    query = """
-    SELECT t.id, t.timestamp, t.action, t.entry_price, t.amount, t.order_size,
-           t.leverage, t.stop_loss, t.take_profit, t.kelly_fraction, t.win_probability, 
-           t.volatility, t.status,
-           tr.close_timestamp, tr.close_price, tr.pnl, tr.pnl_percentage, tr.result
-    FROM trades t
-    LEFT JOIN trade_results tr ON t.id = tr.trade_id
-    ORDER BY t.timestamp DESC
+# 거래 조회 쿼리 스키마 버전 (컬럼 구성이 바뀌면 증가시켜 전체 재로딩을 유도)
+TRADES_SCHEMA_VERSION = 2
+
+# 증분 상태를 유지할 날짜 범위(윈도우) 최대 개수
+TRADES_STATE_MAX_WINDOWS = 4
+
+TRADES_BASE_QUERY = """
+SELECT t.id, t.timestamp, t.action, t.entry_price, t.amount, t.order_size,
+       t.leverage, t.stop_loss, t.take_profit, t.kelly_fraction, t.win_probability, 
+       t.volatility, t.status,
+       tr.close_timestamp, tr.close_price, tr.pnl, tr.pnl_percentage, tr.result
+FROM trades t
+LEFT JOIN trade_results tr ON t.id = tr.trade_id
+"""
+
+# 거래 프레임 메모리 스키마: 반복 문자열은 범주형, 비율/수량은 float32, 정수는 좁은 정수형
+# (가격과 손익은 합계와 표시 정밀도를 위해 float64 유지)
+TRADES_CATEGORY_COLUMNS = ['action', 'status', 'result']
+TRADES_FLOAT32_COLUMNS = [
+    'amount', 'order_size', 'kelly_fraction', 'win_probability', 'volatility',
+    'pnl_percentage', 'duration',
+]
+TRADES_INT_COLUMNS = {'id': np.int32, 'leverage': np.int16}
+
+# 대시보드 조회에 필요한 인덱스: (테이블, 인덱스 이름, 컬럼)
+DASHBOARD_INDEXES = [
+    ('trades', 'idx_trades_timestamp', ['timestamp']),
+    ('trades', 'idx_trades_status', ['status']),
+    ('trade_results', 'idx_trade_results_trade_id', ['trade_id']),
+    ('trade_results', 'idx_trade_results_close_timestamp', ['close_timestamp']),
+    ('account_history', 'idx_account_history_timestamp', ['timestamp']),
+]
+
+@st.cache_resource
+def ensure_dashboard_indexes():
+    """Check that the indexes used by the windowed queries exist.
+
+    Missing indexes are created only when ``DASH_CREATE_INDEXES`` is enabled;
+    otherwise they are logged and returned so the operator can add them.
+    """
+    if local_store_enabled():
+        # 로컬 저장소의 인덱스는 STORE_TABLES 정의로 생성됨
+        return []
+    create_missing = os.getenv("DASH_CREATE_INDEXES", "").lower() in ("1", "true", "yes")
+    # 복제본은 원본의 인덱스를 그대로 복제하므로 원본에서 확인/생성
+    engine = get_primary_engine()
+    missing = []
+    try:
+        inspector = inspect(engine)
+        for table, index_name, columns in DASHBOARD_INDEXES:
+            # 기본키도 인덱스로 간주
+            pk = inspector.get_pk_constraint(table).get('constrained_columns') or []
+            existing = inspector.get_indexes(table) + [{'column_names': pk}]
+            if any(idx['column_names'][:len(columns)] == columns for idx in existing):
+                continue
+            if create_missing:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})"
+                    ))
+                logger.info("인덱스를 생성했습니다: %s.%s", table, index_name)
+            else:
+                missing.append(f"{table}({', '.join(columns)})")
+    except SQLAlchemyError:
+        logger.warning("인덱스 정보를 확인할 수 없습니다.", exc_info=True)
+        return []
+
+    if missing:
+        logger.warning("날짜 범위 조회용 인덱스가 없습니다: %s", ", ".join(missing))
+    return missing
+
+@st.cache_resource
+def get_trades_state():
+    """Per-process state for the incremental trades loader, keyed by date window."""
+    return {
+        'lock': threading.Lock(),
+        'windows': OrderedDict(),
+    }
+
+def reset_trades_state():
+    """Drop every copy of the trades data so the next load is a full reload.
+
+    Clears the incremental windows, the loader caches and the on-disk snapshot
+    (when enabled), and makes the background refresher reload all tables now.
+    """
+    state = get_trades_state()
+    with state['lock']:
+        state['windows'].clear()
+    load_trades_data.clear()
+    load_active_trade.clear()
+    if snapshot_enabled():
+        clear_snapshot()
+    request_full_refresh()
+
+def _fits_int(series, dtype):
+    # NULL 이 없고 값이 범위 안에 있을 때만 좁은 정수형으로 변환
+    if series.empty:
+        return True
+    if series.isna().any():
+        return False
+    info = np.iinfo(dtype)
+    return info.min <= series.min() and series.max() <= info.max
+
+def compact_trades_frame(df):
+    """Cast a trades frame to the compact dtype schema.
+
+    Columns that already have the compact dtype are left alone, so calling this
+    on a compact frame does not copy any data.
+    """
+    dtypes = {}
+    reordered = {}
+    for column in TRADES_CATEGORY_COLUMNS:
+        if column not in df.columns:
+            continue
+        dtype = df[column].dtype
+        if not isinstance(dtype, pd.CategoricalDtype):
+            dtypes[column] = 'category'
+        elif not dtype.categories.is_monotonic_increasing:
+            # Arrow 은 처음 나온 순서로 범주를 만들므로 경로와 무관하게 정렬된 범주로 통일
+            reordered[column] = df[column].cat.reorder_categories(dtype.categories.sort_values())
+    for column in TRADES_FLOAT32_COLUMNS:
+        if column in df.columns and df[column].dtype != np.float32:
+            dtypes[column] = np.float32
+    for column, dtype in TRADES_INT_COLUMNS.items():
+        if column in df.columns and df[column].dtype != dtype:
+            dtypes[column] = dtype if _fits_int(df[column], dtype) else np.float64
+    if reordered:
+        df = df.assign(**reordered)
+    return df.astype(dtypes) if dtypes else df
+
+def trades_memory_report(trades_df):
+    """Memory used by a trades frame, compact vs. the default read_sql dtypes."""
+    default_dtypes = {}
+    for column, dtype in trades_df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            default_dtypes[column] = object
+        elif dtype == np.float32:
+            default_dtypes[column] = np.float64
+        elif dtype.kind == 'i':
+            default_dtypes[column] = np.int64
+    default_df = trades_df.astype(default_dtypes)
+    rows = len(trades_df)
+    compact_bytes = int(trades_df.memory_usage(index=False, deep=True).sum())
+    default_bytes = int(default_df.memory_usage(index=False, deep=True).sum())
+    return {
+        'rows': rows,
+        'compact_bytes': compact_bytes,
+        'default_bytes': default_bytes,
+        'compact_per_trade': compact_bytes / rows if rows else 0.0,
+        'default_per_trade': default_bytes / rows if rows else 0.0,
+    }
+
+# 스트리밍 조회: 결과 집합 전체 대신 청크 하나만 pandas 객체로 메모리에 올림
+# (청크 한 행이 변환을 마칠 때까지 차지하는 대략적인 크기: DB 행 객체 + object 문자열 + 변환 중간값)
+LOAD_ROW_BYTES = 1536
+
+def load_chunk_rows():
+    # DASH_LOAD_BUFFER_MB: 조회 중 변환 전 청크가 차지할 수 있는 메모리 상한
+    budget = _env_float("DASH_LOAD_BUFFER_MB", 64) * 1024 * 1024
+    return max(1000, int(budget // LOAD_ROW_BYTES))
+
+def bulk_query_timeout_ms():
+    # 로컬 저장소/스냅샷 첫 동기화처럼 전체 테이블을 읽는 조회의 실행 시간 제한 (ms, MySQL)
+    return int(_env_float("MYSQL_BULK_QUERY_TIMEOUT_MS", 600000))
+
+def _stream_sql(query, params, error_message, engine=None, timeout_ms=None):
+    """Yield the rows of ``query`` (SQL text or a Core select) as DataFrame chunks.
+
+    Rows are fetched ``load_chunk_rows()`` at a time with ``stream_results`` on
+    ``engine`` (default: ``get_engine()``); on MySQL (PyMySQL) and SQLite this
+    is an unbuffered cursor, so only the current chunk is held in memory.
+    ``timeout_ms`` overrides MYSQL_QUERY_TIMEOUT_MS for this query.
     """
+    chunk_rows = load_chunk_rows()
+    statement = text(query) if isinstance(query, str) else query
+    options = {'stream_results': True, 'max_row_buffer': chunk_rows}
+    if timeout_ms is not None:
+        options['query_timeout_ms'] = timeout_ms
     try:
-        df = pd.read_sql_query(query, get_engine())
+        with (engine or get_engine()).connect() as conn:
+            conn = conn.execution_options(**options)
+            yield from pd.read_sql_query(
+                statement, conn, params=params or {}, chunksize=chunk_rows
+            )
     except SQLAlchemyError as exc:
-        raise RuntimeError("거래 데이터를 불러오는 중 오류가 발생했습니다.") from exc
+        raise RuntimeError(error_message) from exc
+
+def _collect_batches(batches, schema, categories=None):
+    # 청크별 Arrow 배치를 한 번에 pandas 로 변환하면서 Arrow 버퍼는 바로 해제
+    table = pa.Table.from_batches(batches, schema=schema)
+    batches.clear()
+    return table.to_pandas(categories=categories, split_blocks=True, self_destruct=True)
 
+def _convert_trades_chunk(df):
     # 날짜 열 변환
     df['timestamp']       = pd.to_datetime(df['timestamp'])
     df['close_timestamp'] = pd.to_datetime(df['close_timestamp'])
     
-    # 거래 기간 계산
-    df['duration'] = df.apply(
-        lambda row: (row['close_timestamp'] - row['timestamp']).total_seconds() / 60 
-        if not pd.isna(row['close_timestamp']) else None, 
-        axis=1
-    )
+    # 거래 기간 계산 (분, 미종료 거래는 NaN)
+    df['duration'] = (df['close_timestamp'] - df['timestamp']).dt.total_seconds() / 60
+    return pa.RecordBatch.from_pandas(df, schema=TRADES_BUFFER_SCHEMA, preserve_index=False)
+
+def _fetch_trades(where_clause="", params=None, engine=None):
+    query = TRADES_BASE_QUERY + where_clause
+    batches = [
+        _convert_trades_chunk(chunk)
+        for chunk in _stream_sql(
+            query, params, "거래 데이터를 불러오는 중 오류가 발생했습니다.", engine=engine
+        )
+    ]
+    df = _collect_batches(batches, TRADES_BUFFER_SCHEMA, TRADES_CATEGORY_COLUMNS)
+    return compact_trades_frame(df)
+
+def _stream_trades(where_clause="", params=None, timeout_ms=None):
+    # 청크마다 compact 거래 프레임을 만들어 넘김 (전체 결과를 한 번에 올리지 않음)
+    query = TRADES_BASE_QUERY + where_clause
+    for chunk in _stream_sql(
+        query, params, "거래 데이터를 불러오는 중 오류가 발생했습니다.", timeout_ms=timeout_ms
+    ):
+        batches = [_convert_trades_chunk(chunk)]
+        yield compact_trades_frame(
+            _collect_batches(batches, TRADES_BUFFER_SCHEMA, TRADES_CATEGORY_COLUMNS)
+        )
+
+def _open_ids_condition(open_ids, params):
+    # 캐시에 열린 상태로 남은 거래를 다시 읽는 조건 (결과 행 없이 취소/상태 변경된 거래 반영)
+    names = []
+    for i, trade_id in enumerate(open_ids):
+        params[f'open_id_{i}'] = int(trade_id)
+        names.append(f':open_id_{i}')
+    return f"t.id IN ({', '.join(names)})"
+
+def _merge_trades(cached_df, delta_df):
+    # 새로 들어오거나 변경된 거래(id 기준)로 기존 행을 교체
+    if delta_df.empty:
+        return cached_df
+    kept = cached_df[~cached_df['id'].isin(delta_df['id'])]
+    merged = pd.concat([kept, delta_df], ignore_index=True)
+    merged = merged.sort_values('timestamp', ascending=False, kind='mergesort').reset_index(drop=True)
+    # 범주 목록이 다른 프레임을 합치면 object 로 풀리므로 다시 범주형으로
+    return compact_trades_frame(merged)
+
+# 데이터 로딩 함수
+# 조회 함수는 작업 스레드에서도 실행되므로 스피너(화면 요소)를 만들지 않음
+@metered_cache(st.cache_data(ttl=60, show_spinner=False))  # 60초마다 증분 갱신 (날짜 범위별로 캐시)
+def load_trades_data(start, end):
+    return metered_load('load_trades_data', fetch_trades_window, start, end)
+
+def fetch_trades_window(start, end):
+    """Load trades opened in ``[start, end)`` incrementally.
+
+    The first call for a window (or a schema version mismatch) reads the whole
+    window. Later calls only fetch rows above the high-water marks: new trades
+    (``t.id``) and trades closed since the last load (``tr.close_timestamp``),
+    plus the trades still cached as open, whose status may change without a
+    result row.
+    """
+    if snapshot_enabled():
+        sync_trades_snapshot()
+        return read_trades_snapshot(start, end)
+
+    window_clause = "t.timestamp >= :start AND t.timestamp < :end"
+    window_params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime()}
+
+    fingerprint = probe_data_fingerprint()['trades']
+    state = get_trades_state()
+    with state['lock']:
+        key = (start, end)
+        entry = state['windows'].get(key)
+        if (
+            entry is not None
+            and entry['schema_version'] == TRADES_SCHEMA_VERSION
+            and entry['fingerprint'] == fingerprint
+        ):
+            record_probe('trades', True)
+            state['windows'].move_to_end(key)
+            return entry['df']
+        record_probe('trades', False)
+        if entry is None or entry['schema_version'] != TRADES_SCHEMA_VERSION:
+            df = _fetch_trades(f"WHERE {window_clause} ORDER BY t.timestamp DESC", window_params)
+        else:
+            cached_df = entry['df']
+            conditions = ["t.id > :max_id"]
+            params = dict(window_params)
+            params['max_id'] = int(entry['max_id']) if entry['max_id'] is not None else -1
+            if entry['max_close_timestamp'] is not None:
+                # 같은 시각에 늦게 기록된 결과도 잡기 위해 >= 사용 (중복은 병합 시 제거)
+                conditions.append("tr.close_timestamp >= :max_close_timestamp")
+                params['max_close_timestamp'] = entry['max_close_timestamp'].to_pydatetime()
+            else:
+                conditions.append("tr.close_timestamp IS NOT NULL")
+            open_ids = cached_df.loc[cached_df['status'] == 'open', 'id'].tolist()
+            if open_ids:
+                conditions.append(_open_ids_condition(open_ids, params))
+            delta_df = _fetch_trades(
+                f"WHERE {window_clause} AND ({' OR '.join(conditions)})", params
+            )
+            if list(delta_df.columns) != list(cached_df.columns):
+                df = _fetch_trades(f"WHERE {window_clause} ORDER BY t.timestamp DESC", window_params)
+            else:
+                df = _merge_trades(cached_df, delta_df)
+
+        max_close = df['close_timestamp'].max() if not df.empty else pd.NaT
+        state['windows'][key] = {
+            'schema_version': TRADES_SCHEMA_VERSION,
+            'df': df,
+            'max_id': df['id'].max() if not df.empty else None,
+            'max_close_timestamp': None if pd.isna(max_close) else max_close,
+            'fingerprint': fingerprint,
+        }
+        state['windows'].move_to_end(key)
+        while len(state['windows']) > TRADES_STATE_MAX_WINDOWS:
+            state['windows'].popitem(last=False)
+        return df
+
+@metered_cache(st.cache_data(ttl=60, show_spinner=False))
+def load_active_trade():
+    return metered_load('load_active_trade', fetch_active_trade)
+
+def fetch_active_trade():
+    # 날짜 범위와 무관하게 가장 최근의 오픈된 거래 1건만 조회
+    df = _fetch_trades("WHERE t.status = 'open' ORDER BY t.timestamp DESC LIMIT 1")
     return df
 
-@st.cache_data(ttl=60)
-def load_account_history():
+@metered_cache(st.cache_data(ttl=60, show_spinner=False))
+def load_account_history(start, end):
+    return metered_load('load_account_history', fetch_account_window, start, end)
+
+def fetch_account_window(start, end):
+    if snapshot_enabled():
+        sync_account_snapshot()
+        return read_account_snapshot(start, end)
+
     query = """
     SELECT timestamp, balance, equity, unrealized_pnl
     FROM account_history
+    WHERE timestamp >= :start AND timestamp < :end
     ORDER BY timestamp
     """
-    try:
-        df = pd.read_sql_query(query, get_engine())
-    except SQLAlchemyError as exc:
-        raise RuntimeError("계정 이력을 불러오는 중 오류가 발생했습니다.") from exc
+    params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime()}
+    batches = [
+        _convert_account_chunk(chunk)
+        for chunk in _stream_sql(query, params, "계정 이력을 불러오는 중 오류가 발생했습니다.")
+    ]
+    return _collect_batches(batches, ACCOUNT_ARROW_SCHEMA)
+
+def _convert_account_chunk(df):
     df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+    return pa.RecordBatch.from_pandas(df, schema=ACCOUNT_ARROW_SCHEMA, preserve_index=False)
 
-# 거래 성과 통계 계산 함수
-def calculate_performance_stats(trades_df):
-    if trades_df.empty:
-        return {
-            'total_trades': 0,
-            'profitable_trades': 0,
-            'losing_trades': 0,
-            'win_rate': 0,
-            'avg_profit': 0,
-            'avg_loss': 0,
-            'total_pnl': 0,
-            'max_profit': 0,
-            'max_loss': 0,
-            'avg_duration': 0,
-            'long_win_rate': 0,
-            'short_win_rate': 0,
-            'total_long': 0,
-            'total_short': 0
-        }
-    
-    # 닫힌 거래만 필터링
-    closed_trades = trades_df[trades_df['status'] == 'closed']
-    if closed_trades.empty:
-        return {
-            'total_trades': 0,
-            'profitable_trades': 0,
-            'losing_trades': 0,
-            'win_rate': 0,
-            'avg_profit': 0,
-            'avg_loss': 0,
-            'total_pnl': 0,
-            'max_profit': 0,
-            'max_loss': 0,
-            'avg_duration': 0,
-            'long_win_rate': 0,
-            'short_win_rate': 0,
-            'total_long': 0,
-            'total_short': 0
-        }
-    
-    # 수익 거래와 손실 거래 분리
-    profitable_trades = closed_trades[closed_trades['pnl'] > 0]
-    losing_trades = closed_trades[closed_trades['pnl'] <= 0]
-    
-    # 방향별 거래 필터링
-    long_trades = closed_trades[closed_trades['action'] == 'long']
-    short_trades = closed_trades[closed_trades['action'] == 'short']
-    
-    # 방향별 수익 거래
-    long_profitable = long_trades[long_trades['pnl'] > 0]
-    short_profitable = short_trades[short_trades['pnl'] > 0]
-    
-    # 통계 계산
-    total_trades = len(closed_trades)
-    profitable_count = len(profitable_trades)
-    losing_count = len(losing_trades)
-    win_rate = profitable_count / total_trades if total_trades > 0 else 0
-    
-    avg_profit = profitable_trades['pnl'].mean() if not profitable_trades.empty else 0
-    avg_loss = losing_trades['pnl'].mean() if not losing_trades.empty else 0
-    total_pnl = closed_trades['pnl'].sum()
-    
-    max_profit = profitable_trades['pnl'].max() if not profitable_trades.empty else 0
-    max_loss = losing_trades['pnl'].min() if not losing_trades.empty else 0
-    
-    avg_duration = closed_trades['duration'].mean() if 'duration' in closed_trades.columns else 0
-    
-    long_win_rate = len(long_profitable) / len(long_trades) if len(long_trades) > 0 else 0
-    short_win_rate = len(short_profitable) / len(short_trades) if len(short_trades) > 0 else 0
-    
-    return {
-        'total_trades': total_trades,
-        'profitable_trades': profitable_count,
-        'losing_trades': losing_count,
-        'win_rate': win_rate,
-        'avg_profit': avg_profit,
-        'avg_loss': avg_loss,
-        'total_pnl': total_pnl,
-        'max_profit': max_profit,
-        'max_loss': max_loss,
-        'avg_duration': avg_duration,
-        'long_win_rate': long_win_rate,
-        'short_win_rate': short_win_rate,
-        'total_long': len(long_trades),
-        'total_short': len(short_trades)
-    }
+# 로컬 컬럼형 스냅샷 (Arrow IPC 파일, 월 단위 파티션)
+SNAPSHOT_FORMAT_VERSION = 2
 
-# 시간대별 성과 분석
-def analyze_time_performance(trades_df):
-    if trades_df.empty:
-        return pd.DataFrame()
+# 월 파티션당 계정 이력 조각 파일이 이 개수를 넘으면 하나로 합침
+SNAPSHOT_MAX_ACCOUNT_PARTS = 16
 
-    # ① copy() 추가
-    closed_trades = trades_df[trades_df['status']=='closed'].copy()
-    if closed_trades.empty:
-        return pd.DataFrame()
-
-    closed_trades['hour']      = closed_trades['timestamp'].dt.hour
-    closed_trades['time_slot'] = (closed_trades['hour']//4)*4
-    closed_trades['time_range']= closed_trades['time_slot'].apply(
-                                    lambda x: f"{x:02d}-{(x+4)%24:02d}"
-                                 )
-
-    # ② observed=False 명시
-    time_performance = closed_trades.groupby('time_range', observed=False).agg({
-        'id': 'count',
-        'pnl': ['sum', 'mean', lambda x: (x>0).sum()/len(x) if len(x)>0 else 0]
-    }).reset_index()
-
-    time_performance.columns = [
-        'time_range', 'trade_count', 'total_pnl', 'avg_pnl', 'win_rate'
-    ]
-    return time_performance
+TRADES_ARROW_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('timestamp', pa.timestamp('ns')),
+    ('action', pa.string()),
+    ('entry_price', pa.float64()),
+    ('amount', pa.float64()),
+    ('order_size', pa.float64()),
+    ('leverage', pa.int64()),
+    ('stop_loss', pa.float64()),
+    ('take_profit', pa.float64()),
+    ('kelly_fraction', pa.float64()),
+    ('win_probability', pa.float64()),
+    ('volatility', pa.float64()),
+    ('status', pa.string()),
+    ('close_timestamp', pa.timestamp('ns')),
+    ('close_price', pa.float64()),
+    ('pnl', pa.float64()),
+    ('pnl_percentage', pa.float64()),
+    ('result', pa.string()),
+    ('duration', pa.float64()),
+])
 
+ACCOUNT_ARROW_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ns')),
+    ('balance', pa.float64()),
+    ('equity', pa.float64()),
+    ('unrealized_pnl', pa.float64()),
+])
 
-# 변동성 기반 성과 분석
-def analyze_volatility_performance(trades_df):
-    if trades_df.empty:
-        return pd.DataFrame()
-    
-    closed_trades = trades_df[trades_df['status'] == 'closed'].copy()  # <- .copy() 추가
-    if closed_trades.empty:
-        return pd.DataFrame()
-    
-    bins = [0, 1, 2, 3, float('inf')]
-    labels = ['0-1%', '1-2%', '2-3%', '3%+']
-    
-    closed_trades['volatility_range'] = pd.cut(closed_trades['volatility'], bins=bins, labels=labels, right=False)
-    
-    volatility_performance = closed_trades.groupby('volatility_range', observed=False).agg({
-        'id': 'count',
-        'pnl': ['sum', 'mean', lambda x: (x > 0).sum() / len(x) if len(x) > 0 else 0]
-    }).reset_index()
-    
-    volatility_performance.columns = ['volatility_range', 'trade_count', 'total_pnl', 'avg_pnl', 'win_rate']
-    return volatility_performance
+# 스트리밍 조회 버퍼: 디스크 스키마와 같되 float32 컬럼은 청크 단계에서 바로 줄임
+TRADES_BUFFER_SCHEMA = pa.schema([
+    pa.field(field.name, pa.float32()) if field.name in TRADES_FLOAT32_COLUMNS else field
+    for field in TRADES_ARROW_SCHEMA
+])
 
+def snapshot_dir():
+    # DASH_CACHE_DIR 을 지정한 경우에만 스냅샷 사용 (기본: DB 증분/범위 조회)
+    return os.getenv("DASH_CACHE_DIR", "")
 
-# 켈리 비율 기반 성과 분석
-def analyze_kelly_performance(trades_df):
+def snapshot_enabled():
+    return bool(snapshot_dir())
+
+def _snapshot_version():
+    # 포맷/스키마 버전과 원본 DB(비밀번호 제외)가 같아야 스냅샷을 재사용
+    url = get_engine().url
+    source = url.set(password=None).render_as_string(hide_password=True)
+    return f"{SNAPSHOT_FORMAT_VERSION}:{TRADES_SCHEMA_VERSION}:{source}"
+
+@st.cache_resource
+def get_snapshot_lock():
+    return threading.Lock()
+
+def _manifest_path():
+    return os.path.join(snapshot_dir(), 'manifest.json')
+
+def _read_manifest():
+    try:
+        with open(_manifest_path(), encoding='utf-8') as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('version') != _snapshot_version():
+        # 버전이 다르면 기존 파일을 버리고 처음부터 다시 만듦
+        for table in ('trades', 'account_history'):
+            shutil.rmtree(os.path.join(snapshot_dir(), table), ignore_errors=True)
+        manifest = {'version': _snapshot_version(), 'trades': {}, 'account_history': {}}
+    return manifest
+
+def clear_snapshot():
+    """Delete the snapshot manifest and partitions; the next sync rebuilds them."""
+    with get_snapshot_lock():
+        for table in ('trades', 'account_history'):
+            shutil.rmtree(os.path.join(snapshot_dir(), table), ignore_errors=True)
+        try:
+            os.remove(_manifest_path())
+        except FileNotFoundError:
+            pass
+
+def _write_manifest(manifest):
+    _atomic_write(_manifest_path(), lambda path: _write_json(path, manifest))
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as fp:
+        json.dump(data, fp)
+
+def _atomic_write(path, writer):
+    # 임시 파일에 쓴 뒤 교체하여 읽는 쪽이 쓰다 만 파일을 보지 않도록 함
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    writer(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_arrow(path, df, schema):
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    def writer(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, schema) as ipc_writer:
+                ipc_writer.write_table(table)
+
+    _atomic_write(path, writer)
+
+def _read_arrow(paths, schema, categories=None):
+    # 메모리 맵으로 읽어 파일 내용을 복사 없이 Arrow 테이블로 사용
+    # (categories 컬럼은 문자열 객체를 만들지 않고 바로 pandas 범주형으로 변환)
+    tables = []
+    for path in paths:
+        with pa.memory_map(path, 'r') as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    if not tables:
+        return schema.empty_table().to_pandas(categories=categories)
+    return pa.concat_tables(tables).to_pandas(categories=categories)
+
+def _month_key(ts):
+    return ts.strftime('%Y-%m')
+
+def _window_months(start, end):
+    # [start, end) 에 걸치는 월 파티션 이름
+    last = end - pd.Timedelta(microseconds=1)
+    return [_month_key(ts) for ts in pd.period_range(start, last, freq='M').to_timestamp()]
+
+def _trades_partition_path(month):
+    return os.path.join(snapshot_dir(), 'trades', f'{month}.arrow')
+
+def _account_partition_dir(month):
+    return os.path.join(snapshot_dir(), 'account_history', month)
+
+def _trades_watermarks(df):
+    max_close = df['close_timestamp'].max() if not df.empty else pd.NaT
+    return {
+        'max_id': int(df['id'].max()) if not df.empty else None,
+        'max_close_timestamp': None if pd.isna(max_close) else max_close.isoformat(),
+    }
+
+def _write_trades_partitions(df):
+    for month, part in df.groupby(df['timestamp'].dt.strftime('%Y-%m')):
+        path = _trades_partition_path(month)
+        if os.path.exists(path):
+            part = _merge_trades(
+                _read_arrow([path], TRADES_ARROW_SCHEMA, TRADES_CATEGORY_COLUMNS), part
+            )
+        _write_arrow(path, part, TRADES_ARROW_SCHEMA)
+
+def _advance_trades_watermarks(marks, df):
+    chunk_marks = _trades_watermarks(df)
+    if marks.get('max_id') is None or chunk_marks['max_id'] > marks['max_id']:
+        marks['max_id'] = chunk_marks['max_id']
+    if chunk_marks['max_close_timestamp'] is not None and (
+        marks.get('max_close_timestamp') is None
+        or chunk_marks['max_close_timestamp'] > marks['max_close_timestamp']
+    ):
+        marks['max_close_timestamp'] = chunk_marks['max_close_timestamp']
+    # 스냅샷에 열린 상태로 저장된 거래 id (다음 동기화에서 상태가 바뀌었는지 다시 읽음)
+    open_ids = set(marks.get('open_ids', [])).difference(df['id'].tolist())
+    open_ids.update(df.loc[df['status'] == 'open', 'id'].tolist())
+    marks['open_ids'] = sorted(int(trade_id) for trade_id in open_ids)
+
+def sync_trades_snapshot():
+    """Bring the on-disk trades snapshot up to date (full build or delta).
+
+    Rows are streamed in ``DASH_LOAD_BUFFER_MB`` sized chunks and each chunk is
+    merged into its month partitions before the next one is read. A delta
+    also re-reads the trades stored as open, whose status may change without
+    a result row.
+    """
+    fingerprint = probe_data_fingerprint()['trades']
+    with get_snapshot_lock():
+        manifest = _read_manifest()
+        marks = manifest['trades']
+        if 'max_id' in marks:
+            if marks.get('fingerprint') == fingerprint:
+                record_probe('trades', True)
+                return
+            record_probe('trades', False)
+
+        if marks.get('max_id') is None and marks.get('max_close_timestamp') is None:
+            # 첫 구축: id 오름차순으로 읽어 중단되어도 다음 동기화가 이어서 진행
+            where = "ORDER BY t.id"
+            params = {}
+        else:
+            conditions = ["t.id > :max_id"]
+            params = {'max_id': marks['max_id'] if marks['max_id'] is not None else -1}
+            if marks['max_close_timestamp'] is not None:
+                conditions.append("tr.close_timestamp >= :max_close_timestamp")
+                params['max_close_timestamp'] = pd.Timestamp(marks['max_close_timestamp']).to_pydatetime()
+            else:
+                conditions.append("tr.close_timestamp IS NOT NULL")
+            if marks.get('open_ids'):
+                conditions.append(_open_ids_condition(marks['open_ids'], params))
+            where = "WHERE " + " OR ".join(conditions) + " ORDER BY t.id"
+        marks.setdefault('max_id', None)
+        marks.setdefault('max_close_timestamp', None)
+        marks.setdefault('open_ids', [])
+        # 첫 구축(또는 중단 후 이어서 받기)은 전체 테이블을 읽으므로 대량 조회 제한 시간 적용
+        for df in _stream_trades(where, params, timeout_ms=bulk_query_timeout_ms()):
+            if df.empty:
+                continue
+            _write_trades_partitions(df)
+            # 청크를 파티션에 반영한 뒤에만 기준점을 올림 (지문은 모두 끝난 뒤 기록)
+            _advance_trades_watermarks(marks, df)
+            _write_manifest(manifest)
+        marks['fingerprint'] = fingerprint
+        _write_manifest(manifest)
+
+def read_trades_snapshot(start, end):
+    paths = [
+        path for path in map(_trades_partition_path, _window_months(start, end))
+        if os.path.exists(path)
+    ]
+    df = _read_arrow(paths, TRADES_ARROW_SCHEMA, TRADES_CATEGORY_COLUMNS)
+    df = df[(df['timestamp'] >= start) & (df['timestamp'] < end)]
+    df = df.sort_values('timestamp', ascending=False, kind='mergesort').reset_index(drop=True)
+    return compact_trades_frame(df)
+
+def _append_account_parts(df, marks):
+    for month, part in df.groupby(df['timestamp'].dt.strftime('%Y-%m')):
+        marks['next_part'] = marks.get('next_part', 0) + 1
+        part_dir = _account_partition_dir(month)
+        _write_arrow(
+            os.path.join(part_dir, f"part-{marks['next_part']:08d}.arrow"),
+            part, ACCOUNT_ARROW_SCHEMA,
+        )
+        parts = sorted(glob.glob(os.path.join(part_dir, 'part-*.arrow')))
+        if len(parts) > SNAPSHOT_MAX_ACCOUNT_PARTS:
+            # 조각 파일이 많아지면 한 파일로 합쳐 읽기 비용을 유지
+            marks['next_part'] += 1
+            _write_arrow(
+                os.path.join(part_dir, f"part-{marks['next_part']:08d}.arrow"),
+                _read_arrow(parts, ACCOUNT_ARROW_SCHEMA), ACCOUNT_ARROW_SCHEMA,
+            )
+            for path in parts:
+                os.remove(path)
+
+def sync_account_snapshot():
+    """Append account_history rows newer than the snapshot to the on-disk parts."""
+    query = """
+    SELECT timestamp, balance, equity, unrealized_pnl
+    FROM account_history
+    {where}
+    ORDER BY timestamp
+    """
+    fingerprint = probe_data_fingerprint()['account_history']
+    with get_snapshot_lock():
+        manifest = _read_manifest()
+        marks = manifest['account_history']
+        if 'max_timestamp' in marks:
+            unchanged = marks.get('fingerprint') == fingerprint
+            record_probe('account_history', unchanged)
+            if unchanged:
+                return
+        marks['fingerprint'] = fingerprint
+        params = {}
+        where = ""
+        if marks.get('max_timestamp'):
+            where = "WHERE timestamp > :max_timestamp"
+            params['max_timestamp'] = pd.Timestamp(marks['max_timestamp']).to_pydatetime()
+        marks.setdefault('max_timestamp', None)
+        # 첫 동기화는 수년치 이력일 수 있으므로 청크마다 바로 파티션에 기록
+        for df in _stream_sql(
+            query.format(where=where), params, "계정 이력을 불러오는 중 오류가 발생했습니다.",
+            timeout_ms=bulk_query_timeout_ms(),
+        ):
+            if df.empty:
+                continue
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            _append_account_parts(df, marks)
+            # 시각 오름차순이므로 청크마다 기준점을 저장해 중단되어도 다음 동기화가 이어서 진행
+            marks['max_timestamp'] = df['timestamp'].max().isoformat()
+            _write_manifest(manifest)
+        _write_manifest(manifest)
+
+def read_account_snapshot(start, end):
+    paths = []
+    for month in _window_months(start, end):
+        paths.extend(sorted(glob.glob(os.path.join(_account_partition_dir(month), 'part-*.arrow'))))
+    df = _read_arrow(paths, ACCOUNT_ARROW_SCHEMA)
+    df = df[(df['timestamp'] >= start) & (df['timestamp'] < end)]
+    return df.sort_values('timestamp', kind='mergesort').reset_index(drop=True)
+
+# 잔액 차트 다운샘플링 기본 포인트 수
+ACCOUNT_CHART_POINTS = 2000
+
+# LTTB 사용 시 SQL 버킷을 목표 포인트 수보다 몇 배 더 촘촘하게 가져올지
+LTTB_OVERSAMPLE = 4
+
+ACCOUNT_VALUE_COLUMNS = ['balance', 'equity', 'unrealized_pnl']
+
+def _bucket_sql(column, width_param):
+    # DB 종류별로 '에포크 초 / 버킷 폭' 정수 버킷 식을 생성
+    dialect = get_engine().dialect.name
+    if dialect == 'mysql':
+        return f"FLOOR(UNIX_TIMESTAMP({column}) / :{width_param})"
+    if dialect == 'sqlite':
+        return f"(CAST(strftime('%s', {column}) AS INTEGER) / :{width_param})"
+    return f"FLOOR(EXTRACT(EPOCH FROM {column}) / :{width_param})"
+
+def account_bucket_seconds(start, end, target_points):
+    """Bucket width (seconds) that yields roughly ``target_points`` buckets."""
+    span = max((end - start).total_seconds(), 1)
+    return max(int(np.ceil(span / max(target_points, 1))), 1)
+
+@metered_cache(st.cache_data(ttl=60, show_spinner=False))
+def load_account_history_downsampled(start, end, target_points=ACCOUNT_CHART_POINTS):
+    """Load ``account_history`` aggregated into time buckets in SQL.
+
+    Each bucket carries min/max/last of balance, equity and unrealized_pnl.
+    The ``timestamp``/``balance``/``equity``/``unrealized_pnl`` columns hold
+    the last sample of the bucket, so the frame can stand in for the raw one.
+    """
+    width = account_bucket_seconds(start, end, target_points)
+    bucket = _bucket_sql('timestamp', 'width')
+    aggregates = ",\n               ".join(
+        f"MIN({col}) AS {col}_min, MAX({col}) AS {col}_max" for col in ACCOUNT_VALUE_COLUMNS
+    )
+    query = f"""
+    SELECT b.bucket, b.samples, h.timestamp,
+           b.balance_min, b.balance_max, h.balance,
+           b.equity_min, b.equity_max, h.equity,
+           b.unrealized_pnl_min, b.unrealized_pnl_max, h.unrealized_pnl
+    FROM (
+        SELECT {bucket} AS bucket, COUNT(*) AS samples, MAX(timestamp) AS ts_last,
+               {aggregates}
+        FROM account_history
+        WHERE timestamp >= :start AND timestamp < :end
+        GROUP BY bucket
+    ) b
+    JOIN account_history h ON h.timestamp = b.ts_last
+    ORDER BY b.bucket
+    """
+    params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime(), 'width': width}
+    try:
+        df = pd.read_sql_query(text(query), get_engine(), params=params)
+    except SQLAlchemyError as exc:
+        raise RuntimeError("계정 이력을 불러오는 중 오류가 발생했습니다.") from exc
+    # 같은 시각의 샘플이 여러 개면 조인 결과가 중복되므로 버킷당 1행만 유지
+    df = df.drop_duplicates('bucket', keep='last').reset_index(drop=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of ``n_out`` representative points."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # 첫/마지막 점은 항상 포함, 나머지는 n_out - 2개 버킷으로 분할
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # 이전 선택점, 다음 버킷 평균점과 이루는 삼각형 넓이가 최대인 점 선택
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+def bucket_account_frame(df, start, end, target_points=ACCOUNT_CHART_POINTS):
+    """In-memory equivalent of ``load_account_history_downsampled`` for a raw frame."""
+    width = account_bucket_seconds(start, end, target_points)
+    seconds = df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64) // 1_000_000_000
+    grouped = df.groupby(seconds // width, sort=True)
+    aggregated = grouped.agg(
+        samples=('timestamp', 'size'),
+        timestamp=('timestamp', 'last'),
+        **{
+            f"{col}_{stat}": (col, stat)
+            for col in ACCOUNT_VALUE_COLUMNS for stat in ('min', 'max')
+        },
+        **{col: (col, 'last') for col in ACCOUNT_VALUE_COLUMNS},
+    )
+    aggregated.index.name = 'bucket'
+    columns = ['bucket', 'samples', 'timestamp']
+    for col in ACCOUNT_VALUE_COLUMNS:
+        columns += [f"{col}_min", f"{col}_max", col]
+    return aggregated.reset_index()[columns]
+
+def downsample_account_history(start, end, target_points=ACCOUNT_CHART_POINTS, use_lttb=False,
+                               account_df=None):
+    # 버킷 집계(SQL, 또는 메모리에 원본이 있으면 pandas) 후 선택적으로 LTTB로 한 번 더 줄임
+    points = target_points * LTTB_OVERSAMPLE if use_lttb else target_points
+    if account_df is not None:
+        df = bucket_account_frame(account_df, start, end, points)
+    else:
+        df = load_account_history_downsampled(start, end, points)
+    if not use_lttb or len(df) <= target_points:
+        return df
+    x = df['timestamp'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    idx = lttb_indices(x, df['balance'].to_numpy(), target_points)
+    return df.iloc[idx].reset_index(drop=True)
+
+# 변경 감지 프로브: 인덱스만 읽는 가벼운 집계로 데이터가 바뀌었는지 확인
+FINGERPRINT_QUERY = """
+SELECT (SELECT MAX(id) FROM trades) AS trades_max_id,
+       (SELECT COUNT(*) FROM trades) AS trades_count,
+       (SELECT COUNT(*) FROM trades WHERE status = 'open') AS trades_open_count,
+       (SELECT COUNT(*) FROM trade_results) AS results_count,
+       (SELECT MAX(close_timestamp) FROM trade_results) AS results_max_close,
+       (SELECT MAX(timestamp) FROM account_history) AS account_max_timestamp
+"""
+
+# 같은 갱신 주기 안에서 여러 곳이 프로브를 호출해도 쿼리는 한 번만 실행
+FINGERPRINT_MAX_AGE_SECONDS = 2
+
+@st.cache_resource
+def get_probe_state():
+    return {
+        'lock': threading.Lock(),
+        'fingerprint': None,
+        'probed_at': 0.0,
+        'hits': {'trades': 0, 'account_history': 0},
+        'reloads': {'trades': 0, 'account_history': 0},
+    }
+
+def probe_data_fingerprint(allow_stale=False):
+    """Return ``{'trades': ..., 'account_history': ...}`` change fingerprints.
+
+    With ``allow_stale`` the last probed fingerprint is returned when the
+    database cannot be queried, so cached results keep being served.
+    """
+    state = get_probe_state()
+    with state['lock']:
+        if state['fingerprint'] is not None and time.monotonic() - state['probed_at'] < FINGERPRINT_MAX_AGE_SECONDS:
+            return state['fingerprint']
+        try:
+            with get_engine().connect() as conn:
+                row = conn.execute(text(FINGERPRINT_QUERY)).mappings().one()
+        except SQLAlchemyError as exc:
+            if allow_stale and state['fingerprint'] is not None:
+                logger.warning("데이터 변경 여부를 확인할 수 없어 마지막 확인 값을 사용합니다: %s", exc)
+                return state['fingerprint']
+            raise RuntimeError("데이터 변경 여부를 확인하는 중 오류가 발생했습니다.") from exc
+        fingerprint = {
+            'trades': [
+                row['trades_max_id'], row['trades_count'], row['trades_open_count'],
+                row['results_count'], str(row['results_max_close']),
+            ],
+            'account_history': [str(row['account_max_timestamp'])],
+        }
+        state['fingerprint'] = fingerprint
+        state['probed_at'] = time.monotonic()
+        return fingerprint
+
+def record_probe(table, unchanged):
+    # 재사용/재로딩 횟수를 집계해 DB 부하 절감 효과를 확인
+    state = get_probe_state()
+    with state['lock']:
+        counter = state['hits'] if unchanged else state['reloads']
+        counter[table] += 1
+        hits, reloads = state['hits'][table], state['reloads'][table]
+    if unchanged:
+        logger.debug("%s 변경 없음, 캐시 재사용 (재사용 %d / 재로딩 %d)", table, hits, reloads)
+    else:
+        logger.info("%s 변경 감지, 다시 불러옴 (재사용 %d / 재로딩 %d)", table, hits, reloads)
+
+# 백그라운드 데이터 갱신 (프로세스당 작업자 1개가 스냅샷을 갱신하고 세션은 읽기만 함)
+DataSnapshot = namedtuple(
+    'DataSnapshot',
+    ['version', 'trades_version', 'account_version', 'fingerprint', 'start', 'end',
+     'trades', 'account', 'active_trade', 'loaded_at', 'duration'],
+)
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} 환경 변수는 숫자여야 합니다.") from exc
+
+def snapshot_horizon():
+    # 작업자가 메모리에 유지하는 범위: 오늘 0시 기준 DASH_SNAPSHOT_DAYS 일 전 ~ 모레 0시
+    today = pd.Timestamp.now().normalize()
+    days = _env_float("DASH_SNAPSHOT_DAYS", 31)
+    return today - pd.Timedelta(days=days), today + pd.Timedelta(days=2)
+
+def snapshot_covers(snapshot, start, end):
+    return snapshot is not None and snapshot.start <= start and end <= snapshot.end
+
+def snapshot_trades(snapshot, start, end):
+    # 스냅샷 거래는 개장 시각 내림차순이므로 이진 탐색으로 행 범위를 잘라 복사 없이 참조
+    trades = snapshot.trades
+    ascending = trades['timestamp'].to_numpy()[::-1]
+    lo = len(ascending) - np.searchsorted(ascending, end.to_datetime64(), side='left')
+    hi = len(ascending) - np.searchsorted(ascending, start.to_datetime64(), side='left')
+    return trades.iloc[lo:hi]
+
+def snapshot_account(snapshot, start, end):
+    account = snapshot.account
+    return account[(account['timestamp'] >= start) & (account['timestamp'] < end)]
+
+# 동시 조회: 서로 독립적인 조회를 작은 스레드 풀에서 실행 (각 작업은 엔진 풀에서 별도 연결 사용)
+LOAD_WORKERS = 4
+
+# 조회별 제한 시간(초)과 표시 이름
+LOAD_TIMEOUTS = {
+    'trades': 30,
+    'account': 30,
+    'active_trade': 10,
+    'latest_account': 10,
+    'rollups': 120,
+}
+LOAD_LABELS = {
+    'trades': '거래 데이터',
+    'account': '계정 이력',
+    'active_trade': '활성 거래',
+    'latest_account': '현재 잔액',
+    'rollups': '롤업 테이블',
+}
+
+@st.cache_resource
+def get_load_pool():
+    """Process-wide thread pool for data loads plus the loads currently in flight."""
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(
+        _is_background_thread
+    )
+    return {
+        'executor': ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix='dash-load'),
+        'lock': threading.RLock(),
+        'inflight': {},
+    }
+
+def load_timeout(name):
+    # DASH_LOAD_TIMEOUT_SECONDS 를 지정하면 모든 조회에 같은 제한 시간 적용
+    return _env_float("DASH_LOAD_TIMEOUT_SECONDS", 0) or LOAD_TIMEOUTS[name]
+
+def _run_with_ctx(ctx, func, *args):
+    # st.cache_* 는 ScriptRunContext 가 없는 스레드에서 캐시를 읽거나 쓰지 않으므로
+    # (엔진/잠금도 매번 새로 만들어짐) 작업을 제출한 쪽의 컨텍스트를 붙여서 실행
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return func(*args)
+
+def submit_load(name, func, *args):
+    """Start ``func(*args)`` on the load pool, or join the same load already running."""
+    pool = get_load_pool()
+    key = (name, args)
+    with pool['lock']:
+        future = pool['inflight'].get(key)
+        if future is None:
+            future = pool['executor'].submit(_run_with_ctx, get_script_run_ctx(), func, *args)
+            pool['inflight'][key] = future
+
+            def forget(done, key=key):
+                with pool['lock']:
+                    if pool['inflight'].get(key) is done:
+                        del pool['inflight'][key]
+
+            future.add_done_callback(forget)
+    return future
+
+# 조회가 실패하거나 늦을 때 대신 보여줄 마지막 정상 결과 개수 (조회 이름/인자별)
+LAST_GOOD_MAX_ENTRIES = 8
+
+@st.cache_resource
+def get_last_good_loads():
+    """Most recent successful result per ``(load name, args)``, for serving while the DB is degraded."""
+    return {'lock': threading.Lock(), 'results': OrderedDict()}
+
+def _remember_good_load(key, result):
+    last_good = get_last_good_loads()
+    with last_good['lock']:
+        last_good['results'][key] = (result, time.time())
+        last_good['results'].move_to_end(key)
+        while len(last_good['results']) > LAST_GOOD_MAX_ENTRIES:
+            last_good['results'].popitem(last=False)
+
+def _stale_load(key):
+    last_good = get_last_good_loads()
+    with last_good['lock']:
+        return last_good['results'].get(key)
+
+# 이번 스크립트 실행에서 대신 표시한 마지막 정상 결과 중 가장 오래된 시점 (상단 안내에 사용)
+_stale_local = threading.local()
+
+def reset_stale_data():
+    _stale_local.loaded_at = {}
+
+def note_stale_data(name, loaded_at):
+    served = getattr(_stale_local, 'loaded_at', None)
+    if served is None:
+        served = _stale_local.loaded_at = {}
+    served[name] = min(served.get(name, loaded_at), loaded_at)
+
+def stale_data_loaded_at(name=None):
+    # name 을 주면 그 조회만, 없으면 모든 조회 중 가장 오래된 시점 (대신 표시한 결과가 없으면 None)
+    served = getattr(_stale_local, 'loaded_at', None) or {}
+    if name is not None:
+        return served.get(name)
+    return min(served.values(), default=None)
+
+def await_load(name, func, *args):
+    # 제한 시간을 넘기거나 실패하면 같은 조회의 마지막 정상 결과를 대신 반환하고,
+    # 그런 결과가 없을 때만 이 구역을 오류로 표시 (작업은 계속 진행되어 캐시를 채움)
+    timeout = load_timeout(name)
+    key = (name, args)
+    try:
+        result = submit_load(name, func, *args).result(timeout=timeout)
+    except Exception as exc:
+        # 화면 대기 시간 초과는 조회가 큰 것일 수 있으므로 차단기에 기록하지 않음
+        # (DB 가 응답하지 않으면 연결 오류/서버 실행 시간 초과가 handle_error 에서 기록됨)
+        timed_out = isinstance(exc, FutureTimeoutError)
+        stale = _stale_load(key)
+        if stale is None:
+            if timed_out:
+                raise RuntimeError(
+                    f"{LOAD_LABELS[name]} 조회가 {timeout:.0f}초 안에 끝나지 않았습니다."
+                ) from None
+            raise
+        logger.warning(
+            "%s 조회 실패, 마지막 정상 결과를 표시합니다: %s",
+            LOAD_LABELS[name], f"{timeout:.0f}초 초과" if timed_out else exc,
+        )
+        metric_inc('dash_stale_loads_total', load=name)
+        note_stale_data(name, stale[1])
+        return stale[0]
+    _remember_good_load(key, result)
+    return result
+
+def run_loads(loads):
+    """Run ``{name: (func, *args)}`` concurrently; return ``(results, errors)`` dicts."""
+    started = time.monotonic()
+    futures = {name: submit_load(name, *call) for name, call in loads.items()}
+    results, errors = {}, {}
+    for name, future in futures.items():
+        remaining = max(load_timeout(name) - (time.monotonic() - started), 0)
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            errors[name] = f"{load_timeout(name):.0f}초 안에 끝나지 않았습니다."
+        except Exception as exc:  # 한 조회의 실패가 다른 조회 결과를 막지 않도록
+            logger.warning("%s 조회에 실패했습니다.", LOAD_LABELS[name], exc_info=True)
+            errors[name] = str(exc)
+    return results, errors
+
+def describe_load_errors(errors):
+    return "; ".join(f"{LOAD_LABELS[name]}: {error}" for name, error in errors.items())
+
+def refresh_data_snapshot(state, force=False):
+    """Publish a new immutable snapshot, reloading only the tables that changed.
+
+    Changed tables (all tables with ``force``) are reloaded concurrently. When one load fails, the other
+    table is still published (the failed one keeps its previous data if the
+    horizon is unchanged) and the error is raised for the refresher to report.
+    """
+    started = time.perf_counter()
+    start, end = snapshot_horizon()
+    fingerprint = probe_data_fingerprint()
+    with state['lock']:
+        previous = state['snapshot']
+    same_horizon = previous is not None and (previous.start, previous.end) == (start, end)
+
+    trades_unchanged = (
+        not force and same_horizon and previous.fingerprint['trades'] == fingerprint['trades']
+    )
+    record_probe('trades', trades_unchanged)
+    account_unchanged = (
+        not force
+        and same_horizon
+        and previous.fingerprint['account_history'] == fingerprint['account_history']
+    )
+    record_probe('account_history', account_unchanged)
+    if trades_unchanged and account_unchanged:
+        # 아무것도 바뀌지 않았으면 기존 스냅샷(과 그 버전에 묶인 계산 결과)을 그대로 사용
+        return
+
+    loads = {}
+    if not trades_unchanged:
+        loads['trades'] = (metered_load, 'load_trades_data', fetch_trades_window, start, end)
+        loads['active_trade'] = (metered_load, 'load_active_trade', fetch_active_trade)
+        if bucket_aggregation_mode() == 'rollup':
+            # 다른 대시보드/리포트도 읽는 롤업 테이블을 세션 요청 없이 최신으로 유지
+            loads['rollups'] = (sync_rollups,)
+    if not account_unchanged:
+        loads['account'] = (
+            metered_load, 'load_account_history', fetch_account_window, start, end
+        )
+    results, errors = run_loads(loads)
+
+    trades_loaded = not trades_unchanged and not {'trades', 'active_trade'} & errors.keys()
+    account_loaded = not account_unchanged and 'account' not in errors
+    if not trades_loaded and not account_loaded:
+        raise RuntimeError(describe_load_errors(errors))
+    if not same_horizon and (not trades_loaded or not account_loaded):
+        # 범위가 바뀌었으면 이전 데이터로 채울 수 없으므로 직전 스냅샷을 유지
+        raise RuntimeError(describe_load_errors(errors))
+
+    if trades_loaded:
+        trades, active_trade = results['trades'], results['active_trade']
+        trades_version = (previous.trades_version + 1) if previous is not None else 1
+        trades_fingerprint = fingerprint['trades']
+    else:
+        trades, active_trade = previous.trades, previous.active_trade
+        trades_version = previous.trades_version
+        trades_fingerprint = previous.fingerprint['trades']
+
+    if account_loaded:
+        account = results['account']
+        account_version = (previous.account_version + 1) if previous is not None else 1
+        account_fingerprint = fingerprint['account_history']
+    else:
+        account = previous.account
+        account_version = previous.account_version
+        account_fingerprint = previous.fingerprint['account_history']
+
+    with state['lock']:
+        state['snapshot'] = DataSnapshot(
+            version=(previous.version + 1) if previous is not None else 1,
+            trades_version=trades_version,
+            account_version=account_version,
+            fingerprint={'trades': trades_fingerprint, 'account_history': account_fingerprint},
+            start=start,
+            end=end,
+            trades=trades,
+            account=account,
+            active_trade=active_trade,
+            loaded_at=time.time(),
+            duration=time.perf_counter() - started,
+        )
+    if errors:
+        # 실패한 테이블은 이전 데이터로 게시했고 다음 주기에 다시 시도
+        raise RuntimeError(describe_load_errors(errors))
+
+def _refresh_loop(state):
+    while True:
+        started = time.perf_counter()
+        force = state['reload'].is_set()
+        state['reload'].clear()
+        try:
+            # 로컬 저장소를 쓰면 먼저 원본에서 변경분을 복제한 뒤 스냅샷 갱신
+            if local_store_enabled():
+                sync_local_store()
+            refresh_data_snapshot(state, force=force)
+            state['last_error'] = None
+            state['succeeded_at'] = time.time()
+        except Exception as exc:  # 실패해도 직전 스냅샷을 계속 제공
+            logger.exception("데이터 스냅샷 갱신에 실패했습니다.")
+            state['last_error'] = str(exc)
+            metric_inc('dash_refresh_failures_total')
+        finally:
+            metric_observe('dash_refresh_seconds', time.perf_counter() - started)
+            # 첫 시도가 끝나면 (실패해도) 세션이 더 기다리지 않도록 표시
+            # (갱신 중에 전체 다시 불러오기가 요청되었으면 다음 갱신이 끝날 때까지 대기)
+            if not state['reload'].is_set():
+                state['ready'].set()
+        state['wake'].wait(state['interval'])
+        state['wake'].clear()
+
+def _is_background_thread(record):
+    # 작업자 스레드에서 캐시 함수를 호출할 때 나오는 ScriptRunContext 경고 억제
+    return not threading.current_thread().name.startswith('dash-')
+
+@st.cache_resource
+def get_data_refresher():
+    """Start the per-process refresher thread and return its shared state."""
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(
+        _is_background_thread
+    )
+    state = {
+        'lock': threading.Lock(),
+        'snapshot': None,
+        'ready': threading.Event(),
+        'reload': threading.Event(),
+        'wake': threading.Event(),
+        'last_error': None,
+        'succeeded_at': None,
+        'interval': _env_float("DASH_REFRESH_SECONDS", 60),
+    }
+    thread = threading.Thread(
+        target=_refresh_loop, args=(state,), name='dash-data-refresher', daemon=True
+    )
+    # 캐시된 공유 자원(엔진, 잠금, 상태)을 작업 스레드에서도 같은 객체로 받도록 컨텍스트 연결
+    add_script_run_ctx(thread)
+    thread.start()
+    state['thread'] = thread
+    return state
+
+def request_full_refresh():
+    # 변경 감지와 무관하게 모든 테이블을 다시 읽도록 요청하고 갱신 스레드를 바로 깨움
+    # (세션은 current_data_snapshot 에서 새 스냅샷이 준비될 때까지 기다림)
+    state = get_data_refresher()
+    state['reload'].set()
+    state['ready'].clear()
+    state['wake'].set()
+
+def current_data_snapshot(wait_seconds=None):
+    # 첫 스냅샷이 준비될 때까지만 기다리고 이후에는 즉시 최신 스냅샷 반환
+    state = get_data_refresher()
+    if wait_seconds is None:
+        wait_seconds = _env_float("DASH_SNAPSHOT_WAIT_SECONDS", 30)
+    state['ready'].wait(timeout=wait_seconds)
+    with state['lock']:
+        return state['snapshot']
+
+# 분석 버킷 정의 (구간은 [하한, 상한), pandas 계산과 SQL 집계가 함께 사용)
+TIME_SLOT_HOURS = 4
+VOLATILITY_BINS = [0, 1, 2, 3, float('inf')]
+VOLATILITY_LABELS = ['0-1%', '1-2%', '2-3%', '3%+']
+KELLY_BINS = [0, 0.02, 0.05, 0.08, 0.1, 1.0]
+KELLY_LABELS = ['0-2%', '2-5%', '5-8%', '8-10%', '10%+']
+
+PERFORMANCE_COLUMNS = ['trade_count', 'total_pnl', 'avg_pnl', 'win_rate']
+
+def _empty_performance_stats():
+    return {
+        'total_trades': 0,
+        'profitable_trades': 0,
+        'losing_trades': 0,
+        'win_rate': 0,
+        'avg_profit': 0,
+        'avg_loss': 0,
+        'total_pnl': 0,
+        'max_profit': 0,
+        'max_loss': 0,
+        'avg_duration': 0,
+        'long_win_rate': 0,
+        'short_win_rate': 0,
+        'total_long': 0,
+        'total_short': 0
+    }
+
+def _bucket_codes(values, bins):
+    # pd.cut(..., right=False) 와 같은 구간 코드, 범위 밖/NaN 은 -1
+    # 경계도 값과 같은 정밀도로 비교 (float32 값 0.02 가 아래 구간으로 밀리지 않도록)
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        values = values.astype(np.float64)
+    codes = np.searchsorted(np.asarray(bins, dtype=values.dtype), values, side='right') - 1
+    codes[(codes >= len(bins) - 1) | np.isnan(values)] = -1
+    return codes
+
+def _bucket_performance(codes, weights, n_buckets):
+    # 버킷별 trade_count / total_pnl / avg_pnl / win_rate 를 np.bincount 로 계산
+    # (범위 밖 코드 -1 은 마지막 여분 버킷에 모았다가 버림)
+    pnl_filled, has_pnl, wins = weights
+    codes = np.where(codes >= 0, codes, n_buckets)
+    size = n_buckets + 1
+
+    trade_count = np.bincount(codes, minlength=size)[:n_buckets]
+    total_pnl = np.bincount(codes, weights=pnl_filled, minlength=size)[:n_buckets]
+    pnl_count = np.bincount(codes, weights=has_pnl, minlength=size)[:n_buckets]
+    win_count = np.bincount(codes, weights=wins, minlength=size)[:n_buckets]
+    return _bucket_rates(trade_count, total_pnl, pnl_count, win_count)
+
+def _bucket_rates(trade_count, total_pnl, pnl_count, win_count):
+    # 버킷별 합계에서 avg_pnl / win_rate 계산 (pandas/SQL 집계 공통)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_pnl = np.where(pnl_count > 0, total_pnl / pnl_count, np.nan)
+        win_rate = np.where(trade_count > 0, win_count / trade_count, 0.0)
+    return trade_count, total_pnl, avg_pnl, win_rate
+
+def _performance_frame(label_column, labels, values):
+    frame = pd.DataFrame({label_column: labels, **dict(zip(PERFORMANCE_COLUMNS, values))})
+    return frame.astype({'trade_count': np.int64})
+
+def _time_slot_labels():
+    return [
+        f"{slot * TIME_SLOT_HOURS:02d}-{(slot * TIME_SLOT_HOURS + TIME_SLOT_HOURS) % 24:02d}"
+        for slot in range(24 // TIME_SLOT_HOURS)
+    ]
+
+def _bucket_analysis_frames(time_values, volatility_values, kelly_values):
+    # 시간대 - 거래가 있는 시간대만 표시
+    time_performance = _performance_frame('time_range', _time_slot_labels(), time_values)
+    time_performance = time_performance[time_performance['trade_count'] > 0].reset_index(drop=True)
+
+    # 변동성 / 켈리 비율 - 모든 구간 표시 (거래 없는 구간 포함)
+    volatility_performance = _performance_frame(
+        'volatility_range',
+        pd.Categorical(VOLATILITY_LABELS, categories=VOLATILITY_LABELS, ordered=True),
+        volatility_values,
+    )
+    kelly_performance = _performance_frame(
+        'kelly_range',
+        pd.Categorical(KELLY_LABELS, categories=KELLY_LABELS, ordered=True),
+        kelly_values,
+    )
+    return {
+        'time': time_performance,
+        'volatility': volatility_performance,
+        'kelly': kelly_performance,
+    }
+
+# 거래 성과 분석 엔진 (닫힌 거래 필터를 한 번만 적용하고 모든 통계를 한 번에 계산)
+def compute_trade_analytics(trades_df, buckets=True):
+    """Compute the summary stats and the time/volatility/kelly breakdowns.
+
+    Returns a dict with ``stats`` (same keys as ``calculate_performance_stats``)
+    and ``time``, ``volatility`` and ``kelly`` DataFrames shaped like the
+    ``analyze_*_performance`` results. With ``buckets=False`` only ``stats``
+    is computed (the breakdowns come from ``fetch_bucket_performance``).
+    """
+    empty = {
+        'stats': _empty_performance_stats(),
+        'time': pd.DataFrame(),
+        'volatility': pd.DataFrame(),
+        'kelly': pd.DataFrame(),
+    }
     if trades_df.empty:
-        return pd.DataFrame()
+        return empty
+
+    closed_mask = (trades_df['status'] == 'closed').to_numpy()
+    if not closed_mask.any():
+        return empty
+
+    pnl = trades_df['pnl'].to_numpy(dtype=np.float64)[closed_mask]
+    wins = pnl > 0
+    losses = pnl <= 0
+
+    # 방향 코드: 0 = long, 1 = short, 2 = 기타
+    action_codes, action_values = pd.factorize(trades_df['action'])
+    action_codes = action_codes[closed_mask]
+    direction_map = np.array(
+        [0 if value == 'long' else 1 if value == 'short' else 2 for value in action_values] + [2],
+        dtype=np.int64,
+    )
+    direction = direction_map[action_codes]
+
+    has_pnl = ~np.isnan(pnl)
+    pnl_filled = np.where(has_pnl, pnl, 0.0)
+    # bincount 가중치는 float64 로 한 번만 변환해 구간 분석 전체에서 재사용
+    weights = (pnl_filled, has_pnl.astype(np.float64), wins.astype(np.float64))
+    dir_count = np.bincount(direction, minlength=3)
+    dir_wins = np.bincount(direction, weights=weights[2], minlength=3)
+
+    profitable_count = int(wins.sum())
+    losing_count = int(losses.sum())
+    total_trades = len(pnl)
+
+    if 'duration' in trades_df.columns:
+        duration = trades_df['duration'].to_numpy(dtype=np.float64)[closed_mask]
+        duration = duration[~np.isnan(duration)]
+        avg_duration = duration.mean() if len(duration) else np.nan
+    else:
+        avg_duration = 0
+
+    stats = {
+        'total_trades': total_trades,
+        'profitable_trades': profitable_count,
+        'losing_trades': losing_count,
+        'win_rate': profitable_count / total_trades,
+        'avg_profit': pnl_filled.dot(weights[2]) / profitable_count if profitable_count else 0,
+        'avg_loss': pnl_filled.dot(losses.astype(np.float64)) / losing_count if losing_count else 0,
+        'total_pnl': pnl_filled.sum(),
+        'max_profit': pnl[wins].max() if profitable_count else 0,
+        'max_loss': pnl[losses].min() if losing_count else 0,
+        'avg_duration': avg_duration,
+        'long_win_rate': dir_wins[0] / dir_count[0] if dir_count[0] > 0 else 0,
+        'short_win_rate': dir_wins[1] / dir_count[1] if dir_count[1] > 0 else 0,
+        'total_long': int(dir_count[0]),
+        'total_short': int(dir_count[1])
+    }
+
+    if not buckets:
+        return {**empty, 'stats': stats}
+
+    # 시간대 (4시간 단위)
+    n_slots = 24 // TIME_SLOT_HOURS
+    open_time = trades_df['timestamp'].to_numpy(dtype='datetime64[ns]')[closed_mask]
+    slot_ns = TIME_SLOT_HOURS * 3_600_000_000_000
+    slot_codes = (open_time.view(np.int64) % (24 * 3_600_000_000_000)) // slot_ns
+    slot_codes[np.isnat(open_time)] = -1
+
+    volatility_codes = _bucket_codes(
+        trades_df['volatility'].to_numpy()[closed_mask], VOLATILITY_BINS
+    )
+    kelly_codes = _bucket_codes(
+        trades_df['kelly_fraction'].to_numpy()[closed_mask], KELLY_BINS
+    )
+
+    return {
+        'stats': stats,
+        **_bucket_analysis_frames(
+            _bucket_performance(slot_codes, weights, n_slots),
+            _bucket_performance(volatility_codes, weights, len(VOLATILITY_LABELS)),
+            _bucket_performance(kelly_codes, weights, len(KELLY_LABELS)),
+        ),
+    }
+
+# SQL 구간 집계 (DB 가 버킷별 합계만 반환)
+def _hour_slot_sql(column):
+    # DB 종류별 '시(hour) / TIME_SLOT_HOURS' 정수 버킷 식
+    dialect = get_engine().dialect.name
+    if dialect == 'mysql':
+        return f"FLOOR(HOUR({column}) / {TIME_SLOT_HOURS})"
+    if dialect == 'sqlite':
+        return f"(CAST(strftime('%H', {column}) AS INTEGER) / {TIME_SLOT_HOURS})"
+    return f"FLOOR(EXTRACT(HOUR FROM {column}) / {TIME_SLOT_HOURS})"
+
+def _bin_case_sql(column, bins):
+    # _bucket_codes 와 같은 [하한, 상한) 구간 코드, 범위 밖/NULL 은 NULL
+    cases = []
+    for code, (low, high) in enumerate(zip(bins[:-1], bins[1:])):
+        condition = f"{column} >= {low!r}"
+        if np.isfinite(high):
+            condition += f" AND {column} < {high!r}"
+        cases.append(f"WHEN {condition} THEN {code}")
+    return f"CASE {' '.join(cases)} END"
+
+def bucket_performance_query():
+    """One UNION ALL query returning per-bucket sums for the three breakdowns.
+
+    Rows are ``(dimension, bucket, trade_count, total_pnl, pnl_count,
+    win_count)`` for closed trades opened in ``[:start, :end)``.
+    """
+    dimensions = [
+        ('time', _hour_slot_sql('t.timestamp')),
+        ('volatility', _bin_case_sql('t.volatility', VOLATILITY_BINS)),
+        ('kelly', _bin_case_sql('t.kelly_fraction', KELLY_BINS)),
+    ]
+    selects = [
+        f"""
+    SELECT '{name}' AS dimension, {bucket} AS bucket, COUNT(*) AS trade_count,
+           COALESCE(SUM(tr.pnl), 0) AS total_pnl, COUNT(tr.pnl) AS pnl_count,
+           SUM(CASE WHEN tr.pnl > 0 THEN 1 ELSE 0 END) AS win_count
+    FROM trades t
+    LEFT JOIN trade_results tr ON t.id = tr.trade_id
+    WHERE t.status = 'closed' AND t.timestamp >= :start AND t.timestamp < :end
+    GROUP BY {bucket}"""
+        for name, bucket in dimensions
+    ]
+    return "\n    UNION ALL".join(selects)
+
+def fetch_bucket_performance(start, end):
+    """Time/volatility/kelly breakdowns aggregated in SQL for ``[start, end)``.
+
+    Returns the same frames as ``compute_trade_analytics``.
+    """
+    params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime()}
+    try:
+        rows = pd.read_sql_query(text(bucket_performance_query()), get_engine(), params=params)
+    except SQLAlchemyError as exc:
+        raise RuntimeError("구간별 성과를 집계하는 중 오류가 발생했습니다.") from exc
+    rows = rows.dropna(subset=['bucket'])
+
+    def sums(name, n_buckets):
+        part = rows[rows['dimension'] == name]
+        codes = part['bucket'].to_numpy(dtype=np.int64)
+        totals = []
+        for column in ['trade_count', 'total_pnl', 'pnl_count', 'win_count']:
+            values = np.zeros(n_buckets)
+            values[codes] = part[column].to_numpy(dtype=np.float64)
+            totals.append(values)
+        return _bucket_rates(*totals)
+
+    time_values = sums('time', 24 // TIME_SLOT_HOURS)
+    # 모든 닫힌 거래는 시간대 하나에 속하므로 시간대 합계가 0 이면 닫힌 거래가 없음
+    if not time_values[0].any():
+        return {'time': pd.DataFrame(), 'volatility': pd.DataFrame(), 'kelly': pd.DataFrame()}
+    return _bucket_analysis_frames(
+        time_values,
+        sums('volatility', len(VOLATILITY_LABELS)),
+        sums('kelly', len(KELLY_LABELS)),
+    )
+
+def bucket_aggregation_mode():
+    # DASH_BUCKET_AGGREGATION: pandas(기본) / sql(구간 성과를 DB 에서 집계) / rollup(롤업 테이블 합산)
+    mode = os.getenv("DASH_BUCKET_AGGREGATION", "pandas").strip().lower()
+    if mode not in ('pandas', 'sql', 'rollup'):
+        raise RuntimeError("DASH_BUCKET_AGGREGATION 은 pandas, sql 또는 rollup 이어야 합니다.")
+    return mode
+
+# 일/시간 단위 롤업 테이블 (닫힌 거래를 개장 시각 기준으로 집계, 영향받은 날짜만 다시 계산)
+ROLLUP_BUCKET_PREFIXES = [
+    ('vol', VOLATILITY_BINS, VOLATILITY_LABELS),
+    ('kelly', KELLY_BINS, KELLY_LABELS),
+]
+ROLLUP_COUNT_COLUMNS = [
+    'trades', 'wins', 'losses', 'pnl_count', 'duration_count',
+    'long_trades', 'long_wins', 'short_trades', 'short_wins',
+] + [
+    f"{prefix}{code}_{metric}"
+    for prefix, _, labels in ROLLUP_BUCKET_PREFIXES
+    for code in range(len(labels))
+    for metric in ('trades', 'wins', 'pnl_count')
+]
+ROLLUP_SUM_COLUMNS = ['pnl_sum', 'pnl_sq_sum', 'profit_sum', 'loss_sum', 'duration_sum'] + [
+    f"{prefix}{code}_pnl_sum"
+    for prefix, _, labels in ROLLUP_BUCKET_PREFIXES
+    for code in range(len(labels))
+]
+ROLLUP_METADATA = MetaData()
+
+def _rollup_table(name):
+    return Table(
+        name, ROLLUP_METADATA,
+        Column('bucket_start', DateTime, primary_key=True),
+        *[Column(column, Integer, nullable=False) for column in ROLLUP_COUNT_COLUMNS],
+        *[Column(column, Double, nullable=False) for column in ROLLUP_SUM_COLUMNS],
+        Column('max_profit', Double),
+        Column('max_loss', Double),
+    )
+
+ROLLUP_TABLES = {
+    'D': _rollup_table('dash_rollup_daily'),
+    'h': _rollup_table('dash_rollup_hourly'),
+}
+ROLLUP_STATE_TABLE = Table(
+    'dash_rollup_state', ROLLUP_METADATA,
+    Column('name', String(32), primary_key=True),
+    Column('watermark', DateTime),
+)
+
+@st.cache_resource
+def get_rollup_state():
+    """Per-process lock and last seen trades fingerprint for the rollup sync."""
+    return {'lock': threading.Lock(), 'fingerprint': None}
+
+def compute_rollup_rows(trades_df, freq):
+    """Aggregate closed trades into one rollup row per ``freq`` ('D' or 'h') bucket."""
+    columns = ['bucket_start'] + ROLLUP_COUNT_COLUMNS + ROLLUP_SUM_COLUMNS + ['max_profit', 'max_loss']
+    closed = trades_df[trades_df['status'] == 'closed']
+    if closed.empty:
+        return pd.DataFrame(columns=columns)
+
+    # compute_trade_analytics 와 같은 정의 (NaN 손익은 거래 수에만 포함)
+    pnl = closed['pnl'].to_numpy(dtype=np.float64)
+    has_pnl = ~np.isnan(pnl)
+    pnl_filled = np.where(has_pnl, pnl, 0.0)
+    wins = pnl > 0
+    losses = pnl <= 0
+    duration = closed['duration'].to_numpy(dtype=np.float64)
+    has_duration = ~np.isnan(duration)
+    action = closed['action'].to_numpy(dtype=object)
+    is_long = action == 'long'
+    is_short = action == 'short'
+
+    values = {
+        'trades': np.ones(len(closed), dtype=np.int64),
+        'wins': wins,
+        'losses': losses,
+        'pnl_count': has_pnl,
+        'duration_count': has_duration,
+        'long_trades': is_long,
+        'long_wins': is_long & wins,
+        'short_trades': is_short,
+        'short_wins': is_short & wins,
+        'pnl_sum': pnl_filled,
+        'pnl_sq_sum': pnl_filled * pnl_filled,
+        'profit_sum': np.where(wins, pnl_filled, 0.0),
+        'loss_sum': np.where(losses, pnl_filled, 0.0),
+        'duration_sum': np.where(has_duration, duration, 0.0),
+    }
+    for (prefix, bins, labels), column in zip(ROLLUP_BUCKET_PREFIXES, ['volatility', 'kelly_fraction']):
+        codes = _bucket_codes(closed[column].to_numpy(), bins)
+        for code in range(len(labels)):
+            in_bucket = codes == code
+            values[f"{prefix}{code}_trades"] = in_bucket
+            values[f"{prefix}{code}_wins"] = in_bucket & wins
+            values[f"{prefix}{code}_pnl_count"] = in_bucket & has_pnl
+            values[f"{prefix}{code}_pnl_sum"] = np.where(in_bucket, pnl_filled, 0.0)
+
+    frame = pd.DataFrame(values)
+    frame['bucket_start'] = closed['timestamp'].dt.floor(freq).to_numpy()
+    grouped = frame.groupby('bucket_start', sort=True)
+    rows = grouped[ROLLUP_COUNT_COLUMNS].sum().astype(np.int64)
+    rows = rows.join(grouped[ROLLUP_SUM_COLUMNS].sum())
+    bucket_start = frame['bucket_start']
+    rows['max_profit'] = pd.Series(np.where(wins, pnl, np.nan)).groupby(bucket_start.to_numpy()).max()
+    rows['max_loss'] = pd.Series(np.where(losses, pnl, np.nan)).groupby(bucket_start.to_numpy()).min()
+    return rows.reset_index()[columns]
+
+def _rollup_records(rows):
+    # NaN 은 NULL 로, numpy 스칼라는 파이썬 값으로 변환해 드라이버에 전달
+    records = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    for record in records:
+        record['bucket_start'] = pd.Timestamp(record['bucket_start']).to_pydatetime()
+    return records
+
+def recompute_rollups(start, end):
+    """Rebuild the daily and hourly rollup rows for the days in ``[start, end)``."""
+    start, end = start.normalize(), end.normalize()
+    if end <= start:
+        return
+    # 복제 지연과 무관하게 워터마크와 같은 DB 에서 읽고 씀
+    engine = get_write_engine()
+    trades = _fetch_trades(
+        "WHERE t.status = 'closed' AND t.timestamp >= :start AND t.timestamp < :end",
+        {'start': start.to_pydatetime(), 'end': end.to_pydatetime()},
+        engine=engine,
+    )
+    with engine.begin() as conn:
+        for freq, table in ROLLUP_TABLES.items():
+            conn.execute(table.delete().where(
+                table.c.bucket_start >= start.to_pydatetime(),
+                table.c.bucket_start < end.to_pydatetime(),
+            ))
+            records = _rollup_records(compute_rollup_rows(trades, freq))
+            if records:
+                conn.execute(table.insert(), records)
+
+def _day_ranges(days):
+    # 정렬된 날짜 목록을 연속 구간 [시작, 끝) 으로 묶음
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + pd.Timedelta(days=1)
+        else:
+            ranges.append([day, day + pd.Timedelta(days=1)])
+    return ranges
+
+def _read_rollup_watermark(conn):
+    # 상태 행이 없으면 None (아직 한 번도 계산하지 않음), 있으면 (watermark,) 행
+    return conn.execute(
+        select(ROLLUP_STATE_TABLE.c.watermark).where(ROLLUP_STATE_TABLE.c.name == 'trades')
+    ).first()
+
+def _write_rollup_watermark(watermark):
+    with get_write_engine().begin() as conn:
+        conn.execute(ROLLUP_STATE_TABLE.delete().where(ROLLUP_STATE_TABLE.c.name == 'trades'))
+        conn.execute(ROLLUP_STATE_TABLE.insert(), [{'name': 'trades', 'watermark': watermark}])
+
+def rebuild_rollups():
+    """Recompute every rollup row month by month (first run or after manual fixes)."""
+    with get_write_engine().connect() as conn:
+        watermark = conn.execute(text("SELECT MAX(close_timestamp) FROM trade_results")).scalar()
+        first, last = conn.execute(text("SELECT MIN(timestamp), MAX(timestamp) FROM trades")).one()
+        conn.execute(ROLLUP_TABLES['D'].delete())
+        conn.execute(ROLLUP_TABLES['h'].delete())
+        conn.commit()
+    if first is not None:
+        # 한 번에 전체 거래를 올리지 않도록 월 단위로 나누어 계산
+        month = pd.Timestamp(first).to_period('M').to_timestamp()
+        last = pd.Timestamp(last)
+        while month <= last:
+            next_month = month + pd.offsets.MonthBegin(1)
+            recompute_rollups(month, next_month)
+            month = next_month
+    _write_rollup_watermark(None if watermark is None else pd.Timestamp(watermark).to_pydatetime())
+
+def sync_rollups():
+    """Bring the rollup tables up to date with trades closed since the last sync.
+
+    Days whose trades closed at or after the stored watermark are recomputed
+    from the raw trades, so the rollups always equal a fresh scan.
+    """
+    fingerprint = probe_data_fingerprint()['trades']
+    state = get_rollup_state()
+    with state['lock']:
+        if state['fingerprint'] == fingerprint:
+            return
+        engine = get_write_engine()
+        try:
+            ROLLUP_METADATA.create_all(engine, checkfirst=True)
+            with engine.connect() as conn:
+                marked = _read_rollup_watermark(conn)
+            if marked is None:
+                rebuild_rollups()
+                logger.info("롤업 테이블을 새로 계산했습니다.")
+            else:
+                watermark = marked[0]
+                with engine.connect() as conn:
+                    new_watermark = conn.execute(
+                        text("SELECT MAX(close_timestamp) FROM trade_results")
+                    ).scalar()
+                    if watermark is None:
+                        opened = conn.execute(text(
+                            "SELECT DISTINCT t.timestamp FROM trades t "
+                            "JOIN trade_results tr ON t.id = tr.trade_id"
+                        )).scalars().all()
+                    else:
+                        # 같은 시각에 늦게 기록된 결과도 잡기 위해 >= 사용 (다시 계산해도 결과 동일)
+                        opened = conn.execute(text(
+                            "SELECT DISTINCT t.timestamp FROM trades t "
+                            "JOIN trade_results tr ON t.id = tr.trade_id "
+                            "WHERE tr.close_timestamp >= :watermark"
+                        ), {'watermark': watermark}).scalars().all()
+                days = sorted(set(pd.to_datetime(pd.Series(opened, dtype=object)).dt.normalize()))
+                for day_start, day_end in _day_ranges(days):
+                    recompute_rollups(day_start, day_end)
+                if new_watermark is not None:
+                    _write_rollup_watermark(pd.Timestamp(new_watermark).to_pydatetime())
+        except SQLAlchemyError as exc:
+            raise RuntimeError("롤업 테이블을 갱신하는 중 오류가 발생했습니다.") from exc
+        state['fingerprint'] = fingerprint
+
+def _read_rollups(freq, start, end):
+    table = ROLLUP_TABLES[freq]
+    query = select(table).where(
+        table.c.bucket_start >= start.to_pydatetime(),
+        table.c.bucket_start < end.to_pydatetime(),
+    )
+    try:
+        # sync_rollups 가 쓰는 DB 에서 읽음 (복제본이 뒤처져도 현재 버전 캐시에 이전 롤업이 들어가지 않도록)
+        rows = pd.read_sql_query(query, get_write_engine())
+    except SQLAlchemyError as exc:
+        raise RuntimeError("롤업 테이블을 읽는 중 오류가 발생했습니다.") from exc
+    rows['bucket_start'] = pd.to_datetime(rows['bucket_start'])
+    return rows
+
+def read_rollup_rows(start, end):
+    """Rollup rows covering ``[start, end)``: daily rows inside, hourly rows at the edges.
+
+    Returns ``None`` when the range is not aligned to whole hours.
+    """
+    if start != start.floor('h') or end != end.floor('h'):
+        return None
+    first_day, last_day = start.ceil('D'), end.floor('D')
+    if first_day >= last_day:
+        return _read_rollups('h', start, end)
+    parts = [
+        _read_rollups('h', start, first_day),
+        _read_rollups('D', first_day, last_day),
+        _read_rollups('h', last_day, end),
+    ]
+    return pd.concat([part for part in parts if not part.empty] or parts[:1], ignore_index=True)
+
+def rollup_performance_stats(rows):
+    """Merge rollup rows into the ``calculate_performance_stats`` dict."""
+    totals = rows[ROLLUP_COUNT_COLUMNS + ROLLUP_SUM_COLUMNS].sum()
+    total_trades = int(totals['trades'])
+    if total_trades == 0:
+        return _empty_performance_stats()
+    wins, losses = int(totals['wins']), int(totals['losses'])
+    long_trades, short_trades = int(totals['long_trades']), int(totals['short_trades'])
+    return {
+        'total_trades': total_trades,
+        'profitable_trades': wins,
+        'losing_trades': losses,
+        'win_rate': wins / total_trades,
+        'avg_profit': totals['profit_sum'] / wins if wins else 0,
+        'avg_loss': totals['loss_sum'] / losses if losses else 0,
+        'total_pnl': totals['pnl_sum'],
+        'max_profit': rows['max_profit'].max() if wins else 0,
+        'max_loss': rows['max_loss'].min() if losses else 0,
+        'avg_duration': (
+            totals['duration_sum'] / totals['duration_count'] if totals['duration_count'] else np.nan
+        ),
+        'long_win_rate': totals['long_wins'] / long_trades if long_trades > 0 else 0,
+        'short_win_rate': totals['short_wins'] / short_trades if short_trades > 0 else 0,
+        'total_long': long_trades,
+        'total_short': short_trades,
+    }
+
+def rollup_trade_analytics(start, end):
+    """``compute_trade_analytics`` for ``[start, end)`` answered from the rollups.
+
+    Returns ``None`` when the range cannot be served from rollup buckets.
+    """
+    rows = read_rollup_rows(start, end)
+    if rows is None:
+        return None
+    stats = rollup_performance_stats(rows)
+    if stats['total_trades'] == 0:
+        return {
+            'stats': stats,
+            'time': pd.DataFrame(),
+            'volatility': pd.DataFrame(),
+            'kelly': pd.DataFrame(),
+        }
+
+    # 시간대 구간은 시간 단위 롤업에서 (시 // TIME_SLOT_HOURS) 로 합산
+    hourly = _read_rollups('h', start, end)
+    slots = (hourly['bucket_start'].dt.hour // TIME_SLOT_HOURS).to_numpy()
+    n_slots = 24 // TIME_SLOT_HOURS
+    time_values = _bucket_rates(*[
+        np.bincount(slots, weights=hourly[column].to_numpy(dtype=np.float64), minlength=n_slots)
+        for column in ['trades', 'pnl_sum', 'pnl_count', 'wins']
+    ])
+
+    def bucket_values(prefix, labels):
+        return _bucket_rates(*[
+            np.array([rows[f"{prefix}{code}_{metric}"].sum() for code in range(len(labels))],
+                     dtype=np.float64)
+            for metric in ['trades', 'pnl_sum', 'pnl_count', 'wins']
+        ])
+
+    return {
+        'stats': stats,
+        **_bucket_analysis_frames(
+            time_values,
+            bucket_values('vol', VOLATILITY_LABELS),
+            bucket_values('kelly', KELLY_LABELS),
+        ),
+    }
+
+@metered_cache(st.cache_data(max_entries=16))
+def cached_trade_analytics(trades_version, start, end, _trades_df, aggregation='pandas'):
+    # 데이터 버전과 조회 범위가 같으면 이전 계산 결과를 재사용 (_trades_df 는 해시하지 않음)
+    if aggregation == 'sql':
+        analytics = compute_trade_analytics(_trades_df, buckets=False)
+        analytics.update(fetch_bucket_performance(start, end))
+        return analytics
+    if aggregation == 'rollup':
+        await_load('rollups', sync_rollups)
+        analytics = rollup_trade_analytics(start, end)
+        if analytics is not None:
+            return analytics
+    return compute_trade_analytics(_trades_df)
+
+# 거래 성과 통계 계산 함수 (거래 프레임 대신 기간을 주면 롤업 모드에서는 롤업 테이블에서 합산)
+def calculate_performance_stats(trades_df=None, start=None, end=None):
+    if trades_df is None:
+        # 롤업 테이블은 DASH_BUCKET_AGGREGATION=rollup 을 선택한 경우에만 만들고 읽음
+        if bucket_aggregation_mode() == 'rollup':
+            sync_rollups()
+            rows = read_rollup_rows(start, end)
+            if rows is not None:
+                return rollup_performance_stats(rows)
+        trades_df = load_trades_data(start, end)
+    return compute_trade_analytics(trades_df)['stats']
+
+# 시간대별 성과 분석
+def analyze_time_performance(trades_df):
+    return compute_trade_analytics(trades_df)['time']
+
+# 변동성 기반 성과 분석
+def analyze_volatility_performance(trades_df):
+    return compute_trade_analytics(trades_df)['volatility']
+
+# 켈리 비율 기반 성과 분석
+def analyze_kelly_performance(trades_df):
+    return compute_trade_analytics(trades_df)['kelly']
+
+# 리스크 분석: 일간 수익률 연율화 기간 수 (암호화폐는 주말 없이 거래)
+RISK_PERIODS_PER_YEAR = 365
+
+# 롤링 승률/기대값 기본 거래 수
+RISK_ROLLING_TRADES = 50
+
+def drawdown_profile(timestamps, equity):
+    """Underwater curve and drawdown figures of an equity series in O(n).
+
+    ``timestamps`` must be sorted. Returns ``(underwater, figures)`` where
+    ``underwater`` is ``equity / running peak - 1`` per sample and ``figures``
+    holds the maximum/current drawdown, its peak and trough times and the
+    longest time spent below a previous peak.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[ns]')
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    underwater = np.zeros(len(equity))
+    np.divide(equity, peak, out=underwater, where=peak > 0)
+    underwater = np.where(peak > 0, underwater - 1, 0.0)
+    # 각 시점 직전 고점의 위치 (고점을 갱신한 인덱스의 누적 최대)
+    positions = np.arange(len(equity))
+    peak_at = np.maximum.accumulate(np.where(equity >= peak, positions, 0))
+    trough = int(np.argmin(underwater))
+    underwater_time = timestamps - timestamps[peak_at]
+    return underwater, {
+        'max_drawdown': float(underwater[trough]),
+        'max_drawdown_peak': pd.Timestamp(timestamps[peak_at[trough]]),
+        'max_drawdown_trough': pd.Timestamp(timestamps[trough]),
+        'current_drawdown': float(underwater[-1]),
+        'max_drawdown_duration': pd.Timedelta(underwater_time.max()),
+    }
+
+def daily_return_ratios(timestamps, equity, periods_per_year=RISK_PERIODS_PER_YEAR):
+    """Annualised Sharpe and Sortino ratios of day-end equity returns (risk-free rate 0)."""
+    days = np.asarray(timestamps, dtype='datetime64[D]')
+    # 정렬된 시각에서 날짜가 바뀌기 직전 인덱스 = 그날 마지막 샘플
+    day_end = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+    closes = np.asarray(equity, dtype=np.float64)[day_end]
+    ratios = {'days': len(closes), 'sharpe': np.nan, 'sortino': np.nan}
+    if len(closes) < 3:
+        return ratios
+    returns = closes[1:] / closes[:-1] - 1
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 2:
+        return ratios
+    mean = returns.mean()
+    std = returns.std(ddof=1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    scale = np.sqrt(periods_per_year)
+    ratios['sharpe'] = float(mean / std * scale) if std > 0 else np.nan
+    ratios['sortino'] = float(mean / downside * scale) if downside > 0 else np.nan
+    return ratios
+
+def rolling_trade_stats(pnl, window):
+    """Rolling win rate (%) and expectancy over ``window`` trades via cumulative sums.
+
+    Element ``i`` covers trades ``i .. i + window - 1``; empty when there are
+    fewer trades than ``window``.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if window < 1 or len(pnl) < window:
+        return np.empty(0), np.empty(0)
+    wins = np.concatenate(([0], np.cumsum(pnl > 0)))
+    totals = np.concatenate(([0.0], np.cumsum(pnl)))
+    win_rate = (wins[window:] - wins[:-window]) / window * 100
+    expectancy = (totals[window:] - totals[:-window]) / window
+    return win_rate, expectancy
+
+def reduce_series(values, points, how='min'):
+    """Indices and values of at most ``points`` equal-count buckets (bucket min or last)."""
+    values = np.asarray(values)
+    if len(values) <= points:
+        return np.arange(len(values)), values
+    edges = np.unique(np.linspace(0, len(values), points + 1).astype(np.int64)[:-1])
+    if how == 'min':
+        # 버킷별 최저값 (낙폭 곡선에서 가장 깊은 지점이 사라지지 않도록)
+        reduced = np.minimum.reduceat(values, edges)
+        offsets = np.array([np.argmin(chunk) for chunk in np.split(values, edges[1:])])
+        return edges + offsets, reduced
+    last = np.append(edges[1:], len(values)) - 1
+    return last, values[last]
+
+def compute_risk_analytics(trades_df, account_df, rolling_trades=RISK_ROLLING_TRADES,
+                           chart_points=ACCOUNT_CHART_POINTS):
+    """Equity-curve and trade-sequence risk figures for one window.
+
+    Drawdowns and Sharpe/Sortino come from ``account_df`` (``timestamp``,
+    ``equity``); profit factor, expectancy and the rolling series come from the
+    closed trades in close order. Chart series are reduced to ``chart_points``.
+    """
+    risk = {'equity': None, 'trades': None}
+
+    if account_df is not None and not account_df.empty:
+        equity = account_df['equity'].to_numpy(dtype=np.float64)
+        valid = np.isfinite(equity)
+        timestamps = account_df['timestamp'].to_numpy(dtype='datetime64[ns]')[valid]
+        equity = equity[valid]
+        if len(equity):
+            underwater, figures = drawdown_profile(timestamps, equity)
+            figures.update(daily_return_ratios(timestamps, equity))
+            idx, reduced = reduce_series(underwater, chart_points)
+            figures['underwater'] = pd.DataFrame({
+                'timestamp': timestamps[idx],
+                'drawdown': reduced * 100,
+            })
+            figures['samples'] = len(equity)
+            risk['equity'] = figures
+
+    if trades_df is not None and not trades_df.empty:
+        closed = trades_df[(trades_df['status'] == 'closed') & trades_df['pnl'].notna()]
+        if not closed.empty:
+            order = np.argsort(closed['close_timestamp'].to_numpy(), kind='stable')
+            pnl = closed['pnl'].to_numpy(dtype=np.float64)[order]
+            closed_at = closed['close_timestamp'].to_numpy(dtype='datetime64[ns]')[order]
+            gross_profit = pnl[pnl > 0].sum()
+            gross_loss = -pnl[pnl < 0].sum()
+            figures = {
+                'trades': len(pnl),
+                'profit_factor': float(gross_profit / gross_loss) if gross_loss > 0 else np.inf,
+                'expectancy': float(pnl.mean()),
+                'window': rolling_trades,
+                'rolling': None,
+            }
+            win_rate, expectancy = rolling_trade_stats(pnl, rolling_trades)
+            if len(win_rate):
+                idx, _ = reduce_series(win_rate, chart_points, how='last')
+                figures['rolling'] = pd.DataFrame({
+                    'close_timestamp': closed_at[rolling_trades - 1:][idx],
+                    'win_rate': win_rate[idx],
+                    'expectancy': expectancy[idx],
+                })
+                figures['last_win_rate'] = float(win_rate[-1])
+                figures['last_expectancy'] = float(expectancy[-1])
+            risk['trades'] = figures
+    return risk
+
+@metered_cache(st.cache_data(max_entries=8))
+def cached_risk_analytics(trades_version, account_version, start, end, rolling_trades, _trades, _account):
+    # 거래/계정 이력 버전, 범위, 롤링 거래 수가 같으면 이전 계산 결과를 재사용
+    return compute_risk_analytics(_trades, _account, rolling_trades)
+
+# 켈리 시뮬레이션: 실제 켈리 비율에 곱할 배수와 라벨
+SIMULATION_MULTIPLIERS = [0.25, 0.5, 1.0, 1.5, 2.0]
+SIMULATION_LABELS = ['1/4 켈리', '1/2 켈리', '실제 켈리', '1.5배 켈리', '2배 켈리']
+SIMULATION_PATH_OPTIONS = [1000, 5000, 10000, 20000]
+SIMULATION_TRADE_OPTIONS = [100, 250, 500, 1000, 2000]
+SIMULATION_BATCH_PATHS = 1000
+# 경로 x 거래 수가 이 값 이상일 때만 프로세스 풀 사용 (작은 계산은 현재 프로세스가 더 빠름)
+SIMULATION_POOL_MIN_CELLS = 2_000_000
+# 같은 데이터면 같은 결과가 나오도록 고정 시드 사용
+SIMULATION_SEED = 20240101
+
+# 승리 확률 보정 곡선 구간 (10% 단위)
+CALIBRATION_BINS = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, float('inf')]
+CALIBRATION_LABELS = ['0-10%', '10-20%', '20-30%', '30-40%', '40-50%',
+                      '50-60%', '60-70%', '70-80%', '80-90%', '90%+']
+
+def simulation_workers():
+    # DASH_SIMULATION_WORKERS: 시뮬레이션 프로세스 수 (1 이하면 현재 프로세스에서 계산)
+    return int(_env_float("DASH_SIMULATION_WORKERS", min(4, os.cpu_count() or 1)))
+
+@st.cache_resource
+def get_simulation_pool():
+    """Process pool for Monte Carlo batches, or ``None`` with a single worker."""
+    workers = simulation_workers()
+    if workers <= 1:
+        return None
+    # spawn: Streamlit 서버의 스레드/락을 복제하지 않도록 새 인터프리터에서 montecarlo 만 import
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def simulation_inputs(trades_df):
+    """Per-trade returns on the staked capital and Kelly fractions of closed trades."""
+    if trades_df is None or trades_df.empty:
+        return np.empty(0), np.empty(0)
+    closed = trades_df[
+        (trades_df['status'] == 'closed')
+        & trades_df['pnl_percentage'].notna()
+        & trades_df['kelly_fraction'].notna()
+    ]
+    returns = closed['pnl_percentage'].to_numpy(dtype=np.float64) / 100
+    stakes = closed['kelly_fraction'].to_numpy(dtype=np.float64)
+    return returns, stakes
+
+def simulate_kelly_sizing(trades_df, n_paths, n_trades, executor=None):
+    """Bootstrap equity paths under the recorded Kelly sizing and its multiples.
+
+    Returns ``None`` without closed trades; otherwise the
+    ``montecarlo.run_simulation`` result plus the sample size and labels.
+    """
+    returns, stakes = simulation_inputs(trades_df)
+    if len(returns) == 0:
+        return None
+    if n_paths * n_trades < SIMULATION_POOL_MIN_CELLS:
+        executor = None
+    result = montecarlo.run_simulation(
+        returns, stakes, SIMULATION_MULTIPLIERS, n_paths, n_trades,
+        seed=SIMULATION_SEED, batch_paths=SIMULATION_BATCH_PATHS, executor=executor,
+    )
+    result['samples'] = len(returns)
+    result['labels'] = SIMULATION_LABELS
+    return result
+
+@metered_cache(st.cache_data(max_entries=8))
+def cached_kelly_simulation(trades_version, start, end, n_paths, n_trades, _trades):
+    # 거래 데이터 버전, 범위, 경로/거래 수가 같으면 이전 시뮬레이션 결과를 재사용
+    return simulate_kelly_sizing(_trades, n_paths, n_trades, get_simulation_pool())
+
+def win_probability_calibration(trades_df, bins=CALIBRATION_BINS, labels=CALIBRATION_LABELS):
+    """Predicted ``win_probability`` versus realised win rate per probability bucket.
+
+    Returns ``(curve, brier)``: ``curve`` has one row per non-empty bucket
+    (``bucket``, ``trade_count``, ``predicted``, ``realised``, ``stderr``) and
+    ``brier`` is the mean squared error of the predictions (``nan`` without
+    closed trades).
+    """
+    empty = pd.DataFrame(columns=['bucket', 'trade_count', 'predicted', 'realised', 'stderr'])
+    if trades_df is None or trades_df.empty:
+        return empty, np.nan
+    closed = trades_df[
+        (trades_df['status'] == 'closed')
+        & trades_df['pnl'].notna()
+        & trades_df['win_probability'].notna()
+    ]
+    if closed.empty:
+        return empty, np.nan
+    predicted = closed['win_probability'].to_numpy(dtype=np.float64)
+    won = (closed['pnl'].to_numpy(dtype=np.float64) > 0).astype(np.float64)
+    brier = float(np.mean((predicted - won) ** 2))
+
+    codes = _bucket_codes(predicted, bins)
+    valid = codes >= 0
+    codes, predicted, won = codes[valid], predicted[valid], won[valid]
+    counts = np.bincount(codes, minlength=len(labels))
+    present = counts > 0
+    counts_present = counts[present]
+    mean_predicted = np.bincount(codes, weights=predicted, minlength=len(labels))[present] / counts_present
+    realised = np.bincount(codes, weights=won, minlength=len(labels))[present] / counts_present
+    curve = pd.DataFrame({
+        'bucket': np.asarray(labels)[present],
+        'trade_count': counts_present,
+        'predicted': mean_predicted * 100,
+        'realised': realised * 100,
+        # 실현 승률의 이항 표준오차
+        'stderr': np.sqrt(realised * (1 - realised) / counts_present) * 100,
+    })
+    return curve, brier
+
+
+# 최신 활성 거래 정보 가져오기
+def get_active_trade_info(open_trades=None):
+    if open_trades is None:
+        open_trades = load_active_trade()
+    if open_trades.empty:
+        return None
+    
+    # 가장 최근의 오픈된 거래
+    latest_open = open_trades.iloc[0]
+    return latest_open
+
+# PnL 색상 강조 함수 (데이터프레임 표시용)
+def color_pnl(val):
+    if pd.isna(val):
+        color = 'black'
+    elif val > 0:
+        color = '#00CC96'  # 수익은 녹색
+    elif val < 0:
+        color = '#EF553B'  # 손실은 빨간색
+    else:
+        color = 'white'
+    return f'color: {color}'
+
+# 표 표시 형식 (값은 숫자 그대로 전송하고 형식은 st.dataframe column_config 로 지정)
+MONEY_FORMAT = "$%.2f"
+PERCENT_FORMAT = "%.2f%%"
+
+# 최근 거래 내역 표: (컬럼, 한글 라벨, 형식, 백분율 변환 여부)
+TRADE_TABLE_COLUMNS = [
+    ('id', '거래 ID', None, False),
+    ('timestamp', '개장 시간', None, False),
+    ('action', '포지션', None, False),
+    ('entry_price', '진입가', MONEY_FORMAT, False),
+    ('amount', '수량', "%.3f", False),
+    ('leverage', '레버리지', None, False),
+    ('kelly_fraction', '켈리 비율', PERCENT_FORMAT, True),
+    ('win_probability', '승리 확률', PERCENT_FORMAT, True),
+    ('status', '상태', None, False),
+    ('close_timestamp', '종료 시간', None, False),
+    ('close_price', '종료가', MONEY_FORMAT, False),
+    ('pnl', '수익/손실', MONEY_FORMAT, False),
+    ('pnl_percentage', '수익률(%)', PERCENT_FORMAT, False),
+    ('result', '결과', None, False),
+]
+
+def build_column_config(columns):
+    """Build an ``st.dataframe`` column_config from (column, label, format, percent) specs."""
+    config = {}
+    for column, label, number_format, _ in columns:
+        if number_format is not None:
+            config[column] = st.column_config.NumberColumn(label, format=number_format)
+        elif column.endswith('timestamp'):
+            config[column] = st.column_config.DatetimeColumn(label, format="YYYY-MM-DD HH:mm:ss")
+        else:
+            config[column] = st.column_config.Column(label)
+    return config
+
+def prepare_display_frame(df, columns):
+    # 선택한 컬럼만 남기고 비율 컬럼은 벡터 연산으로 x100 (NaN 은 그대로 빈 칸으로 표시)
+    names = [column for column, _, _, _ in columns if column in df.columns]
+    scaled = {
+        column: df[column] * 100
+        for column, _, _, percent in columns
+        if percent and column in df.columns
+    }
+    display_df = df[names].assign(**scaled)
+    if 'action' in display_df.columns:
+        action = display_df['action']
+        if isinstance(action.dtype, pd.CategoricalDtype):
+            # 범주 이름만 바꿔 행마다 문자열을 만들지 않음
+            display_df['action'] = action.cat.rename_categories(str.upper)
+        else:
+            display_df['action'] = action.str.upper()
+    return display_df
+
+def analysis_table_columns(label_column, label):
+    return [
+        (label_column, label, None, False),
+        ('trade_count', '거래 수', None, False),
+        ('total_pnl', '누적 PnL', MONEY_FORMAT, False),
+        ('avg_pnl', '평균 PnL', MONEY_FORMAT, False),
+        ('win_rate', '승률', PERCENT_FORMAT, True),
+    ]
+
+def show_analysis_table(perf_df, label_column, label):
+    columns = analysis_table_columns(label_column, label)
+    st.dataframe(
+        prepare_display_frame(perf_df, columns),
+        column_config=build_column_config(columns),
+    )
+
+# 대시보드 섹션 렌더링 함수
+def render_status_overview(stats, current_balance):
+    # 1. 상태 개요 섹션
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown('<div class="stat-label">총 수익/손실</div>', unsafe_allow_html=True)
+        pnl_color = "profit" if stats['total_pnl'] > 0 else "loss"
+        st.markdown(f'<div class="stat-value {pnl_color}">${stats["total_pnl"]:.2f}</div>', unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown('<div class="stat-label">승률</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="stat-value">{stats["win_rate"]:.2%}</div>', unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown('<div class="stat-label">총 거래 수</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="stat-value">{stats["total_trades"]}</div>', unsafe_allow_html=True)
+    
+    with col4:
+        if current_balance is not None:
+            st.markdown('<div class="stat-label">현재 잔액</div>', unsafe_allow_html=True)
+            st.markdown(f'<div class="stat-value">${current_balance:.2f}</div>', unsafe_allow_html=True)
+
+def render_active_trade(active_trade):
+    # 2. 활성 거래 정보
+    st.markdown('<div class="sub-header">활성 거래 상태</div>', unsafe_allow_html=True)
+    
+    if active_trade is not None:
+        active_cols = st.columns(4)
+        
+        with active_cols[0]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">포지션</div>' +
+                      f'<div class="stat-value">{active_trade["action"].upper()}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols[1]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">진입가격</div>' +
+                      f'<div class="stat-value">${active_trade["entry_price"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols[2]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">수량</div>' +
+                      f'<div class="stat-value">{active_trade["amount"]:.3f} BTC</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols[3]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">레버리지</div>' +
+                      f'<div class="stat-value">{active_trade["leverage"]}x</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        active_cols2 = st.columns(4)
+        
+        with active_cols2[0]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">스탑로스</div>' +
+                      f'<div class="stat-value">${active_trade["stop_loss"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols2[1]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">손익실현</div>' +
+                      f'<div class="stat-value">${active_trade["take_profit"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols2[2]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">켈리 비율</div>' +
+                      f'<div class="stat-value">{active_trade["kelly_fraction"]:.2%}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with active_cols2[3]:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">승리 확률</div>' +
+                      f'<div class="stat-value">{active_trade["win_probability"]:.2%}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        # 개장 이후 경과 시간 계산
+        if pd.notna(active_trade["timestamp"]):
+            open_time = active_trade["timestamp"]
+            current_time = pd.Timestamp.now()
+            elapsed = current_time - open_time
+            elapsed_hours = elapsed.total_seconds() / 3600
+            
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">개장 시간</div>' +
+                      f'<div>{open_time.strftime("%Y-%m-%d %H:%M:%S")} (약 {elapsed_hours:.1f}시간 전)</div>' +
+                      f'</div>', unsafe_allow_html=True)
+    else:
+        st.info("현재 활성화된 거래가 없습니다.")
+
+# 점 개수가 이 값 이상이면 산점도/선을 WebGL(Scattergl)로 그림 (SVG 는 수만 개부터 브라우저가 느려짐)
+WEBGL_POINTS = 5000
+
+def scatter_trace(points):
+    # DASH_WEBGL_POINTS: 전환 기준 점 개수 (0 이면 항상 SVG)
+    threshold = int(_env_float("DASH_WEBGL_POINTS", WEBGL_POINTS))
+    return go.Scattergl if 0 < threshold <= points else go.Scatter
+
+def build_pnl_figure(filtered_trades):
+    """Per-trade PnL markers and the cumulative PnL line, or ``None`` without closed trades."""
+    # 닫힌 거래만 필터링
+    closed_trades = filtered_trades[filtered_trades['status'] == 'closed']
+    if closed_trades.empty:
+        return None
+
+    # 날짜별 누적 PnL 계산
+    closed_trades_sorted = closed_trades.sort_values('close_timestamp')
+    pnl = closed_trades_sorted['pnl'].to_numpy()
+    cumulative_pnl = closed_trades_sorted['pnl'].cumsum().to_numpy()
+    close_timestamp = closed_trades_sorted['close_timestamp'].to_numpy()
+    scatter_class = scatter_trace(len(closed_trades_sorted))
+
+    # PnL 시간별 변화 그래프
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    # 개별 거래 PnL: 방향별 트레이스 하나씩 (모양은 트레이스 값 하나, 색은 0/1 코드 + 2색 색상표)
+    # plotly 는 문자열 색/모양 배열을 요소마다 파이썬으로 검증해 수만 건부터 수 초가 걸리므로 숫자 배열 사용
+    is_long = (closed_trades_sorted['action'] == 'long').to_numpy()
+    profit_code = np.where(pnl > 0, 1, 0)
+    for direction, symbol, label in ((is_long, 'triangle-up', '롱'), (~is_long, 'triangle-down', '숏')):
+        fig.add_trace(scatter_class(
+            x=close_timestamp[direction],
+            y=pnl[direction],
+            mode='markers',
+            marker=dict(
+                size=10,
+                symbol=symbol,
+                color=profit_code[direction],
+                colorscale=[[0, 'red'], [1, 'green']],
+                cmin=0,
+                cmax=1,
+            ),
+            name=f'개별 거래 PnL ({label})'
+        ))
+
+    # 누적 PnL
+    line = scatter_class(
+        x=close_timestamp,
+        y=cumulative_pnl,
+        mode='lines',
+        line=dict(width=2, color='yellow'),
+        name='누적 PnL',
+        yaxis='y2'
+    )
+
+    fig.add_trace(line, secondary_y=True)
+
+    fig.update_layout(
+        title='거래 내역 및 누적 수익/손실',
+        xaxis_title='날짜',
+        yaxis_title='개별 거래 PnL (USDT)',
+        yaxis2_title='누적 PnL (USDT)',
+        height=500,
+        template='plotly_dark',
+        hovermode='x unified'
+    )
+    return fig
+
+@metered_cache(st.cache_resource(max_entries=8))
+def cached_pnl_figure(data_version, start, end, _trades):
+    """PnL figure memoised by (data version, window).
+
+    The figure is shared between sessions and must not be modified.
+    """
+    return build_pnl_figure(_trades)
+
+def render_pnl_chart(filtered_trades, cache_key=None):
+    # 3. 거래 내역 그래프 (cache_key: (데이터 버전, 시작, 끝) 이 있으면 같은 그림을 재사용)
+    st.markdown('<div class="sub-header">거래 내역 & 수익/손실</div>', unsafe_allow_html=True)
+    
+    if not filtered_trades.empty and 'pnl' in filtered_trades.columns:
+        fig = (
+            cached_pnl_figure(*cache_key, filtered_trades) if cache_key is not None
+            else build_pnl_figure(filtered_trades)
+        )
+        if fig is not None:
+            with track_section("pnl_plotly_chart"):
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("선택한 기간에 완료된 거래가 없습니다.")
+    else:
+        st.info("거래 내역이 없습니다.")
+
+def build_balance_figure(filtered_account, account_chart_series):
+    """Balance line (with the bucket min/max band when downsampled) and optional series."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    timestamp = filtered_account['timestamp'].to_numpy()
+    scatter_class = scatter_trace(len(filtered_account))
+    
+    # 버킷 최소/최대 범위 (다운샘플링 모드)
+    if 'balance_min' in filtered_account.columns:
+        fig.add_trace(scatter_class(
+            x=timestamp,
+            y=filtered_account['balance_max'].to_numpy(),
+            mode='lines',
+            line=dict(width=0),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+        fig.add_trace(scatter_class(
+            x=timestamp,
+            y=filtered_account['balance_min'].to_numpy(),
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            fillcolor='rgba(0, 204, 150, 0.2)',
+            name='잔액 범위(최소~최대)'
+        ))
+    
+    fig.add_trace(scatter_class(
+        x=timestamp,
+        y=filtered_account['balance'].to_numpy(),
+        mode='lines',
+        name='계정 잔액',
+        line=dict(width=2, color='#00CC96')
+    ))
+    
+    if "자산(equity)" in account_chart_series:
+        fig.add_trace(scatter_class(
+            x=timestamp,
+            y=filtered_account['equity'].to_numpy(),
+            mode='lines',
+            name='자산(equity)',
+            line=dict(width=1, color='#636EFA')
+        ))
+    
+    if "미실현 손익" in account_chart_series:
+        fig.add_trace(scatter_class(
+            x=timestamp,
+            y=filtered_account['unrealized_pnl'].to_numpy(),
+            mode='lines',
+            name='미실현 손익',
+            line=dict(width=1, color='#FFA15A')
+        ), secondary_y=True)
+    
+    fig.update_layout(
+        title='계정 잔액 변화',
+        xaxis_title='날짜',
+        yaxis_title='잔액 (USDT)',
+        yaxis2_title='미실현 손익 (USDT)',
+        height=400,
+        template='plotly_dark',
+        hovermode='x unified'
+    )
+    return fig
+
+@metered_cache(st.cache_resource(max_entries=8))
+def cached_balance_figure(data_version, start, end, chart_mode, target_points, account_chart_series, _account):
+    """Balance figure memoised by (data version, window, chart options).
+
+    The figure is shared between sessions and must not be modified.
+    """
+    return build_balance_figure(_account, account_chart_series)
+
+def render_balance_chart(filtered_account, account_chart_series, cache_key=None):
+    # 4. 계정 잔액 변화 그래프
+    # (cache_key: (데이터 버전, 시작, 끝, 표시 방식, 해상도) 가 있으면 같은 그림을 재사용)
+    st.markdown('<div class="sub-header">계정 잔액 변화</div>', unsafe_allow_html=True)
+    
+    if not filtered_account.empty:
+        fig = (
+            cached_balance_figure(*cache_key, tuple(account_chart_series), filtered_account)
+            if cache_key is not None
+            else build_balance_figure(filtered_account, account_chart_series)
+        )
+        with track_section("balance_plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("계정 잔액 내역이 없습니다.")
+
+# 성과 분석 탭: (분석 결과 키, 구간 컬럼, 제목 접두어, 축 제목)
+ANALYSIS_TABS = ["종합 통계", "시간대별 성과", "변동성별 성과", "켈리 비율별 성과", "리스크 분석", "켈리 시뮬레이션"]
+BUCKET_ANALYSIS_TABS = {
+    "시간대별 성과": ('time', 'time_range', '시간대별', '시간대'),
+    "변동성별 성과": ('volatility', 'volatility_range', '변동성별', '변동성 범위'),
+    "켈리 비율별 성과": ('kelly', 'kelly_range', '켈리 비율별', '켈리 비율 범위'),
+}
+
+def build_summary_figures(stats):
+    # 승패 비율 차트
+    win_loss_data = pd.DataFrame([
+        {'Category': '수익 거래', 'Count': stats['profitable_trades']},
+        {'Category': '손실 거래', 'Count': stats['losing_trades']}
+    ])
+    
+    win_loss_fig = px.pie(
+        win_loss_data, 
+        names='Category', 
+        values='Count',
+        color='Category',
+        color_discrete_map={'수익 거래': '#00CC96', '손실 거래': '#EF553B'},
+        title='승패 비율'
+    )
+    win_loss_fig.update_layout(template='plotly_dark')
+    
+    direction_data = pd.DataFrame([
+        {'Direction': 'LONG', 'Count': stats['total_long'], 'Win Rate': stats['long_win_rate']},
+        {'Direction': 'SHORT', 'Count': stats['total_short'], 'Win Rate': stats['short_win_rate']}
+    ])
+    
+    direction_fig = px.bar(
+        direction_data,
+        x='Direction',
+        y='Count',
+        color='Win Rate',
+        color_continuous_scale='RdYlGn',
+        range_color=[0, 1],
+        title='방향별 승률',
+        text='Win Rate'
+    )
+    direction_fig.update_traces(texttemplate='%{text:.2%}')
+    direction_fig.update_layout(template='plotly_dark')
+    return [win_loss_fig, direction_fig]
+
+def build_bucket_figures(perf_df, label_column, title_prefix, axis_title):
+    fig = px.bar(
+        perf_df, 
+        x=label_column, 
+        y='trade_count',
+        color='win_rate',
+        color_continuous_scale='RdYlGn',
+        range_color=[0, 1],
+        title=f'{title_prefix} 거래 성과',
+        text='win_rate'
+    )
+    fig.update_traces(texttemplate='%{text:.2%}')
+    fig.update_layout(template='plotly_dark', xaxis_title=axis_title, yaxis_title='거래 수')
+    
+    # 구간별 누적 PnL
+    fig2 = px.bar(
+        perf_df,
+        x=label_column,
+        y='total_pnl',
+        color='total_pnl',
+        color_continuous_scale='RdYlGn',
+        title=f'{title_prefix} 누적 수익/손실'
+    )
+    fig2.update_layout(template='plotly_dark', xaxis_title=axis_title, yaxis_title='누적 PnL (USDT)')
+    return [fig, fig2]
+
+@metered_cache(st.cache_resource(max_entries=32))
+def build_analysis_figures(tab, data_version, start, end, _analytics):
+    """Figures for one analysis tab, memoised by (tab, data version, window).
+
+    The bounded cache evicts the least recently used entries; the returned
+    figures are shared between sessions and must not be modified.
+    """
+    if tab == "종합 통계":
+        return build_summary_figures(_analytics['stats'])
+    key, label_column, title_prefix, axis_title = BUCKET_ANALYSIS_TABS[tab]
+    return build_bucket_figures(_analytics[key], label_column, title_prefix, axis_title)
+
+def render_summary_tab(stats, figures):
+    if stats['total_trades'] > 0:
+        win_loss_col, direction_col = st.columns(2)
+        
+        with win_loss_col:
+            st.plotly_chart(figures[0], use_container_width=True)
+        
+        with direction_col:
+            st.plotly_chart(figures[1], use_container_width=True)
+        
+        # 통계 카드
+        stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
+        
+        with stat_col1:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">평균 수익</div>' +
+                      f'<div class="stat-value profit">${stats["avg_profit"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with stat_col2:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">평균 손실</div>' +
+                      f'<div class="stat-value loss">${stats["avg_loss"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with stat_col3:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">최대 수익</div>' +
+                      f'<div class="stat-value profit">${stats["max_profit"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        with stat_col4:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">최대 손실</div>' +
+                      f'<div class="stat-value loss">${stats["max_loss"]:.2f}</div>' +
+                      f'</div>', unsafe_allow_html=True)
+        
+        if stats['avg_duration'] > 0:
+            st.markdown(f'<div class="info-box">' +
+                      f'<div class="stat-label">평균 거래 시간</div>' +
+                      f'<div class="stat-value">{stats["avg_duration"]:.1f}분 ({stats["avg_duration"]/60:.1f}시간)</div>' +
+                      f'</div>', unsafe_allow_html=True)
+    else:
+        st.info("선택한 기간에 완료된 거래가 없습니다.")
+
+def render_bucket_tab(tab, analytics, figures):
+    key, label_column, title_prefix, axis_title = BUCKET_ANALYSIS_TABS[tab]
+    perf_df = analytics[key]
+    if not perf_df.empty:
+        for fig in figures:
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # 데이터프레임으로 표시
+        st.write(f"{title_prefix} 거래 통계:")
+        show_analysis_table(perf_df, label_column, axis_title)
+    else:
+        st.info(f"{title_prefix} 성과 분석을 위한 데이터가 충분하지 않습니다.")
+
+# 리스크 분석 탭의 롤링 구간 선택지 (거래 수)
+RISK_ROLLING_OPTIONS = [20, 50, 100, 200, 500]
+
+def build_risk_figures(risk):
+    """Underwater curve and rolling win rate/expectancy figures (``None`` when no data)."""
+    underwater_fig = None
+    if risk['equity'] is not None:
+        underwater = risk['equity']['underwater']
+        underwater_fig = go.Figure(scatter_trace(len(underwater))(
+            x=underwater['timestamp'].to_numpy(),
+            y=underwater['drawdown'].to_numpy(),
+            mode='lines',
+            fill='tozeroy',
+            line=dict(width=1, color='#EF553B'),
+            name='낙폭',
+        ))
+        underwater_fig.update_layout(
+            title='언더워터 곡선 (직전 고점 대비 자산 하락률)',
+            xaxis_title='날짜',
+            yaxis_title='낙폭 (%)',
+            height=350,
+            template='plotly_dark',
+        )
+
+    rolling_fig = None
+    if risk['trades'] is not None and risk['trades']['rolling'] is not None:
+        rolling = risk['trades']['rolling']
+        scatter_class = scatter_trace(len(rolling))
+        rolling_fig = make_subplots(specs=[[{"secondary_y": True}]])
+        rolling_fig.add_trace(scatter_class(
+            x=rolling['close_timestamp'].to_numpy(),
+            y=rolling['win_rate'].to_numpy(),
+            mode='lines',
+            line=dict(width=2, color='#00CC96'),
+            name='롤링 승률 (%)',
+        ))
+        rolling_fig.add_trace(scatter_class(
+            x=rolling['close_timestamp'].to_numpy(),
+            y=rolling['expectancy'].to_numpy(),
+            mode='lines',
+            line=dict(width=1, color='#FFA15A'),
+            name='롤링 기대값 (USDT)',
+        ), secondary_y=True)
+        rolling_fig.update_layout(
+            title=f"최근 {risk['trades']['window']}거래 롤링 승률 / 기대값",
+            xaxis_title='종료 시각',
+            yaxis_title='승률 (%)',
+            yaxis2_title='거래당 기대 PnL (USDT)',
+            height=400,
+            template='plotly_dark',
+            hovermode='x unified',
+        )
+    return underwater_fig, rolling_fig
+
+@metered_cache(st.cache_resource(max_entries=8))
+def cached_risk_figures(trades_version, account_version, start, end, rolling_trades, _risk):
+    # 리스크 분석 결과와 같은 키로 그림을 재사용 (세션 간 공유되므로 수정 금지)
+    return build_risk_figures(_risk)
+
+def _format_ratio(value):
+    if value is None or np.isnan(value):
+        return "-"
+    return "∞" if np.isinf(value) else f"{value:.2f}"
+
+def _format_duration(duration):
+    hours = duration.total_seconds() / 3600
+    return f"{hours:.1f}시간" if hours < 48 else f"{hours / 24:.1f}일"
+
+def _stat_card(label, value, value_class=""):
+    st.markdown('<div class="info-box">' +
+              f'<div class="stat-label">{label}</div>' +
+              f'<div class="stat-value {value_class}">{value}</div>' +
+              '</div>', unsafe_allow_html=True)
+
+def render_risk_tab(trades_version, start, end, trades):
+    rolling_trades = st.select_slider(
+        "롤링 구간 (거래 수)", RISK_ROLLING_OPTIONS, value=RISK_ROLLING_TRADES,
+        key='risk_rolling_trades',
+    )
+    # 낙폭/샤프 비율은 다운샘플링하지 않은 자산(equity) 이력으로 계산
+    snapshot = current_data_snapshot()
+    account, account_version = None, None
+    with track_section("risk_account_data"):
+        try:
+            account_version = account_data_version(snapshot, start, end)
+            account = window_account(snapshot, start, end, "원본", ACCOUNT_CHART_POINTS)
+            account_version = stale_version(account_version, 'account')
+        except Exception as e:
+            st.error(f"계정 이력을 불러오는 중 오류가 발생했습니다: {str(e)}")
+    with track_section("risk_analytics"):
+        risk = cached_risk_analytics(
+            trades_version, account_version, start, end, rolling_trades, trades, account
+        )
+        underwater_fig, rolling_fig = cached_risk_figures(
+            trades_version, account_version, start, end, rolling_trades, risk
+        )
+
+    equity = risk['equity']
+    if equity is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            _stat_card("최대 낙폭 (MDD)", f"{equity['max_drawdown'] * 100:.2f}%", "loss")
+        with col2:
+            _stat_card("최장 낙폭 기간", _format_duration(equity['max_drawdown_duration']))
+        with col3:
+            _stat_card("샤프 비율 (일간, 연율화)", _format_ratio(equity['sharpe']))
+        with col4:
+            _stat_card("소르티노 비율 (일간, 연율화)", _format_ratio(equity['sortino']))
+        st.caption(
+            f"MDD 구간: {equity['max_drawdown_peak']:%Y-%m-%d %H:%M} → "
+            f"{equity['max_drawdown_trough']:%Y-%m-%d %H:%M} · 현재 낙폭 "
+            f"{equity['current_drawdown'] * 100:.2f}% · 자산 기록 {equity['samples']:,}건 / {equity['days']}일"
+        )
+        st.plotly_chart(underwater_fig, use_container_width=True)
+    else:
+        st.info("선택한 기간에 자산(equity) 기록이 없습니다.")
+
+    trade_risk = risk['trades']
+    if trade_risk is not None:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            _stat_card("수익 팩터", _format_ratio(trade_risk['profit_factor']))
+        with col2:
+            _stat_card("거래당 기대값", f"${trade_risk['expectancy']:.2f}",
+                       "profit" if trade_risk['expectancy'] > 0 else "loss")
+        if rolling_fig is not None:
+            with col3:
+                _stat_card(f"최근 {rolling_trades}거래 승률", f"{trade_risk['last_win_rate']:.1f}%")
+            with col4:
+                _stat_card(f"최근 {rolling_trades}거래 기대값", f"${trade_risk['last_expectancy']:.2f}")
+            st.plotly_chart(rolling_fig, use_container_width=True)
+        else:
+            st.info(f"롤링 통계를 계산하려면 완료된 거래가 {rolling_trades}건 이상 필요합니다.")
+    else:
+        st.info("선택한 기간에 완료된 거래가 없습니다.")
+
+# 켈리 시뮬레이션 결과 표: (컬럼, 한글 라벨, 형식, 백분율 변환 여부)
+SIMULATION_TABLE_COLUMNS = [
+    ('strategy', '포지션 크기', None, False),
+    ('median_final', '최종 자산 중앙값(배)', "%.3f", False),
+    ('p5_final', '하위 5%(배)', "%.3f", False),
+    ('p95_final', '상위 5%(배)', "%.3f", False),
+    ('growth_per_trade', '거래당 성장률', "%.4f%%", True),
+    ('loss_probability', '손실 확률', PERCENT_FORMAT, True),
+    ('median_max_drawdown', 'MDD 중앙값', PERCENT_FORMAT, True),
+    ('ruin_probability', f'낙폭 {abs(montecarlo.RUIN_DRAWDOWN):.0%} 이상 확률', PERCENT_FORMAT, True),
+]
+
+def build_simulation_figure(simulation):
+    """Median equity path per sizing plus the 5-95% band of the recorded sizing."""
+    steps = simulation['steps']
+    bands = simulation['bands']
+    percentiles = list(montecarlo.PATH_PERCENTILES)
+    low, median, high = percentiles.index(5), percentiles.index(50), percentiles.index(95)
+    realised = SIMULATION_MULTIPLIERS.index(1.0)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=np.concatenate([steps, steps[::-1]]),
+        y=np.concatenate([bands[high, realised], bands[low, realised][::-1]]),
+        fill='toself',
+        fillcolor='rgba(99, 110, 250, 0.2)',
+        line=dict(width=0),
+        hoverinfo='skip',
+        name='실제 켈리 5-95% 구간',
+    ))
+    for i, label in enumerate(simulation['labels']):
+        fig.add_trace(go.Scatter(
+            x=steps,
+            y=bands[median, i],
+            mode='lines',
+            line=dict(width=3 if i == realised else 1.5),
+            name=f'{label} (중앙값)',
+        ))
+    fig.add_hline(y=1.0, line_dash='dot', line_color='gray')
+    fig.update_layout(
+        title=f"거래 {simulation['trades']:,}회 후 자산 배수 ({simulation['paths']:,}개 경로)",
+        xaxis_title='거래 수',
+        yaxis_title='자산 배수 (시작 = 1)',
+        height=450,
+        template='plotly_dark',
+        hovermode='x unified',
+    )
+    return fig
+
+@metered_cache(st.cache_resource(max_entries=8))
+def cached_simulation_figure(trades_version, start, end, n_paths, n_trades, _simulation):
+    # 시뮬레이션 결과와 같은 키로 그림을 재사용 (세션 간 공유되므로 수정 금지)
+    return build_simulation_figure(_simulation)
+
+def build_calibration_figure(curve):
+    """Predicted versus realised win rate per bucket with binomial error bars."""
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(go.Bar(
+        x=curve['predicted'],
+        y=curve['trade_count'],
+        width=4,
+        marker_color='rgba(150, 150, 150, 0.35)',
+        name='거래 수',
+    ), secondary_y=True)
+    fig.add_trace(go.Scatter(
+        x=[0, 100],
+        y=[0, 100],
+        mode='lines',
+        line=dict(dash='dash', color='gray'),
+        name='완벽한 보정',
+    ))
+    fig.add_trace(go.Scatter(
+        x=curve['predicted'],
+        y=curve['realised'],
+        mode='lines+markers',
+        error_y=dict(type='data', array=curve['stderr']),
+        customdata=curve[['bucket', 'trade_count']],
+        hovertemplate='%{customdata[0]}: 예측 %{x:.1f}% / 실제 %{y:.1f}% (%{customdata[1]}건)<extra></extra>',
+        line=dict(color='#00CC96'),
+        name='실제 승률',
+    ))
+    fig.update_layout(
+        title='승리 확률 보정 곡선 (예측 vs 실제 승률)',
+        xaxis_title='예측 승리 확률 (구간 평균, %)',
+        yaxis_title='실제 승률 (%)',
+        yaxis2_title='거래 수',
+        xaxis_range=[0, 100],
+        yaxis_range=[0, 100],
+        height=450,
+        template='plotly_dark',
+    )
+    return fig
+
+@metered_cache(st.cache_data(max_entries=8))
+def cached_win_probability_calibration(trades_version, start, end, _trades):
+    return win_probability_calibration(_trades)
+
+def render_simulation_tab(trades_version, start, end, trades):
+    col1, col2 = st.columns(2)
+    with col1:
+        n_paths = st.select_slider(
+            "시뮬레이션 경로 수", SIMULATION_PATH_OPTIONS, value=10000, key='simulation_paths',
+        )
+    with col2:
+        n_trades = st.select_slider(
+            "경로당 거래 수", SIMULATION_TRADE_OPTIONS, value=500, key='simulation_trades',
+        )
+
+    with track_section("kelly_simulation"):
+        with st.spinner("몬테카를로 시뮬레이션 중..."):
+            simulation = cached_kelly_simulation(trades_version, start, end, n_paths, n_trades, trades)
+    if simulation is None:
+        st.info("시뮬레이션할 완료된 거래(수익률, 켈리 비율)가 없습니다.")
+    else:
+        st.caption(
+            f"완료된 거래 {simulation['samples']:,}건의 수익률(pnl_percentage)과 켈리 비율을 복원 추출해 "
+            f"거래마다 자산을 (1 + 배수 x 켈리 비율 x 수익률) 로 복리 계산합니다."
+        )
+        st.plotly_chart(
+            cached_simulation_figure(trades_version, start, end, n_paths, n_trades, simulation),
+            use_container_width=True,
+        )
+        summary = pd.DataFrame(simulation['summary'])
+        summary.insert(0, 'strategy', simulation['labels'])
+        summary = prepare_display_frame(summary, SIMULATION_TABLE_COLUMNS)
+        st.dataframe(
+            summary,
+            column_config=build_column_config(SIMULATION_TABLE_COLUMNS),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    with track_section("win_probability_calibration"):
+        curve, brier = cached_win_probability_calibration(trades_version, start, end, trades)
+    if curve.empty:
+        st.info("승리 확률이 기록된 완료 거래가 없습니다.")
+        return
+    st.plotly_chart(build_calibration_figure(curve), use_container_width=True)
+    st.caption(f"브라이어 점수: {brier:.4f} (0 에 가까울수록 예측이 정확, 항상 50% 로 예측하면 0.25)")
+
+@track_section("analysis")
+def render_analysis_tabs(stats, analytics, data_version, start, end, trades):
+    # 5. 성과 분석 섹션
+    st.markdown('<div class="sub-header">성과 분석</div>', unsafe_allow_html=True)
+    
+    # 분석 탭: 선택한 탭의 그래프만 만들고 (데이터 버전, 범위, 탭) 단위로 재사용
+    tab = st.radio(
+        "분석 항목", ANALYSIS_TABS, horizontal=True,
+        key='analysis_tab', label_visibility='collapsed',
+    )
+    if tab == "리스크 분석":
+        # 자산 이력과 거래 순서로 계산하므로 탭 안에서 필요한 데이터를 직접 준비
+        with track_section("analysis_render:리스크 분석"):
+            render_risk_tab(data_version, start, end, trades)
+        return
+    if tab == "켈리 시뮬레이션":
+        with track_section("analysis_render:켈리 시뮬레이션"):
+            render_simulation_tab(data_version, start, end, trades)
+        return
+    if tab == "종합 통계":
+        has_data = stats['total_trades'] > 0
+    else:
+        has_data = not analytics[BUCKET_ANALYSIS_TABS[tab][0]].empty
+    with track_section(f"analysis_figures:{tab}"):
+        figures = build_analysis_figures(tab, data_version, start, end, analytics) if has_data else []
+    
+    with track_section(f"analysis_render:{tab}"):
+        if tab == "종합 통계":
+            render_summary_tab(stats, figures)
+        else:
+            render_bucket_tab(tab, analytics, figures)
+
+# 최근 거래 내역 페이지 조회 옵션
+TRADE_PAGE_SIZES = [25, 50, 100, 200]
+TRADE_SORT_ORDERS = {"최신순": True, "오래된순": False}  # 값: 내림차순 여부
+
+# 거래 표 필터: (컬럼, SQL 컬럼, 한글 라벨)
+TRADE_FILTER_COLUMNS = [
+    ('action', 't.action', '포지션'),
+    ('status', 't.status', '상태'),
+    ('result', 'tr.result', '결과'),
+]
+
+def trade_page_clause(start, end, filters, descending, cursor, limit):
+    """WHERE/ORDER BY/LIMIT for one keyset page ordered by ``(timestamp, id)``.
+
+    ``cursor`` is the ``(timestamp, id)`` of the last row of the previous page
+    (``None`` for the first page). The trades timestamp index also carries the
+    primary key, so the seek and the ordering are both served by the index.
+    """
+    conditions = ["t.timestamp >= :start", "t.timestamp < :end"]
+    params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime(), 'limit': limit}
+    for column, sql_column, _ in TRADE_FILTER_COLUMNS:
+        values = dict(filters).get(column)
+        if values:
+            names = [f"{column}_{i}" for i in range(len(values))]
+            conditions.append(f"{sql_column} IN ({', '.join(':' + name for name in names)})")
+            params.update(zip(names, values))
+    if cursor is not None:
+        op = '<' if descending else '>'
+        conditions.append(
+            f"(t.timestamp {op} :cursor_ts OR (t.timestamp = :cursor_ts AND t.id {op} :cursor_id))"
+        )
+        params['cursor_ts'] = cursor[0].to_pydatetime()
+        params['cursor_id'] = int(cursor[1])
+    direction = 'DESC' if descending else 'ASC'
+    clause = (
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY t.timestamp {direction}, t.id {direction} LIMIT :limit"
+    )
+    return clause, params
+
+@metered_cache(st.cache_data(max_entries=64))
+def load_trade_page(trades_version, start, end, filters, descending, cursor, page_size):
+    # 다음 페이지 존재 여부를 알기 위해 한 건 더 조회 (데이터 버전별로 캐시)
+    clause, params = trade_page_clause(start, end, filters, descending, cursor, page_size + 1)
+    return metered_load('load_trade_page', _fetch_trades, clause, params)
+
+def trade_filter_options(trades):
+    # 필터 선택지는 이미 메모리에 있는 범위 데이터의 값으로 구성
+    return tuple(
+        (column, tuple(sorted(trades[column].dropna().unique())) if column in trades.columns else ())
+        for column, _, _ in TRADE_FILTER_COLUMNS
+    )
+
+def _reset_trade_page():
+    st.session_state['trade_page_cursors'] = [None]
+
+def _next_trade_page(cursor):
+    st.session_state['trade_page_cursors'].append(cursor)
+
+def _previous_trade_page():
+    if len(st.session_state['trade_page_cursors']) > 1:
+        st.session_state['trade_page_cursors'].pop()
+
+@track_section("trade_table")
+def render_trade_table(trades_version, start, end, filter_options):
+    # 6. 최근 거래 내역 표 (현재 페이지만 조회해 브라우저로 전송)
+    st.markdown('<div class="sub-header">최근 거래 내역</div>', unsafe_allow_html=True)
+    
+    size_col, sort_col, *filter_cols = st.columns(2 + len(TRADE_FILTER_COLUMNS))
+    page_size = size_col.selectbox(
+        "페이지 크기", TRADE_PAGE_SIZES, key='trade_page_size', on_change=_reset_trade_page
+    )
+    sort_order = sort_col.selectbox(
+        "정렬", list(TRADE_SORT_ORDERS), key='trade_sort', on_change=_reset_trade_page
+    )
+    filters = tuple(
+        (column, tuple(filter_col.multiselect(
+            label, dict(filter_options)[column],
+            key=f'trade_filter_{column}', on_change=_reset_trade_page,
+        )))
+        for filter_col, (column, _, label) in zip(filter_cols, TRADE_FILTER_COLUMNS)
+    )
+    
+    # 조회 범위가 바뀌면 첫 페이지부터
+    if st.session_state.get('trade_page_window') != (start, end):
+        st.session_state['trade_page_window'] = (start, end)
+        _reset_trade_page()
+    cursors = st.session_state.setdefault('trade_page_cursors', [None])
+    
+    descending = TRADE_SORT_ORDERS[sort_order]
+    with track_section("trade_page_query"):
+        try:
+            page = load_trade_page(
+                trades_version, start, end, filters, descending, cursors[-1], page_size
+            )
+        except Exception as e:
+            st.error(f"거래 내역을 불러오는 중 오류가 발생했습니다: {str(e)}")
+            return
+    has_next = len(page) > page_size
+    page = page.iloc[:page_size]
+    
+    if page.empty:
+        if any(values for _, values in filters):
+            st.info("조건에 맞는 거래 내역이 없습니다.")
+        else:
+            st.info("선택한 기간에 거래 내역이 없습니다.")
+        return
+    
+    # 숫자 컬럼은 그대로 두고 표시 형식만 지정
+    with track_section("trade_table_dataframe"):
+        st.dataframe(
+            prepare_display_frame(page, TRADE_TABLE_COLUMNS),
+            column_config=build_column_config(TRADE_TABLE_COLUMNS),
+        )
+    
+    last = page.iloc[-1]
+    prev_col, page_col, next_col = st.columns([1, 4, 1])
+    prev_col.button(
+        "◀ 이전", key='trade_page_prev', disabled=len(cursors) == 1,
+        on_click=_previous_trade_page,
+    )
+    page_col.caption(f"{len(cursors)}페이지 · {len(page)}건")
+    next_col.button(
+        "다음 ▶", key='trade_page_next', disabled=not has_next,
+        on_click=_next_trade_page, args=((last['timestamp'], int(last['id'])),),
+    )
+
+# 화면 구역별 데이터 조회 (스냅샷이 범위를 포함하면 DB 조회 없이 사용)
+def trades_data_version(snapshot, start, end):
+    # 거래 기반 구역의 입력 버전: 스냅샷 버전, 범위 밖이면 DB 변경 감지 값
+    if snapshot_covers(snapshot, start, end):
+        return f"snapshot:{snapshot.trades_version}"
+    return f"db:{probe_data_fingerprint(allow_stale=True)['trades']}"
+
+def account_data_version(snapshot, start, end):
+    # 계정 이력 기반 계산의 입력 버전: 스냅샷 버전, 범위 밖이면 DB 변경 감지 값
+    if snapshot_covers(snapshot, start, end):
+        return f"snapshot:{snapshot.account_version}"
+    return f"db:{probe_data_fingerprint(allow_stale=True)['account_history']}"
+
+def stale_version(version, name):
+    # 조회 name 이 마지막 정상 결과를 대신 반환했으면 버전을 구분해 최신 버전으로 캐시되는
+    # 계산 결과와 섞이지 않도록 함 (변경 감시에는 구분 없는 버전을 넘기고 회복 여부는 따로 확인)
+    stale = stale_data_loaded_at(name)
+    return version if stale is None else f"{version}:stale:{stale:.0f}"
+
+def window_trades(snapshot, start, end):
+    if snapshot_covers(snapshot, start, end):
+        return snapshot_trades(snapshot, start, end)
+    # 스냅샷 범위 밖의 기간은 날짜 범위 쿼리로 직접 조회 (SQL에서 범위 적용)
+    return await_load('trades', load_trades_data, start, end)
+
+def window_trade_analytics(version, start, end, trades):
+    return cached_trade_analytics(version, start, end, trades, bucket_aggregation_mode())
+
+@metered_cache(st.cache_data(max_entries=4))
+def window_trades_memory(version, start, end, _trades):
+    # 메모리 보고 (deep memory_usage 는 문자열 열을 훑으므로 데이터 버전별로 한 번만)
+    return trades_memory_report(_trades)
+
+@metered_cache(st.cache_data(ttl=10, show_spinner=False))
+def load_latest_account(start, end):
+    query = """
+    SELECT timestamp, balance, equity, unrealized_pnl
+    FROM account_history
+    WHERE timestamp >= :start AND timestamp < :end
+    ORDER BY timestamp DESC
+    LIMIT 1
+    """
+    params = {'start': start.to_pydatetime(), 'end': end.to_pydatetime()}
+    try:
+        df = pd.read_sql_query(text(query), get_engine(), params=params)
+    except SQLAlchemyError as exc:
+        raise RuntimeError("계정 이력을 불러오는 중 오류가 발생했습니다.") from exc
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+def window_current_balance(snapshot, start, end):
+    # 범위 안의 마지막 잔액 (스냅샷은 정렬되어 있으므로 이진 탐색)
+    if snapshot_covers(snapshot, start, end):
+        account = snapshot.account
+        idx = account['timestamp'].searchsorted(end) - 1
+        if idx < 0 or account['timestamp'].iloc[idx] < start:
+            return None
+        return account['balance'].iloc[idx]
+    latest = await_load('latest_account', load_latest_account, start, end)
+    return None if latest.empty else latest['balance'].iloc[0]
+
+@metered_cache(st.cache_data(max_entries=16))
+def cached_account_buckets(account_version, start, end, target_points, use_lttb, _snapshot):
+    # 같은 계정 이력 버전/범위/해상도의 버킷 집계는 모든 세션이 공유
+    return downsample_account_history(
+        start, end, target_points, use_lttb=use_lttb,
+        account_df=snapshot_account(_snapshot, start, end),
+    )
+
+def window_account(snapshot, start, end, chart_mode, target_points):
+    use_lttb = chart_mode == "다운샘플링 + LTTB"
+    if snapshot_covers(snapshot, start, end):
+        if chart_mode == "원본":
+            return snapshot_account(snapshot, start, end)
+        return cached_account_buckets(
+            snapshot.account_version, start, end, target_points, use_lttb, snapshot
+        )
+    if chart_mode == "원본":
+        return await_load('account', load_account_history, start, end)
+    return await_load(
+        'account', downsample_account_history, start, end, target_points, use_lttb
+    )
 
-    # ① copy() 로 명시적 복사본 만들기
-    closed_trades = trades_df[trades_df['status']=='closed'].copy()
-    if closed_trades.empty:
-        return pd.DataFrame()
-
-    bins   = [0, 0.02, 0.05, 0.08, 0.1, 1.0]
-    labels = ['0-2%', '2-5%', '5-8%', '8-10%', '10%+']
-
-    closed_trades['kelly_range'] = pd.cut(
-        closed_trades['kelly_fraction'],
-        bins=bins,
-        labels=labels,
-        right=False
-    )
-
-    # ② observed=False 를 명시
-    kelly_performance = closed_trades.groupby('kelly_range', observed=False).agg({
-        'id': 'count',
-        'pnl': [
-            'sum',
-            'mean',
-            lambda x: (x>0).sum()/len(x) if len(x)>0 else 0
-        ]
-    }).reset_index()
-
-    kelly_performance.columns = [
-        'kelly_range', 'trade_count', 'total_pnl', 'avg_pnl', 'win_rate'
-    ]
-    return kelly_performance
+def prefetch_window_loads(snapshot, start, end, chart_mode, target_points):
+    # 스냅샷이 포함하지 않는 조회를 미리 동시에 시작 (각 구역은 같은 작업의 결과를 기다림)
+    if snapshot is None:
+        submit_load('active_trade', load_active_trade)
+    if snapshot_covers(snapshot, start, end):
+        return
+    submit_load('trades', load_trades_data, start, end)
+    submit_load('latest_account', load_latest_account, start, end)
+    if chart_mode == "원본":
+        submit_load('account', load_account_history, start, end)
+    else:
+        submit_load(
+            'account', downsample_account_history, start, end, target_points,
+            chart_mode == "다운샘플링 + LTTB",
+        )
+    if bucket_aggregation_mode() == 'rollup':
+        submit_load('rollups', sync_rollups)
 
+# 실시간 구역: 상태 개요 + 활성 거래 (짧은 주기로 이 부분만 다시 실행)
+@track_section("live")
+def render_live_sections(start, end):
+    snapshot = current_data_snapshot()
+    try:
+        with track_section("live_data"):
+            trades = window_trades(snapshot, start, end)
+            analytics = window_trade_analytics(
+                stale_version(trades_data_version(snapshot, start, end), 'trades'),
+                start, end, trades
+            )
+            current_balance = window_current_balance(snapshot, start, end)
+    except Exception as e:
+        st.error(f"데이터 로딩 중 오류가 발생했습니다: {str(e)}")
+        return
+    with track_section("status_overview"):
+        render_status_overview(analytics['stats'], current_balance)
 
-# 최신 활성 거래 정보 가져오기
-def get_active_trade_info(trades_df):
-    if trades_df.empty:
-        return None
-    
-    # 오픈된 거래만 필터링
-    open_trades = trades_df[trades_df['status'] == 'open']
-    if open_trades.empty:
-        return None
-    
-    # 가장 최근의 오픈된 거래
-    latest_open = open_trades.iloc[0]
-    return latest_open
+    # 활성 거래 상태 (날짜 범위와 무관)
+    with track_section("active_trade"):
+        try:
+            active_trade = get_active_trade_info(
+                snapshot.active_trade if snapshot is not None
+                else await_load('active_trade', load_active_trade)
+            )
+        except Exception as e:
+            st.error(f"활성 거래 정보를 불러오는 중 오류가 발생했습니다: {str(e)}")
+            active_trade = None
+        render_active_trade(active_trade)
 
-# PnL 색상 강조 함수 (데이터프레임 표시용)
-def color_pnl(val):
-    if pd.isna(val):
-        color = 'black'
-    elif val > 0:
-        color = '#00CC96'  # 수익은 녹색
-    elif val < 0:
-        color = '#EF553B'  # 손실은 빨간색
+# 잔액 차트 구역: 계정 이력은 자주 바뀌므로 자동 새로고침 주기마다 이 부분만 다시 실행
+@track_section("balance")
+def render_balance_section(start, end, chart_mode, target_points, account_chart_series):
+    snapshot = current_data_snapshot()
+    try:
+        with track_section("balance_data"):
+            filtered_account = window_account(snapshot, start, end, chart_mode, target_points)
+    except Exception as e:
+        st.error(f"계정 이력을 불러오는 중 오류가 발생했습니다: {str(e)}")
+        return
+    # 스냅샷 데이터는 계정 이력 버전이 있으므로 그림도 버전/범위/표시 옵션별로 재사용
+    cache_key = (
+        (f"snapshot:{snapshot.account_version}", start, end, chart_mode, target_points)
+        if snapshot_covers(snapshot, start, end) else None
+    )
+    render_balance_chart(filtered_account, account_chart_series, cache_key)
+
+def db_recovered_since(timestamp):
+    # 조회 엔진의 회로가 닫혀 있고 timestamp 이후 성공한 쿼리가 있으면 DB 가 다시 응답하는 것으로 봄
+    breaker = getattr(get_engine().pool, 'breaker', None)
+    if breaker is None:
+        return False
+    with breaker['lock']:
+        return breaker['opened_at'] is None and (breaker['last_success_at'] or 0) > timestamp
+
+# 거래 데이터 버전이 바뀐 경우에만 전체 화면(거래 그래프/분석/거래 내역)을 다시 실행
+def watch_trades_version(rendered_version, start, end, stale_rendered_at=None):
+    # rendered_version 은 stale_version 표시가 없는 버전, stale_rendered_at 은 마지막 정상
+    # 결과로 화면을 그린 시각 (DB 장애 중에는 버전이 그대로이므로 새로고침하지 않음)
+    try:
+        version = trades_data_version(current_data_snapshot(), start, end)
+    except Exception:
+        logger.warning("데이터 변경 여부를 확인할 수 없습니다.", exc_info=True)
+        return
+    if version != rendered_version:
+        st.rerun()
+    if stale_rendered_at is not None and db_recovered_since(stale_rendered_at):
+        # DB 가 회복된 뒤 한 번만 다시 실행해 마지막 정상 결과 대신 최신 데이터를 표시
+        st.rerun()
+
+# 회로 차단기 이름 (원본 DB / 읽기 전용 복제본)
+DATABASE_NAMES = ('primary', 'replica')
+
+def _format_age(seconds):
+    if seconds < 120:
+        return f"{seconds:.0f}초"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}분"
+    return f"{seconds / 3600:.1f}시간"
+
+def render_staleness_banner(placeholder):
+    """Warn above the dashboard while it shows data from before a DB failure."""
+    now = time.time()
+    opened = [
+        breaker for breaker in map(get_circuit_breaker, DATABASE_NAMES)
+        if breaker['opened_at'] is not None
+    ]
+    # 표시 중인 데이터의 기준 시점: 대신 표시한 조회 결과와 마지막 스냅샷 갱신 중 오래된 쪽
+    loaded_at = [stale_data_loaded_at()]
+    if opened:
+        loaded_at.append(get_data_refresher()['succeeded_at'])
+    loaded_at = [value for value in loaded_at if value is not None]
+    if not opened and not loaded_at:
+        placeholder.empty()
+        return
+    served = f"{_format_age(now - min(loaded_at))} 전 데이터를 표시하며 " if loaded_at else ""
+    if opened:
+        breaker = opened[0]
+        retry = max(breaker['retry_at'] - time.monotonic(), 0)
+        placeholder.warning(
+            f"⚠️ {breaker['name']} DB 응답이 원활하지 않아 조회를 잠시 멈췄습니다 "
+            f"({breaker['last_error']}). {served}{retry:.0f}초 후 다시 확인합니다."
+        )
     else:
-        color = 'white'
-    return f'color: {color}'
+        placeholder.warning(
+            f"⚠️ 일부 데이터를 불러오지 못해 {_format_age(now - min(loaded_at))} 전 데이터를 표시합니다."
+        )
+
+def render_query_stats():
+    """Sidebar expander with the rolling DB query and connection pool summary."""
+    with st.sidebar.expander("DB 쿼리 통계"):
+        summary, by_statement = query_stats_summary(get_query_stats())
+        if summary is None:
+            st.caption("기록된 쿼리가 없습니다.")
+            return
+        st.caption(
+            f"최근 {summary['queries']}건 ({summary['window_seconds']:.0f}초) · "
+            f"지연 p50 {summary['latency_p50_ms']:.1f}ms / p95 {summary['latency_p95_ms']:.1f}ms / "
+            f"최대 {summary['latency_max_ms']:.1f}ms"
+        )
+        st.caption(
+            f"가져온 행 {summary['rows']:,}개 · 약 {summary['bytes'] / 1024 ** 2:.1f}MB · "
+            f"풀 대기 p95 {summary['pool_wait_p95_ms']:.1f}ms / 최대 {summary['pool_wait_max_ms']:.1f}ms"
+        )
+        st.caption(f"연결 풀: {get_engine().pool.status()}")
+        st.caption("회로 차단: " + " / ".join(
+            f"{breaker['name']} " + ("차단 중" if breaker['opened_at'] is not None
+                                     else f"정상 (연속 실패 {breaker['failures']}회)")
+            for breaker in map(get_circuit_breaker, DATABASE_NAMES)
+        ))
+        st.dataframe(by_statement, hide_index=True, use_container_width=True)
+
+def render_profile(run):
+    """Sidebar breakdown of one profiled rerun: section table, flame chart, cProfile."""
+    records = sorted(run['records'], key=lambda record: (record['start'], record['depth']))
+    total = max(run['total'], 1e-9)
+    queries = [
+        record for record in list(get_query_stats()['queries'])
+        if record['at'] >= run['started_at']
+    ]
+    with st.sidebar.expander("렌더링 프로파일", expanded=True):
+        st.caption(
+            f"전체 {run['total'] * 1000:.0f}ms · 같은 시간 DB 쿼리 {len(queries)}건 "
+            f"{sum(record['latency_ms'] for record in queries):.0f}ms (프로세스 전체). "
+            "프래그먼트 단독 재실행은 포함되지 않습니다."
+        )
+        table = pd.DataFrame({
+            '구역': ["　" * record['depth'] + record['section'] for record in records],
+            '소요_ms': [record['seconds'] * 1000 for record in records],
+            '비율_%': [record['seconds'] / total * 100 for record in records],
+        })
+        st.dataframe(table, hide_index=True, use_container_width=True)
+
+        # 플레임 형태: 깊이별 한 줄, 막대 위치는 시작 시점, 길이는 소요 시간
+        flame = go.Figure(go.Bar(
+            x=[record['seconds'] * 1000 for record in records],
+            base=[record['start'] * 1000 for record in records],
+            y=[record['depth'] for record in records],
+            orientation='h',
+            text=[record['section'] for record in records],
+            textposition='inside',
+            insidetextanchor='start',
+            hovertemplate="%{text}: %{x:.1f}ms<extra></extra>",
+        ))
+        flame.update_layout(
+            height=80 + 28 * (max((record['depth'] for record in records), default=0) + 1),
+            margin=dict(l=0, r=0, t=10, b=30),
+            template='plotly_dark',
+            bargap=0.05,
+            xaxis_title='ms',
+        )
+        flame.update_yaxes(autorange='reversed', showticklabels=False)
+        st.plotly_chart(flame, use_container_width=True)
+
+        if run['profiler'] is not None:
+            # cProfile 은 스크립트 스레드만 측정 (조회 워커/백그라운드 갱신 제외)
+            report = io.StringIO()
+            stats = pstats.Stats(run['profiler'], stream=report)
+            stats.sort_stats('cumulative').print_stats(25)
+            st.code(report.getvalue(), language=None)
+            # .prof 파일 (pstats / snakeviz 로 열 수 있는 marshal 형식)
+            st.download_button(
+                "cProfile 결과 다운로드 (.prof)",
+                marshal.dumps(stats.stats),
+                file_name=f"dash-{datetime.now():%Y%m%d-%H%M%S}.prof",
+            )
 
 # 메인 대시보드 UI
+@profiled
+@track_section("script")
 def main():
+    # 메트릭 서버 (DASH_METRICS_PORT 가 설정된 경우 프로세스당 한 번 시작)
+    get_metrics_server()
+
     # 헤더
     st.markdown('<div class="main-header">비트코인 트레이딩 봇 대시보드</div>', unsafe_allow_html=True)
+    # DB 장애로 이전 데이터를 표시하는 경우의 안내 (화면을 다 그린 뒤 채움)
+    reset_stale_data()
+    stale_banner = st.empty()
     
     
-    # 데이터 로딩
-    with st.spinner('데이터 로딩 중...'):
-        try:
-            trades_df = load_trades_data()
-            account_history = load_account_history()
-        except Exception as e:
-            st.error(f"데이터 로딩 중 오류가 발생했습니다: {str(e)}")
-            return
-    
     # 사이드바
     st.sidebar.header("설정")
     refresh_interval = st.sidebar.slider("자동 새로고침 간격(초)", 5, 300, 60)
+    live_interval = st.sidebar.slider("실시간 영역 갱신 간격(초)", 2, 60, 10)
     date_range = st.sidebar.date_input(
         "날짜 범위",
         value=(datetime.now() - timedelta(days=30), datetime.now()),
@@ -393,483 +4249,129 @@ def main():
     else:
         start_date = end_date = date_range
     
-    # 필터 적용된 데이터 (날짜 범위)
+    account_chart_mode = st.sidebar.selectbox(
+        "잔액 차트 표시 방식",
+        ["다운샘플링", "다운샘플링 + LTTB", "원본"],
+    )
+    account_chart_points = st.sidebar.slider(
+        "잔액 차트 해상도(포인트 수)", 500, 5000, ACCOUNT_CHART_POINTS, step=100
+    )
+    account_chart_series = st.sidebar.multiselect(
+        "잔액 차트 추가 항목",
+        ["자산(equity)", "미실현 손익"],
+    )
+
+    # 조회 범위 (종료일 포함)
     start_date = pd.Timestamp(start_date)
-    end_date = pd.Timestamp(end_date) + timedelta(days=1)  # 포함 범위
+    end_date = pd.Timestamp(end_date) + timedelta(days=1)
     
-    filtered_trades = trades_df[(trades_df['timestamp'] >= start_date) & (trades_df['timestamp'] <= end_date)]
-    filtered_account = account_history[(account_history['timestamp'] >= start_date) & (account_history['timestamp'] <= end_date)]
-    
-    # 성과 통계 계산
-    stats = calculate_performance_stats(filtered_trades)
-    
-    # 활성 거래 상태
-    active_trade = get_active_trade_info(trades_df)
-    
-    # 대시보드 섹션 구성
-    
-    # 1. 상태 개요 섹션
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown('<div class="stat-label">총 수익/손실</div>', unsafe_allow_html=True)
-        pnl_color = "profit" if stats['total_pnl'] > 0 else "loss"
-        st.markdown(f'<div class="stat-value {pnl_color}">${stats["total_pnl"]:.2f}</div>', unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown('<div class="stat-label">승률</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-value">{stats["win_rate"]:.2%}</div>', unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown('<div class="stat-label">총 거래 수</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-value">{stats["total_trades"]}</div>', unsafe_allow_html=True)
-    
-    with col4:
-        if not filtered_account.empty:
-            current_balance = filtered_account['balance'].iloc[-1]
-            st.markdown('<div class="stat-label">현재 잔액</div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="stat-value">${current_balance:.2f}</div>', unsafe_allow_html=True)
+    # 데이터 로딩: 백그라운드 스냅샷이 범위를 포함하면 DB 조회 없이 사용하고,
+    # 나머지 조회(거래/계정 이력/활성 거래/롤업)는 미리 동시에 시작
+    snapshot = current_data_snapshot()
+    try:
+        prefetch_window_loads(
+            snapshot, start_date, end_date, account_chart_mode, account_chart_points
+        )
+    except Exception as e:
+        st.error(f"데이터 로딩 중 오류가 발생했습니다: {str(e)}")
+        return
     
-    # 2. 활성 거래 정보
-    st.markdown('<div class="sub-header">활성 거래 상태</div>', unsafe_allow_html=True)
+    # 1~2. 상태 개요 / 활성 거래 (실시간 구역)
+    st.experimental_fragment(run_every=live_interval)(render_live_sections)(start_date, end_date)
     
-    if active_trade is not None:
-        active_cols = st.columns(4)
-        
-        with active_cols[0]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">포지션</div>' +
-                      f'<div class="stat-value">{active_trade["action"].upper()}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols[1]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">진입가격</div>' +
-                      f'<div class="stat-value">${active_trade["entry_price"]:.2f}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols[2]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">수량</div>' +
-                      f'<div class="stat-value">{active_trade["amount"]:.3f} BTC</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols[3]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">레버리지</div>' +
-                      f'<div class="stat-value">{active_trade["leverage"]}x</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        active_cols2 = st.columns(4)
-        
-        with active_cols2[0]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">스탑로스</div>' +
-                      f'<div class="stat-value">${active_trade["stop_loss"]:.2f}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols2[1]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">손익실현</div>' +
-                      f'<div class="stat-value">${active_trade["take_profit"]:.2f}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols2[2]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">켈리 비율</div>' +
-                      f'<div class="stat-value">{active_trade["kelly_fraction"]:.2%}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        with active_cols2[3]:
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">승리 확률</div>' +
-                      f'<div class="stat-value">{active_trade["win_probability"]:.2%}</div>' +
-                      f'</div>', unsafe_allow_html=True)
-        
-        # 개장 이후 경과 시간 계산
-        if pd.notna(active_trade["timestamp"]):
-            open_time = active_trade["timestamp"]
-            current_time = pd.Timestamp.now()
-            elapsed = current_time - open_time
-            elapsed_hours = elapsed.total_seconds() / 3600
-            
-            st.markdown(f'<div class="info-box">' +
-                      f'<div class="stat-label">개장 시간</div>' +
-                      f'<div>{open_time.strftime("%Y-%m-%d %H:%M:%S")} (약 {elapsed_hours:.1f}시간 전)</div>' +
-                      f'</div>', unsafe_allow_html=True)
-    else:
-        st.info("현재 활성화된 거래가 없습니다.")
+    # 한 조회가 실패하거나 늦어도 다른 구역은 계속 표시
+    trades_error = None
+    with st.spinner('데이터 로딩 중...'), track_section("trades"):
+        try:
+            ensure_dashboard_indexes()
+            data_version = trades_data_version(snapshot, start_date, end_date)
+            filtered_trades = window_trades(snapshot, start_date, end_date)
+            trades_version = stale_version(data_version, 'trades')
+            # 성과 통계 및 구간별 분석 (데이터 버전/범위별로 재사용)
+            analytics = window_trade_analytics(
+                trades_version, start_date, end_date, filtered_trades
+            )
+        except Exception as e:
+            trades_error = e
     
     # 3. 거래 내역 그래프
-    st.markdown('<div class="sub-header">거래 내역 & 수익/손실</div>', unsafe_allow_html=True)
-    
-    if not filtered_trades.empty and 'pnl' in filtered_trades.columns:
-        # 닫힌 거래만 필터링
-        closed_trades = filtered_trades[filtered_trades['status'] == 'closed']
-        
-        if not closed_trades.empty:
-            # 날짜별 누적 PnL 계산
-            closed_trades_sorted = closed_trades.sort_values('close_timestamp')
-            closed_trades_sorted['cumulative_pnl'] = closed_trades_sorted['pnl'].cumsum()
-            
-            # PnL 시간별 변화 그래프
-            fig = make_subplots(specs=[[{"secondary_y": True}]])
-            
-            # 개별 거래 PnL
-            scatter = go.Scatter(
-                x=closed_trades_sorted['close_timestamp'],
-                y=closed_trades_sorted['pnl'],
-                mode='markers',
-                marker=dict(
-                    size=10,
-                    color=closed_trades_sorted['pnl'].apply(lambda x: 'green' if x > 0 else 'red'),
-                    symbol=closed_trades_sorted['action'].apply(lambda x: 'triangle-up' if x == 'long' else 'triangle-down')
-                ),
-                name='개별 거래 PnL'
-            )
-            
-            # 누적 PnL
-            line = go.Scatter(
-                x=closed_trades_sorted['close_timestamp'],
-                y=closed_trades_sorted['cumulative_pnl'],
-                mode='lines',
-                line=dict(width=2, color='yellow'),
-                name='누적 PnL',
-                yaxis='y2'
-            )
-            
-            fig.add_trace(scatter)
-            fig.add_trace(line, secondary_y=True)
-            
-            fig.update_layout(
-                title='거래 내역 및 누적 수익/손실',
-                xaxis_title='날짜',
-                yaxis_title='개별 거래 PnL (USDT)',
-                yaxis2_title='누적 PnL (USDT)',
-                height=500,
-                template='plotly_dark',
-                hovermode='x unified'
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("선택한 기간에 완료된 거래가 없습니다.")
+    if trades_error is None:
+        with track_section("pnl_chart"):
+            render_pnl_chart(filtered_trades, (trades_version, start_date, end_date))
     else:
-        st.info("거래 내역이 없습니다.")
+        st.error(f"데이터 로딩 중 오류가 발생했습니다: {str(trades_error)}")
     
-    # 4. 계정 잔액 변화 그래프
-    st.markdown('<div class="sub-header">계정 잔액 변화</div>', unsafe_allow_html=True)
+    # 4. 계정 잔액 변화 그래프 (자동 새로고침 주기마다 갱신)
+    st.experimental_fragment(run_every=refresh_interval)(render_balance_section)(
+        start_date, end_date, account_chart_mode, account_chart_points, account_chart_series
+    )
     
-    if not filtered_account.empty:
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=filtered_account['timestamp'],
-            y=filtered_account['balance'],
-            mode='lines',
-            name='계정 잔액',
-            line=dict(width=2, color='#00CC96')
-        ))
-        
-        fig.update_layout(
-            title='계정 잔액 변화',
-            xaxis_title='날짜',
-            yaxis_title='잔액 (USDT)',
-            height=400,
-            template='plotly_dark',
-            hovermode='x unified'
+    if trades_error is None:
+        # 5. 성과 분석 섹션 (탭 전환 시 이 구역만 다시 실행)
+        st.experimental_fragment(render_analysis_tabs)(
+            analytics['stats'], analytics, trades_version, start_date, end_date, filtered_trades
         )
         
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("계정 잔액 내역이 없습니다.")
-    
-    # 5. 성과 분석 섹션
-    st.markdown('<div class="sub-header">성과 분석</div>', unsafe_allow_html=True)
-    
-    # 분석 탭
-    tab1, tab2, tab3, tab4 = st.tabs(["종합 통계", "시간대별 성과", "변동성별 성과", "켈리 비율별 성과"])
-    
-    with tab1:
-        if stats['total_trades'] > 0:
-            # 승패 비율 차트
-            win_loss_col, direction_col = st.columns(2)
-            
-            with win_loss_col:
-                win_loss_data = pd.DataFrame([
-                    {'Category': '수익 거래', 'Count': stats['profitable_trades']},
-                    {'Category': '손실 거래', 'Count': stats['losing_trades']}
-                ])
-                
-                fig = px.pie(
-                    win_loss_data, 
-                    names='Category', 
-                    values='Count',
-                    color='Category',
-                    color_discrete_map={'수익 거래': '#00CC96', '손실 거래': '#EF553B'},
-                    title='승패 비율'
-                )
-                fig.update_layout(template='plotly_dark')
-                st.plotly_chart(fig, use_container_width=True)
-            
-            with direction_col:
-                direction_data = pd.DataFrame([
-                    {'Direction': 'LONG', 'Count': stats['total_long'], 'Win Rate': stats['long_win_rate']},
-                    {'Direction': 'SHORT', 'Count': stats['total_short'], 'Win Rate': stats['short_win_rate']}
-                ])
-                
-                fig = px.bar(
-                    direction_data,
-                    x='Direction',
-                    y='Count',
-                    color='Win Rate',
-                    color_continuous_scale='RdYlGn',
-                    range_color=[0, 1],
-                    title='방향별 승률',
-                    text=direction_data['Win Rate'].apply(lambda x: f"{x:.2%}")
-                )
-                fig.update_layout(template='plotly_dark')
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # 통계 카드
-            stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
-            
-            with stat_col1:
-                st.markdown(f'<div class="info-box">' +
-                          f'<div class="stat-label">평균 수익</div>' +
-                          f'<div class="stat-value profit">${stats["avg_profit"]:.2f}</div>' +
-                          f'</div>', unsafe_allow_html=True)
-            
-            with stat_col2:
-                st.markdown(f'<div class="info-box">' +
-                          f'<div class="stat-label">평균 손실</div>' +
-                          f'<div class="stat-value loss">${stats["avg_loss"]:.2f}</div>' +
-                          f'</div>', unsafe_allow_html=True)
-            
-            with stat_col3:
-                st.markdown(f'<div class="info-box">' +
-                          f'<div class="stat-label">최대 수익</div>' +
-                          f'<div class="stat-value profit">${stats["max_profit"]:.2f}</div>' +
-                          f'</div>', unsafe_allow_html=True)
-            
-            with stat_col4:
-                st.markdown(f'<div class="info-box">' +
-                          f'<div class="stat-label">최대 손실</div>' +
-                          f'<div class="stat-value loss">${stats["max_loss"]:.2f}</div>' +
-                          f'</div>', unsafe_allow_html=True)
-            
-            if stats['avg_duration'] > 0:
-                st.markdown(f'<div class="info-box">' +
-                          f'<div class="stat-label">평균 거래 시간</div>' +
-                          f'<div class="stat-value">{stats["avg_duration"]:.1f}분 ({stats["avg_duration"]/60:.1f}시간)</div>' +
-                          f'</div>', unsafe_allow_html=True)
-        else:
-            st.info("선택한 기간에 완료된 거래가 없습니다.")
-    
-    with tab2:
-        time_perf = analyze_time_performance(filtered_trades)
-        if not time_perf.empty:
-            fig = px.bar(
-                time_perf, 
-                x='time_range', 
-                y='trade_count',
-                color='win_rate',
-                color_continuous_scale='RdYlGn',
-                range_color=[0, 1],
-                title='시간대별 거래 성과',
-                text=time_perf['win_rate'].apply(lambda x: f"{x:.2%}")
-            )
-            fig.update_layout(template='plotly_dark', xaxis_title='시간대', yaxis_title='거래 수')
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # 시간대별 누적 PnL
-            fig2 = px.bar(
-                time_perf,
-                x='time_range',
-                y='total_pnl',
-                color='total_pnl',
-                color_continuous_scale='RdYlGn',
-                title='시간대별 누적 수익/손실'
-            )
-            fig2.update_layout(template='plotly_dark', xaxis_title='시간대', yaxis_title='누적 PnL (USDT)')
-            st.plotly_chart(fig2, use_container_width=True)
-            
-            # 데이터프레임으로 표시
-            st.write("시간대별 거래 통계:")
-            formatted_time_df = time_perf.copy()
-            formatted_time_df['win_rate'] = formatted_time_df['win_rate'].apply(lambda x: f"{x:.2%}")
-            formatted_time_df['total_pnl'] = formatted_time_df['total_pnl'].apply(lambda x: f"${x:.2f}")
-            formatted_time_df['avg_pnl'] = formatted_time_df['avg_pnl'].apply(lambda x: f"${x:.2f}")
-            st.dataframe(formatted_time_df)
-        else:
-            st.info("시간대별 성과 분석을 위한 데이터가 충분하지 않습니다.")
-    
-    with tab3:
-        vol_perf = analyze_volatility_performance(filtered_trades)
-        if not vol_perf.empty:
-            fig = px.bar(
-                vol_perf, 
-                x='volatility_range', 
-                y='trade_count',
-                color='win_rate',
-                color_continuous_scale='RdYlGn',
-                range_color=[0, 1],
-                title='변동성별 거래 성과',
-                text=vol_perf['win_rate'].apply(lambda x: f"{x:.2%}")
-            )
-            fig.update_layout(template='plotly_dark', xaxis_title='변동성 범위', yaxis_title='거래 수')
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # 변동성별 누적 PnL
-            fig2 = px.bar(
-                vol_perf,
-                x='volatility_range',
-                y='total_pnl',
-                color='total_pnl',
-                color_continuous_scale='RdYlGn',
-                title='변동성별 누적 수익/손실'
-            )
-            fig2.update_layout(template='plotly_dark', xaxis_title='변동성 범위', yaxis_title='누적 PnL (USDT)')
-            st.plotly_chart(fig2, use_container_width=True)
-            
-            # 데이터프레임으로 표시
-            st.write("변동성별 거래 통계:")
-            formatted_vol_df = vol_perf.copy()
-            formatted_vol_df['win_rate'] = formatted_vol_df['win_rate'].apply(lambda x: f"{x:.2%}")
-            formatted_vol_df['total_pnl'] = formatted_vol_df['total_pnl'].apply(lambda x: f"${x:.2f}")
-            formatted_vol_df['avg_pnl'] = formatted_vol_df['avg_pnl'].apply(lambda x: f"${x:.2f}")
-            st.dataframe(formatted_vol_df)
-        else:
-            st.info("변동성별 성과 분석을 위한 데이터가 충분하지 않습니다.")
-    
-    with tab4:
-        kelly_perf = analyze_kelly_performance(filtered_trades)
-        if not kelly_perf.empty:
-            fig = px.bar(
-                kelly_perf, 
-                x='kelly_range', 
-                y='trade_count',
-                color='win_rate',
-                color_continuous_scale='RdYlGn',
-                range_color=[0, 1],
-                title='켈리 비율별 거래 성과',
-                text=kelly_perf['win_rate'].apply(lambda x: f"{x:.2%}")
-            )
-            fig.update_layout(template='plotly_dark', xaxis_title='켈리 비율 범위', yaxis_title='거래 수')
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # 켈리 비율별 누적 PnL
-            fig2 = px.bar(
-                kelly_perf,
-                x='kelly_range',
-                y='total_pnl',
-                color='total_pnl',
-                color_continuous_scale='RdYlGn',
-                title='켈리 비율별 누적 수익/손실'
-            )
-            fig2.update_layout(template='plotly_dark', xaxis_title='켈리 비율 범위', yaxis_title='누적 PnL (USDT)')
-            st.plotly_chart(fig2, use_container_width=True)
-            
-            # 데이터프레임으로 표시
-            st.write("켈리 비율별 거래 통계:")
-            formatted_kelly_df = kelly_perf.copy()
-            formatted_kelly_df['win_rate'] = formatted_kelly_df['win_rate'].apply(lambda x: f"{x:.2%}")
-            formatted_kelly_df['total_pnl'] = formatted_kelly_df['total_pnl'].apply(lambda x: f"${x:.2f}")
-            formatted_kelly_df['avg_pnl'] = formatted_kelly_df['avg_pnl'].apply(lambda x: f"${x:.2f}")
-            st.dataframe(formatted_kelly_df)
-        else:
-            st.info("켈리 비율별 성과 분석을 위한 데이터가 충분하지 않습니다.")
-    
-    # 6. 최근 거래 내역 표
-    st.markdown('<div class="sub-header">최근 거래 내역</div>', unsafe_allow_html=True)
-    
-    if not filtered_trades.empty:
-        # 컬럼 선택 및 형식화
-        display_cols = ['id', 'timestamp', 'action', 'entry_price', 'amount', 'leverage', 
-                         'kelly_fraction', 'win_probability', 'status', 'close_timestamp', 
-                         'close_price', 'pnl', 'pnl_percentage', 'result']
-        
-        display_df = filtered_trades[display_cols].copy()
-        
-        # 컬럼명 한글화
-        column_mapping = {
-            'id': '거래 ID',
-            'timestamp': '개장 시간',
-            'action': '포지션',
-            'entry_price': '진입가',
-            'amount': '수량',
-            'leverage': '레버리지',
-            'kelly_fraction': '켈리 비율',
-            'win_probability': '승리 확률',
-            'status': '상태',
-            'close_timestamp': '종료 시간',
-            'close_price': '종료가',
-            'pnl': '수익/손실',
-            'pnl_percentage': '수익률(%)',
-            'result': '결과'
-        }
-        
-        display_df.rename(columns=column_mapping, inplace=True)
-        
-        # 데이터 형식화
-        if '진입가' in display_df.columns:
-            display_df['진입가'] = display_df['진입가'].apply(lambda x: f"${x:.2f}" if pd.notna(x) else "")
+        # 6. 최근 거래 내역 표 (페이지 이동/필터 변경 시 이 구역만 다시 실행)
+        st.experimental_fragment(render_trade_table)(
+            trades_version, start_date, end_date, trade_filter_options(filtered_trades)
+        )
         
-        if '종료가' in display_df.columns:
-            display_df['종료가'] = display_df['종료가'].apply(lambda x: f"${x:.2f}" if pd.notna(x) else "")
-            
-        if '수량' in display_df.columns:
-            display_df['수량'] = display_df['수량'].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "")
-            
-        if '켈리 비율' in display_df.columns:
-            display_df['켈리 비율'] = display_df['켈리 비율'].apply(lambda x: f"{x:.2%}" if pd.notna(x) else "")
-            
-        if '승리 확률' in display_df.columns:
-            display_df['승리 확률'] = display_df['승리 확률'].apply(lambda x: f"{x:.2%}" if pd.notna(x) else "")
-            
-        if '수익/손실' in display_df.columns:
-            display_df['수익/손실'] = display_df['수익/손실'].apply(lambda x: f"${x:.2f}" if pd.notna(x) else "")
-            
-        if '수익률(%)' in display_df.columns:
-            display_df['수익률(%)'] = display_df['수익률(%)'].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "")
-            
-        if '포지션' in display_df.columns:
-            display_df['포지션'] = display_df['포지션'].apply(lambda x: x.upper() if pd.notna(x) else "")
-            
-        # 데이터프레임 출력 (스타일링 없이)
-        st.dataframe(display_df)
-    else:
-        st.info("선택한 기간에 거래 내역이 없습니다.")
+        # 거래 데이터가 바뀌었을 때만 전체 화면 새로고침
+        stale_rendered_at = time.time() if stale_data_loaded_at('trades') is not None else None
+        st.experimental_fragment(run_every=refresh_interval)(watch_trades_version)(
+            data_version, start_date, end_date, stale_rendered_at
+        )
     
-    # 자동 새로고침 설정
+    # 새로고침 상태 표시
     now = time.time()
-    if 'last_refresh' not in st.session_state:
-        st.session_state['last_refresh'] = now
-    last_refresh = st.session_state['last_refresh']
-
-    if st.session_state.get('refresh_interval') != refresh_interval:
-        st.session_state['refresh_interval'] = refresh_interval
-        st.session_state['last_refresh'] = now
-        last_refresh = now
-
-    seconds_since_refresh = now - last_refresh
-    seconds_to_refresh = max(int(refresh_interval - seconds_since_refresh), 0)
-
     st.sidebar.markdown(
-        f"마지막 새로고침: {datetime.fromtimestamp(last_refresh).strftime('%Y-%m-%d %H:%M:%S')}"
+        f"마지막 새로고침: {datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')}"
     )
     st.sidebar.markdown(
-        f"다음 새로고침까지 **{seconds_to_refresh}초** 남음"
-        if refresh_interval > 0 else "자동 새로고침이 비활성화되었습니다."
+        f"실시간 영역은 **{live_interval}초**마다, 잔액 차트는 **{refresh_interval}초**마다 갱신되며 "
+        "나머지는 거래 데이터가 바뀔 때만 다시 그립니다."
+    )
+    if snapshot is not None:
+        st.sidebar.caption(
+            f"데이터 스냅샷 v{snapshot.version} · {now - snapshot.loaded_at:.0f}초 전 갱신 "
+            f"(소요 {snapshot.duration:.2f}초)"
+        )
+    if local_store_enabled():
+        store_state = get_store_state()
+        if store_state['synced_at'] is None:
+            st.sidebar.caption(f"저장소: {storage_backend()} 로컬 복제 · 첫 동기화 대기 중")
+        else:
+            st.sidebar.caption(
+                f"저장소: {storage_backend()} 로컬 복제 · {now - store_state['synced_at']:.0f}초 전 동기화"
+                + (f" (소요 {store_state['duration']:.2f}초)" if store_state['duration'] else "")
+            )
+    probe_state = get_probe_state()
+    st.sidebar.caption(
+        "변경 감지: 재사용 "
+        f"{sum(probe_state['hits'].values())}회 / 재로딩 {sum(probe_state['reloads'].values())}회"
     )
+    memory = (
+        window_trades_memory(trades_version, start_date, end_date, filtered_trades)
+        if trades_error is None else {'rows': 0}
+    )
+    if memory['rows']:
+        st.sidebar.caption(
+            f"거래 데이터 메모리: {memory['compact_per_trade']:.0f} B/건 "
+            f"(기본 dtype {memory['default_per_trade']:.0f} B/건, {memory['rows']:,}건)"
+        )
+    render_query_stats()
+    render_staleness_banner(stale_banner)
+    refresher_error = get_data_refresher()['last_error']
+    if refresher_error:
+        st.sidebar.warning(f"백그라운드 갱신 실패: {refresher_error}")
 
     if st.sidebar.button('지금 새로고침'):
-        st.session_state['last_refresh'] = now
-        st.experimental_rerun()
+        st.rerun()
 
-    if refresh_interval > 0 and seconds_since_refresh >= refresh_interval:
-        st.session_state['last_refresh'] = now
-        st.experimental_rerun()
+    if st.sidebar.button('전체 다시 불러오기'):
+        reset_trades_state()
+        st.rerun()
 
 if __name__ == "__main__":
     main()
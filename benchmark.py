@@ -0,0 +1,381 @@
+"""Benchmark the dashboard's data and rendering stages on synthetic data.
+
+Generates ``trades``/``trade_results``/``account_history`` tables at a chosen
+scale in SQLite (or any SQLAlchemy URL, e.g. a local MySQL-compatible server),
+loads ``autotrade-dash.py`` as a module and times each stage cold (Streamlit
+caches do not persist outside ``streamlit run``). Results are written as JSON
+so runs can be compared with ``--compare``.
+
+    python benchmark.py --trades 100000 --output bench.json
+    python benchmark.py --trades 1000000 --account-interval 5 --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+import importlib.util
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    Column, DateTime, Double, Integer, MetaData, String, Table,
+    create_engine, func, select,
+)
+from sqlalchemy.engine import make_url
+
+DASHBOARD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "autotrade-dash.py")
+
+# 한 번에 넣는 행 수 (메모리와 executemany 효율의 절충)
+INSERT_CHUNK_ROWS = 50_000
+
+metadata = MetaData()
+
+trades_table = Table(
+    'trades', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('timestamp', DateTime, index=True),
+    Column('action', String(10)),
+    Column('entry_price', Double),
+    Column('amount', Double),
+    Column('order_size', Double),
+    Column('leverage', Integer),
+    Column('stop_loss', Double),
+    Column('take_profit', Double),
+    Column('kelly_fraction', Double),
+    Column('win_probability', Double),
+    Column('volatility', Double),
+    Column('status', String(10), index=True),
+)
+
+trade_results_table = Table(
+    'trade_results', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('trade_id', Integer, index=True),
+    Column('close_timestamp', DateTime, index=True),
+    Column('close_price', Double),
+    Column('pnl', Double),
+    Column('pnl_percentage', Double),
+    Column('result', String(10)),
+)
+
+account_history_table = Table(
+    'account_history', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('timestamp', DateTime, index=True),
+    Column('balance', Double),
+    Column('equity', Double),
+    Column('unrealized_pnl', Double),
+)
+
+# 생성 조건 기록 (같은 조건이면 다시 만들지 않음)
+bench_meta_table = Table(
+    'bench_meta', metadata,
+    Column('name', String(32), primary_key=True),
+    Column('value', String(255)),
+)
+
+def _datetimes(base, seconds):
+    # 초 단위 오프셋 -> datetime 목록 (DB 드라이버가 받는 형태)
+    stamps = np.datetime64(base, 'us') + (np.asarray(seconds) * 1e6).astype('timedelta64[us]')
+    return stamps.astype(object).tolist()
+
+def _insert_chunks(conn, table, columns):
+    total = len(next(iter(columns.values())))
+    names = list(columns)
+    for offset in range(0, total, INSERT_CHUNK_ROWS):
+        chunk = [column[offset:offset + INSERT_CHUNK_ROWS] for column in columns.values()]
+        conn.execute(table.insert(), [dict(zip(names, row)) for row in zip(*chunk)])
+
+def generate_trades(n_trades, days, end, rng):
+    """Column lists for ``trades`` and ``trade_results`` spread over ``days`` before ``end``."""
+    start = end - timedelta(days=days)
+    offsets = np.sort(rng.uniform(0, days * 86400, n_trades))
+    # 가격은 완만한 랜덤워크, 수익은 레버리지/변동성에 비례하는 잡음
+    price = 40_000 * np.exp(np.cumsum(rng.normal(0, 0.002, n_trades)))
+    action = np.where(rng.random(n_trades) < 0.5, 'long', 'short')
+    leverage = rng.integers(1, 21, n_trades)
+    volatility = rng.gamma(2.0, 0.8, n_trades)
+    kelly = rng.uniform(0, 0.12, n_trades)
+    win_probability = np.clip(0.5 + (kelly - 0.06) * 2 + rng.normal(0, 0.05, n_trades), 0.2, 0.9)
+    amount = rng.uniform(0.001, 0.1, n_trades)
+    order_size = amount * price / leverage
+    # 마지막 몇 건은 아직 열린 거래
+    status = np.full(n_trades, 'closed', dtype=object)
+    status[-min(3, n_trades):] = 'open'
+    volatility_values = [None if missing else value for value, missing in
+                         zip(volatility.tolist(), (rng.random(n_trades) < 0.02).tolist())]
+
+    ids = np.arange(1, n_trades + 1)
+    trades = {
+        'id': ids.tolist(),
+        'timestamp': _datetimes(start, offsets),
+        'action': action.tolist(),
+        'entry_price': price.tolist(),
+        'amount': amount.tolist(),
+        'order_size': order_size.tolist(),
+        'leverage': leverage.tolist(),
+        'stop_loss': (price * np.where(action == 'long', 0.98, 1.02)).tolist(),
+        'take_profit': (price * np.where(action == 'long', 1.03, 0.97)).tolist(),
+        'kelly_fraction': kelly.tolist(),
+        'win_probability': win_probability.tolist(),
+        'volatility': volatility_values,
+        'status': status.tolist(),
+    }
+
+    closed = status == 'closed'
+    won = rng.random(n_trades) < win_probability
+    pnl_percentage = np.where(won, 1, -1) * np.abs(rng.normal(0.6, 0.5, n_trades)) * volatility
+    pnl = order_size * leverage * pnl_percentage / 100
+    direction = np.where(action == 'long', 1, -1)
+    results = {
+        'trade_id': ids[closed].tolist(),
+        'close_timestamp': _datetimes(start, (offsets + rng.uniform(60, 36_000, n_trades))[closed]),
+        'close_price': (price * (1 + direction * pnl_percentage / 100 / leverage))[closed].tolist(),
+        'pnl': pnl[closed].tolist(),
+        'pnl_percentage': pnl_percentage[closed].tolist(),
+        'result': np.where(pnl > 0, 'win', 'loss')[closed].tolist(),
+    }
+    return trades, results
+
+def generate_account_history(days, interval, end, rng):
+    """Column lists for ``account_history`` with one snapshot every ``interval`` seconds."""
+    start = end - timedelta(days=days)
+    n = int(days * 86400 // interval)
+    balance = 10_000 + np.cumsum(rng.normal(0, 0.5, n))
+    unrealized = rng.normal(0, 15, n)
+    return {
+        'timestamp': _datetimes(start, np.arange(n) * interval),
+        'balance': balance.tolist(),
+        'equity': (balance + unrealized).tolist(),
+        'unrealized_pnl': unrealized.tolist(),
+    }
+
+def prepare_database(engine, n_trades, days, account_interval, seed, regenerate=False):
+    """Create and fill the tables unless they already hold data for the same parameters."""
+    wanted = {
+        'trades': str(n_trades), 'days': str(days),
+        'account_interval': str(account_interval), 'seed': str(seed),
+    }
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        current = dict(conn.execute(select(bench_meta_table.c.name, bench_meta_table.c.value)).all())
+    if current == wanted and not regenerate:
+        logging.info("기존 벤치마크 데이터를 재사용합니다: %s", wanted)
+        return False
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    end = datetime.now().replace(microsecond=0)
+    trades, results = generate_trades(n_trades, days, end, rng)
+    account = generate_account_history(days, account_interval, end, rng)
+    with engine.begin() as conn:
+        for table in (bench_meta_table, trades_table, trade_results_table, account_history_table):
+            conn.execute(table.delete())
+        _insert_chunks(conn, trades_table, trades)
+        _insert_chunks(conn, trade_results_table, results)
+        _insert_chunks(conn, account_history_table, account)
+        conn.execute(bench_meta_table.insert(), [
+            {'name': name, 'value': value} for name, value in wanted.items()
+        ])
+    logging.info(
+        "벤치마크 데이터를 생성했습니다: 거래 %d건, 계정 이력 %d건 (%.1f초)",
+        n_trades, len(account['timestamp']), time.perf_counter() - started,
+    )
+    return True
+
+def load_dashboard(database_url, cache_dir):
+    """Import ``autotrade-dash.py`` against ``database_url`` without running ``main()``."""
+    os.environ['DASH_DATABASE_URL'] = database_url
+    os.environ['DASH_CACHE_DIR'] = cache_dir
+    # streamlit run 없이 실행할 때 나오는 경고와 대시보드의 진행 로그 억제
+    # (설정을 먼저 읽어 두어야 로그 수준이 설정 기본값으로 되돌아가지 않음)
+    from streamlit import config, logger as streamlit_logger
+    config.set_option("global.showWarningOnDirectExecution", False)
+    streamlit_logger.set_log_level("error")
+    logging.getLogger("autotrade_dash").setLevel(logging.WARNING)
+    spec = importlib.util.spec_from_file_location("autotrade_dash", DASHBOARD_PATH)
+    dash = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(dash)
+    # 캐시가 유지되지 않으므로 엔진은 한 번 만들어 모든 단계가 같은 연결 풀을 사용
+    # (복제본을 지정하지 않으므로 조회와 롤업 쓰기 모두 같은 원본 엔진)
+    engine = dash.get_engine()
+    dash.get_engine = dash.get_primary_engine = lambda: engine
+    return dash
+
+def time_stage(func, repeat):
+    """Run ``func`` ``repeat`` times; return timings (seconds) and the last result."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+def _row_count(result):
+    if isinstance(result, (pd.DataFrame, list, tuple)):
+        return len(result)
+    if isinstance(result, dict) and 'total_trades' in result:
+        return result['total_trades']
+    return None
+
+def run_stages(dash, start, end, repeat, chart_points):
+    """Time each dashboard stage in order; later stages use earlier results."""
+    stages = {}
+
+    def stage(name, func):
+        timings, result = time_stage(func, repeat)
+        stages[name] = {
+            'runs': timings,
+            'min': min(timings),
+            'median': statistics.median(timings),
+            'max': max(timings),
+            'rows': _row_count(result),
+        }
+        logging.info("%-32s %9.1f ms", name, stages[name]['median'] * 1000)
+        return result
+
+    # 1. 조회
+    trades = stage('load_trades', lambda: dash.fetch_trades_window(start, end))
+    account = stage('load_account_history', lambda: dash.fetch_account_window(start, end))
+    stage('load_account_downsampled',
+          lambda: dash.load_account_history_downsampled(start, end, chart_points))
+    stage('load_active_trade', dash.fetch_active_trade)
+    stage('load_trade_page', lambda: dash._fetch_trades(
+        *dash.trade_page_clause(start, end, (), True, None, dash.TRADE_PAGE_SIZES[0] + 1)
+    ))
+
+    # 2. 분석
+    stats = stage('calculate_performance_stats', lambda: dash.calculate_performance_stats(trades))
+    stage('analyze_time_performance', lambda: dash.analyze_time_performance(trades))
+    stage('analyze_volatility_performance', lambda: dash.analyze_volatility_performance(trades))
+    stage('analyze_kelly_performance', lambda: dash.analyze_kelly_performance(trades))
+    analytics = stage('compute_trade_analytics', lambda: dash.compute_trade_analytics(trades))
+    stage('compute_risk_analytics', lambda: dash.compute_risk_analytics(trades, account))
+    stage('simulate_kelly_sizing', lambda: dash.simulate_kelly_sizing(trades, 10000, 1000))
+    downsampled = stage('bucket_account_frame',
+                        lambda: dash.bucket_account_frame(account, start, end, chart_points))
+
+    # 3. 그래프 (render_* 는 그림 생성과 Streamlit 직렬화를 함께 포함)
+    stage('render_pnl_chart', lambda: dash.render_pnl_chart(trades))
+    stage('render_balance_chart', lambda: dash.render_balance_chart(downsampled, []))
+
+    def build_figures():
+        figures = list(dash.build_summary_figures(stats))
+        for key, label_column, title_prefix, axis_title in dash.BUCKET_ANALYSIS_TABS.values():
+            figures.extend(dash.build_bucket_figures(
+                analytics[key], label_column, title_prefix, axis_title
+            ))
+        return figures
+    stage('build_analysis_figures', build_figures)
+
+    # 4. 표
+    stage('prepare_display_frame',
+          lambda: dash.prepare_display_frame(trades, dash.TRADE_TABLE_COLUMNS))
+    return stages
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(DASHBOARD_PATH),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_results(previous, current):
+    """Print median timings next to a previous run's, with the ratio."""
+    print(f"{'stage':<30}{'before ms':>12}{'after ms':>12}{'ratio':>8}")
+    for name, result in current['stages'].items():
+        before = previous.get('stages', {}).get(name)
+        after_ms = result['median'] * 1000
+        if before is None:
+            print(f"{name:<30}{'-':>12}{after_ms:>12.1f}{'-':>8}")
+            continue
+        before_ms = before['median'] * 1000
+        ratio = after_ms / before_ms if before_ms else float('inf')
+        print(f"{name:<30}{before_ms:>12.1f}{after_ms:>12.1f}{ratio:>8.2f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trades", type=int, default=10_000,
+                        help="number of synthetic trades (1k to 5M)")
+    parser.add_argument("--days", type=int, default=90, help="span of the generated data in days")
+    parser.add_argument("--account-interval", type=float, default=10,
+                        help="seconds between account_history snapshots")
+    parser.add_argument("--window-days", type=int, default=30,
+                        help="dashboard date window (ending now) to benchmark")
+    parser.add_argument("--chart-points", type=int, default=2000,
+                        help="target points for the downsampled balance chart")
+    parser.add_argument("--database-url", default=None,
+                        help="SQLAlchemy URL to benchmark against (default: SQLite file)")
+    parser.add_argument("--sqlite-path", default="benchmark.db",
+                        help="SQLite file used when --database-url is not given")
+    parser.add_argument("--cache-dir", default="",
+                        help="DASH_CACHE_DIR for the dashboard (default: no snapshot, read the DB)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--regenerate", action="store_true",
+                        help="rebuild the tables even if they match the requested scale")
+    parser.add_argument("--output", default=None, help="write results JSON to this path")
+    parser.add_argument("--compare", default=None, help="previous results JSON to compare against")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    database_url = args.database_url or f"sqlite:///{os.path.abspath(args.sqlite_path)}"
+
+    engine = create_engine(database_url)
+    prepare_database(engine, args.trades, args.days, args.account_interval, args.seed,
+                     regenerate=args.regenerate)
+    with engine.connect() as conn:
+        latest = conn.execute(select(func.max(trades_table.c.timestamp))).scalar()
+    engine.dispose()
+
+    # 생성 시점 기준 마지막 window_days 일 (종료일 포함, 대시보드와 같은 범위 계산)
+    end = pd.Timestamp(latest).normalize() + timedelta(days=1)
+    start = end - timedelta(days=args.window_days)
+
+    dash = load_dashboard(database_url, args.cache_dir)
+    stages = run_stages(dash, start, end, args.repeat, args.chart_points)
+
+    results = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': {
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'sqlalchemy': sys.modules['sqlalchemy'].__version__,
+            'streamlit': sys.modules['streamlit'].__version__,
+        },
+        'database': {
+            'url': make_url(database_url).render_as_string(hide_password=True),
+            'trades': args.trades,
+            'days': args.days,
+            'account_interval': args.account_interval,
+            'seed': args.seed,
+        },
+        'window': {'start': start.isoformat(), 'end': end.isoformat()},
+        'repeat': args.repeat,
+        'stages': stages,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logging.info("결과를 저장했습니다: %s", args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Monte Carlo bootstrap of closed-trade returns for Kelly sizing analysis.
+
+Each path resamples historical trades (with replacement) and compounds the
+equity as ``1 + multiplier * kelly_fraction * return`` per trade, so the
+recorded sizing and scaled alternatives are compared on the same draws.
+Paths are simulated in batches as ``paths x trades`` numpy arrays; the batch
+worker lives in this importable module so a process pool can pickle it.
+"""
+import numpy as np
+
+# 경로 그래프에 남기는 시점 수 (거래 수가 더 많으면 등간격으로 추림)
+CHECKPOINTS = 100
+
+# 경로 분포 그래프의 백분위 (5/25/50/75/95)
+PATH_PERCENTILES = (5, 25, 50, 75, 95)
+
+# 최대 낙폭이 이 값보다 깊으면 '파산 위험' 경로로 센다
+RUIN_DRAWDOWN = -0.5
+
+
+def checkpoint_steps(n_trades, points=CHECKPOINTS):
+    """Trade counts (1-based) at which path equity is recorded."""
+    return np.unique(np.linspace(1, n_trades, min(points, n_trades)).astype(np.int64))
+
+
+def simulate_batch(returns, stakes, multipliers, n_paths, n_trades, seed, steps):
+    """Simulate ``n_paths`` bootstrapped paths for every sizing multiplier.
+
+    Returns ``(final, max_drawdown, path_equity)`` shaped
+    ``(multipliers, paths)``, ``(multipliers, paths)`` and
+    ``(multipliers, paths, len(steps))``; equity starts at 1 and a trade that
+    loses the whole stake leaves the path at 0.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(returns), size=(n_paths, n_trades))
+    # 같은 표본에서 배수만 바꿔 비교하도록 거래별 노출(켈리 비율 x 수익률)을 한 번만 계산
+    exposure = stakes[picks] * returns[picks]
+    del picks
+
+    final = np.empty((len(multipliers), n_paths))
+    max_drawdown = np.empty((len(multipliers), n_paths))
+    path_equity = np.empty((len(multipliers), n_paths, len(steps)), dtype=np.float32)
+    log_growth = np.empty_like(exposure)
+    for i, multiplier in enumerate(multipliers):
+        np.multiply(exposure, multiplier, out=log_growth)
+        log_growth += 1.0
+        np.maximum(log_growth, 0.0, out=log_growth)
+        with np.errstate(divide='ignore'):
+            np.log(log_growth, out=log_growth)
+        # 로그 자산의 누적합 (파산하면 -inf 로 남음)
+        np.cumsum(log_growth, axis=1, out=log_growth)
+        peak = np.maximum.accumulate(np.maximum(log_growth, 0.0), axis=1)
+        max_drawdown[i] = np.expm1((log_growth - peak).min(axis=1))
+        final[i] = np.exp(log_growth[:, -1])
+        path_equity[i] = np.exp(log_growth[:, steps - 1])
+    return final, max_drawdown, path_equity
+
+
+def _simulate_batch_args(args):
+    return simulate_batch(*args)
+
+
+def run_simulation(returns, stakes, multipliers, n_paths, n_trades, seed=None,
+                   batch_paths=1000, executor=None):
+    """Bootstrap ``n_paths`` paths of ``n_trades`` trades, batched over ``executor``.
+
+    ``returns`` are per-trade returns on the staked capital (``0.01`` = 1%)
+    and ``stakes`` the matching Kelly fractions. Batches get independent
+    child seeds, so results do not depend on the number of workers. Without
+    an executor the batches run in this process.
+    """
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    stakes = np.ascontiguousarray(stakes, dtype=np.float64)
+    steps = checkpoint_steps(n_trades)
+    sizes = [min(batch_paths, n_paths - offset) for offset in range(0, n_paths, batch_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [
+        (returns, stakes, tuple(multipliers), size, n_trades, child, steps)
+        for size, child in zip(sizes, seeds)
+    ]
+    if executor is None or len(jobs) == 1:
+        results = [simulate_batch(*job) for job in jobs]
+    else:
+        results = list(executor.map(_simulate_batch_args, jobs))
+    final, max_drawdown, path_equity = (
+        np.concatenate(parts, axis=1) for parts in zip(*results)
+    )
+    return summarize_simulation(multipliers, n_trades, steps, final, max_drawdown, path_equity)
+
+
+def summarize_simulation(multipliers, n_trades, steps, final, max_drawdown, path_equity):
+    """Per-multiplier outcome figures and path percentile bands."""
+    summary = []
+    for i, multiplier in enumerate(multipliers):
+        with np.errstate(divide='ignore'):
+            log_final = np.log(final[i])
+        summary.append({
+            'multiplier': multiplier,
+            'median_final': float(np.median(final[i])),
+            'p5_final': float(np.percentile(final[i], 5)),
+            'p95_final': float(np.percentile(final[i], 95)),
+            # 거래당 기하 평균 성장률 (중앙값 경로 기준)
+            'growth_per_trade': float(np.expm1(np.median(log_final) / n_trades)),
+            'loss_probability': float(np.mean(final[i] < 1.0)),
+            'median_max_drawdown': float(np.median(max_drawdown[i])),
+            'ruin_probability': float(np.mean(max_drawdown[i] <= RUIN_DRAWDOWN)),
+        })
+    bands = np.percentile(path_equity, PATH_PERCENTILES, axis=1)
+    return {
+        'summary': summary,
+        'steps': steps,
+        # (백분위, 배수, 시점)
+        'bands': bands,
+        'paths': final.shape[1],
+        'trades': n_trades,
+    }
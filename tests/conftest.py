@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def dash():
+    """``autotrade-dash.py`` loaded as a module (the file name is not importable)."""
+    # montecarlo 등 같은 폴더의 모듈을 import 할 수 있도록 저장소 루트를 경로에 추가
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(
+        "autotrade_dash", os.path.join(ROOT, "autotrade-dash.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
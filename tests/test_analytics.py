@@ -0,0 +1,328 @@
+"""Numeric parity of the vectorized analytics with the original pandas implementations."""
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# 벡터화 이전의 컬럼별 pandas 구현 (비교 기준)
+def reference_performance_stats(trades_df):
+    empty = {
+        'total_trades': 0, 'profitable_trades': 0, 'losing_trades': 0, 'win_rate': 0,
+        'avg_profit': 0, 'avg_loss': 0, 'total_pnl': 0, 'max_profit': 0, 'max_loss': 0,
+        'avg_duration': 0, 'long_win_rate': 0, 'short_win_rate': 0,
+        'total_long': 0, 'total_short': 0,
+    }
+    if trades_df.empty:
+        return empty
+    closed_trades = trades_df[trades_df['status'] == 'closed']
+    if closed_trades.empty:
+        return empty
+
+    profitable_trades = closed_trades[closed_trades['pnl'] > 0]
+    losing_trades = closed_trades[closed_trades['pnl'] <= 0]
+    long_trades = closed_trades[closed_trades['action'] == 'long']
+    short_trades = closed_trades[closed_trades['action'] == 'short']
+    long_profitable = long_trades[long_trades['pnl'] > 0]
+    short_profitable = short_trades[short_trades['pnl'] > 0]
+
+    total_trades = len(closed_trades)
+    return {
+        'total_trades': total_trades,
+        'profitable_trades': len(profitable_trades),
+        'losing_trades': len(losing_trades),
+        'win_rate': len(profitable_trades) / total_trades,
+        'avg_profit': profitable_trades['pnl'].mean() if not profitable_trades.empty else 0,
+        'avg_loss': losing_trades['pnl'].mean() if not losing_trades.empty else 0,
+        'total_pnl': closed_trades['pnl'].sum(),
+        'max_profit': profitable_trades['pnl'].max() if not profitable_trades.empty else 0,
+        'max_loss': losing_trades['pnl'].min() if not losing_trades.empty else 0,
+        'avg_duration': closed_trades['duration'].mean(),
+        'long_win_rate': len(long_profitable) / len(long_trades) if len(long_trades) > 0 else 0,
+        'short_win_rate': len(short_profitable) / len(short_trades) if len(short_trades) > 0 else 0,
+        'total_long': len(long_trades),
+        'total_short': len(short_trades),
+    }
+
+
+def _reference_grouped(closed_trades, column, label):
+    performance = closed_trades.groupby(column, observed=False).agg({
+        'id': 'count',
+        'pnl': ['sum', 'mean', lambda x: (x > 0).sum() / len(x) if len(x) > 0 else 0],
+    }).reset_index()
+    performance.columns = [label, 'trade_count', 'total_pnl', 'avg_pnl', 'win_rate']
+    return performance
+
+
+def reference_time_performance(trades_df):
+    closed_trades = trades_df[trades_df['status'] == 'closed'].copy()
+    if closed_trades.empty:
+        return pd.DataFrame()
+    time_slot = (closed_trades['timestamp'].dt.hour // 4) * 4
+    closed_trades['time_range'] = time_slot.apply(lambda x: f"{x:02d}-{(x + 4) % 24:02d}")
+    return _reference_grouped(closed_trades, 'time_range', 'time_range')
+
+
+def reference_volatility_performance(trades_df):
+    closed_trades = trades_df[trades_df['status'] == 'closed'].copy()
+    if closed_trades.empty:
+        return pd.DataFrame()
+    closed_trades['volatility_range'] = pd.cut(
+        closed_trades['volatility'], bins=[0, 1, 2, 3, float('inf')],
+        labels=['0-1%', '1-2%', '2-3%', '3%+'], right=False,
+    )
+    return _reference_grouped(closed_trades, 'volatility_range', 'volatility_range')
+
+
+def reference_kelly_performance(trades_df):
+    closed_trades = trades_df[trades_df['status'] == 'closed'].copy()
+    if closed_trades.empty:
+        return pd.DataFrame()
+    closed_trades['kelly_range'] = pd.cut(
+        closed_trades['kelly_fraction'], bins=[0, 0.02, 0.05, 0.08, 0.1, 1.0],
+        labels=['0-2%', '2-5%', '5-8%', '8-10%', '10%+'], right=False,
+    )
+    return _reference_grouped(closed_trades, 'kelly_range', 'kelly_range')
+
+
+def synthetic_trades(n, seed=1):
+    """Trades with NaN/zero pnl, out-of-range buckets and non long/short actions."""
+    rng = np.random.default_rng(seed)
+    timestamp = pd.Timestamp('2024-01-01') + pd.to_timedelta(
+        rng.integers(0, 86400 * 60, n), unit='s'
+    )
+    pnl = rng.normal(0, 10, n)
+    pnl[rng.random(n) < 0.02] = np.nan
+    pnl[rng.random(n) < 0.01] = 0
+    volatility = rng.uniform(-0.5, 5, n)
+    volatility[rng.random(n) < 0.02] = np.nan
+    kelly = rng.uniform(0, 1.1, n)
+    kelly[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'timestamp': timestamp,
+        'action': rng.choice(['long', 'short', 'flat'], n, p=[0.5, 0.45, 0.05]),
+        'status': rng.choice(['closed', 'open', 'cancel'], n, p=[0.9, 0.05, 0.05]),
+        'pnl': pnl,
+        'volatility': volatility,
+        'kelly_fraction': kelly,
+        'duration': np.where(rng.random(n) < 0.1, np.nan, rng.uniform(1, 500, n)),
+    })
+
+
+def assert_stats_equal(actual, expected, rtol=1e-9):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if pd.isna(value):
+            assert pd.isna(actual[key]), key
+        else:
+            assert actual[key] == pytest.approx(value, rel=rtol, abs=1e-12), key
+
+
+@pytest.mark.parametrize("n", [1, 5, 100, 10000])
+def test_trade_analytics_matches_reference(dash, n):
+    trades = synthetic_trades(n)
+    analytics = dash.compute_trade_analytics(trades)
+
+    assert_stats_equal(analytics['stats'], reference_performance_stats(trades))
+    for key, reference in [
+        ('time', reference_time_performance),
+        ('volatility', reference_volatility_performance),
+        ('kelly', reference_kelly_performance),
+    ]:
+        pd.testing.assert_frame_equal(
+            analytics[key], reference(trades),
+            check_dtype=False, check_categorical=False, rtol=1e-9,
+        )
+
+
+def test_trade_analytics_compact_frame_matches_reference(dash):
+    # 범주형/float32 로 줄인 거래 프레임도 같은 결과
+    trades = synthetic_trades(2000, seed=7)
+    compact = dash.compact_trades_frame(trades)
+    analytics = dash.compute_trade_analytics(compact)
+    assert_stats_equal(analytics['stats'], reference_performance_stats(compact), rtol=1e-6)
+    pd.testing.assert_frame_equal(
+        analytics['kelly'], reference_kelly_performance(compact),
+        check_dtype=False, check_categorical=False, rtol=1e-6,
+    )
+
+
+@pytest.mark.parametrize("status", [None, 'open'])
+def test_trade_analytics_without_closed_trades(dash, status):
+    trades = synthetic_trades(10)
+    trades = trades.iloc[0:0] if status is None else trades.assign(status=status)
+    analytics = dash.compute_trade_analytics(trades)
+    assert analytics['stats']['total_trades'] == 0
+    assert all(analytics[key].empty for key in ('time', 'volatility', 'kelly'))
+
+
+@pytest.fixture
+def trades_db(dash, tmp_path, monkeypatch):
+    """SQLite source DB filled with ``synthetic_trades`` (rollup aggregation enabled)."""
+    monkeypatch.setenv("DASH_DATABASE_URL", f"sqlite:///{tmp_path / 'trades.db'}")
+    monkeypatch.setenv("DASH_CACHE_DIR", "")
+    monkeypatch.setenv("DASH_BUCKET_AGGREGATION", "rollup")
+    for name in ("DASH_REPLICA_DATABASE_URL", "MYSQL_REPLICA_HOST", "DASH_STORAGE_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+
+    trades = synthetic_trades(3000, seed=3)
+    closed = trades[trades['status'] == 'closed']
+    # DB DateTime 정밀도(마이크로초)에 맞춤
+    close_timestamp = (
+        closed['timestamp'] + pd.to_timedelta(closed['duration'], unit='min')
+    ).dt.floor('us')
+    engine = dash.get_primary_engine()
+    dash.STORE_METADATA.create_all(engine, tables=[
+        dash.STORE_TABLES['trades'], dash.STORE_TABLES['trade_results'],
+        dash.STORE_TABLES['account_history'],
+    ])
+    with engine.begin() as conn:
+        conn.execute(dash.STORE_TABLES['trades'].insert(), [
+            {
+                'id': int(row.id), 'timestamp': row.timestamp.to_pydatetime(),
+                'action': row.action, 'entry_price': 100.0, 'amount': 1.0, 'order_size': 100.0,
+                'leverage': 5, 'stop_loss': 95.0, 'take_profit': 110.0,
+                'kelly_fraction': None if np.isnan(row.kelly_fraction) else float(row.kelly_fraction),
+                'win_probability': 0.5,
+                'volatility': None if np.isnan(row.volatility) else float(row.volatility),
+                'status': row.status,
+            }
+            for row in trades.itertuples()
+        ])
+        conn.execute(dash.STORE_TABLES['trade_results'].insert(), [
+            {
+                'trade_id': int(row.id),
+                'close_timestamp': None if pd.isna(close) else close.to_pydatetime(),
+                'close_price': 101.0,
+                'pnl': None if np.isnan(row.pnl) else float(row.pnl),
+                'pnl_percentage': None if np.isnan(row.pnl) else float(row.pnl) / 100,
+                'result': 'win' if row.pnl > 0 else 'loss',
+            }
+            for row, close in zip(closed.itertuples(), close_timestamp)
+        ])
+    engine.dispose()
+    return trades
+
+
+def raw_window_analytics(dash, start, end):
+    # 롤업을 거치지 않고 원본 거래를 직접 읽어 계산한 결과 (비교 기준)
+    trades = dash._fetch_trades(
+        "WHERE t.timestamp >= :start AND t.timestamp < :end",
+        {'start': start.to_pydatetime(), 'end': end.to_pydatetime()},
+    )
+    return dash.compute_trade_analytics(trades)
+
+
+def assert_rollup_matches_raw(dash, start, end):
+    expected = raw_window_analytics(dash, start, end)
+    actual = dash.rollup_trade_analytics(start, end)
+    # 개수/최댓값/최솟값은 정확히 같고, 합계/평균은 합산 순서 차이만큼만 다름
+    assert_stats_equal(actual['stats'], expected['stats'], rtol=1e-12)
+    for key in ('total_trades', 'profitable_trades', 'losing_trades', 'total_long',
+                'total_short', 'max_profit', 'max_loss'):
+        assert actual['stats'][key] == expected['stats'][key], key
+    for key in ('time', 'volatility', 'kelly'):
+        pd.testing.assert_frame_equal(
+            actual[key], expected[key], check_dtype=False, check_categorical=False, rtol=1e-12,
+        )
+    assert dash.calculate_performance_stats(start=start, end=end) == pytest.approx(
+        expected['stats'], rel=1e-12, nan_ok=True
+    )
+
+
+WINDOWS = {
+    'all': (pd.Timestamp('2023-12-01'), pd.Timestamp('2024-04-01')),
+    'days': (pd.Timestamp('2024-01-10'), pd.Timestamp('2024-02-03')),
+    'hour_offsets': (pd.Timestamp('2024-01-10 07:00'), pd.Timestamp('2024-02-03 19:00')),
+    'within_day': (pd.Timestamp('2024-01-15 03:00'), pd.Timestamp('2024-01-15 21:00')),
+    'empty': (pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-01')),
+}
+
+
+@pytest.mark.parametrize("window", list(WINDOWS))
+def test_rollup_stats_match_raw_scan(dash, trades_db, window):
+    dash.sync_rollups()
+    assert_rollup_matches_raw(dash, *WINDOWS[window])
+
+
+def test_rollups_follow_closed_and_new_trades(dash, trades_db):
+    dash.sync_rollups()
+    trades_table = dash.STORE_TABLES['trades']
+    results_table = dash.STORE_TABLES['trade_results']
+    open_trade = trades_db[trades_db['status'] == 'open'].iloc[0]
+    new_id = int(trades_db['id'].max()) + 1
+    closed_at = pd.Timestamp('2024-03-30').to_pydatetime()
+    with dash.get_primary_engine().begin() as conn:
+        # 오래전에 열린 거래가 늦게 닫히고, 새 거래가 추가됨
+        conn.execute(
+            trades_table.update().where(trades_table.c.id == int(open_trade['id'])),
+            {'status': 'closed'},
+        )
+        conn.execute(trades_table.insert(), [{
+            'id': new_id, 'timestamp': pd.Timestamp('2024-01-20 05:30').to_pydatetime(),
+            'action': 'short', 'status': 'closed', 'volatility': 2.5, 'kelly_fraction': 0.06,
+        }])
+        conn.execute(results_table.insert(), [
+            {'trade_id': int(open_trade['id']), 'close_timestamp': closed_at, 'pnl': 12.5},
+            {'trade_id': new_id, 'close_timestamp': closed_at, 'pnl': -4.0},
+        ])
+
+    dash.sync_rollups()
+    for start, end in (WINDOWS['all'], WINDOWS['hour_offsets']):
+        assert_rollup_matches_raw(dash, start, end)
+
+
+def test_rollups_skip_unaligned_windows(dash, trades_db):
+    dash.sync_rollups()
+    assert dash.read_rollup_rows(
+        pd.Timestamp('2024-01-10 07:30'), pd.Timestamp('2024-01-11')
+    ) is None
+
+
+def cancel_open_trade(dash, trades_db):
+    # 열린 거래 하나를 결과 행 없이 취소 상태로 바꿈
+    trade_id = int(trades_db.loc[trades_db['status'] == 'open', 'id'].iloc[0])
+    trades_table = dash.STORE_TABLES['trades']
+    with dash.get_primary_engine().begin() as conn:
+        conn.execute(
+            trades_table.update().where(trades_table.c.id == trade_id), {'status': 'cancel'}
+        )
+    return trade_id
+
+
+def assert_trades_match_raw(dash, df, start, end):
+    expected = dash._fetch_trades(
+        "WHERE t.timestamp >= :start AND t.timestamp < :end",
+        {'start': start.to_pydatetime(), 'end': end.to_pydatetime()},
+    )
+    pd.testing.assert_frame_equal(
+        df.sort_values('id').reset_index(drop=True),
+        expected.sort_values('id').reset_index(drop=True),
+        check_dtype=False, check_categorical=False,
+    )
+
+
+def test_incremental_trades_reread_open_status_change(dash, trades_db, monkeypatch):
+    # 캐시 상태가 호출 사이에 유지되도록 고정
+    state = dash.get_trades_state()
+    monkeypatch.setattr(dash, 'get_trades_state', lambda: state)
+    start, end = WINDOWS['all']
+    dash.fetch_trades_window(start, end)
+    trade_id = cancel_open_trade(dash, trades_db)
+
+    df = dash.fetch_trades_window(start, end)
+    assert df.loc[df['id'] == trade_id, 'status'].tolist() == ['cancel']
+    assert_trades_match_raw(dash, df, start, end)
+
+
+def test_snapshot_rereads_open_status_change(dash, trades_db, tmp_path, monkeypatch):
+    monkeypatch.setenv("DASH_CACHE_DIR", str(tmp_path / 'snapshot'))
+    start, end = WINDOWS['all']
+    dash.fetch_trades_window(start, end)
+    trade_id = cancel_open_trade(dash, trades_db)
+    assert trade_id in dash._read_manifest()['trades']['open_ids']
+
+    df = dash.fetch_trades_window(start, end)
+    assert df.loc[df['id'] == trade_id, 'status'].tolist() == ['cancel']
+    assert trade_id not in dash._read_manifest()['trades']['open_ids']
+    assert_trades_match_raw(dash, df, start, end)